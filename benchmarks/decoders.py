@@ -0,0 +1,115 @@
+"""Compare the time taken by each JSON decoder to decode eBird API responses.
+
+Run it from the root of the project:
+
+    PYTHONPATH=src python benchmarks/decoders.py
+
+By default synthetic payloads, with the same structure and about the same
+size as the full taxonomy and the hotspots for a country, are decoded.
+To use real responses, save them to files, for example with:
+
+    from ebird.api import get_taxonomy, utils
+    utils.save_json("taxonomy.json", get_taxonomy(api_key))
+
+and pass the files on the command line:
+
+    PYTHONPATH=src python benchmarks/decoders.py taxonomy.json
+
+Decoders which are not installed are skipped.
+
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import timeit
+
+from ebird.api.utils import _decoders, get_decoder
+
+
+def _word(length):
+    return "".join(random.choices(string.ascii_lowercase, k=length))
+
+
+def taxonomy(count=17000):
+    records = []
+    for index in range(count):
+        records.append(
+            {
+                "sciName": "%s %s" % (_word(8).capitalize(), _word(10)),
+                "comName": "%s %s" % (_word(7).capitalize(), _word(6)),
+                "speciesCode": _word(6),
+                "category": random.choice(["species", "issf", "slash", "spuh"]),
+                "taxonOrder": float(index),
+                "bandingCodes": [_word(4).upper()],
+                "comNameCodes": [_word(4).upper()],
+                "sciNameCodes": [_word(4).upper()],
+                "order": _word(12).capitalize(),
+                "familyCode": _word(7),
+                "familyComName": "%s and %s" % (_word(6), _word(7)),
+                "familySciName": _word(9).capitalize(),
+            }
+        )
+    return records
+
+
+def hotspots(count=10000):
+    records = []
+    for index in range(count):
+        records.append(
+            {
+                "locId": "L%d" % random.randint(1000, 9999999),
+                "locName": "%s %s Park" % (_word(6).capitalize(), _word(8)),
+                "countryCode": "US",
+                "subnational1Code": "US-NY",
+                "subnational2Code": "US-NY-%03d" % random.randint(1, 120),
+                "lat": random.uniform(40, 45),
+                "lng": random.uniform(-79, -72),
+                "latestObsDt": "2024-05-%02d 07:%02d" % (index % 28 + 1, index % 60),
+                "numSpeciesAllTime": random.randint(1, 300),
+            }
+        )
+    return records
+
+
+def get_payloads(filenames):
+    if not filenames:
+        return {
+            "taxonomy": json.dumps(taxonomy()).encode("utf-8"),
+            "hotspots": json.dumps(hotspots()).encode("utf-8"),
+        }
+    payloads = {}
+    for filename in filenames:
+        with open(filename, "rb") as fp:
+            payloads[os.path.basename(filename)] = fp.read()
+    return payloads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", help="files containing JSON responses")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="the number of times to decode"
+    )
+    args = parser.parse_args()
+
+    decoders = {}
+    for name in _decoders:
+        try:
+            decoders[name] = get_decoder(name)
+        except ImportError:
+            print("%s is not installed, skipping" % name)
+
+    for label, payload in get_payloads(args.files).items():
+        print("\n%s: %d bytes" % (label, len(payload)))
+        for name, decoder in decoders.items():
+            best = min(
+                timeit.repeat(lambda: decoder(payload), number=1, repeat=args.repeat)
+            )
+            print("  %-8s %8.2f ms" % (name, best * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Measure the time taken by NameSearch to find species as a name is typed.
+
+Run it from the root of the project:
+
+    PYTHONPATH=src python benchmarks/search.py
+
+Synthetic taxonomies, with the same number of records as the real one,
+are generated for each locale. The names are built, like real bird names,
+from a small set of colours, body parts and group names, along with words
+made from common syllables, so the names share sequences of letters, e.g.
+'ler ' or 'row', as heavily as the real ones do. To use the real taxonomy,
+pass an API key:
+
+    PYTHONPATH=src python benchmarks/search.py --key <api key>
+
+or the files with the taxonomy for each locale, saved, for example, with:
+
+    from ebird.api import get_taxonomy, utils
+    utils.save_json("taxonomy-es.json", get_taxonomy(api_key, locale="es"))
+
+    PYTHONPATH=src python benchmarks/search.py taxonomy-en.json taxonomy-es.json
+
+"""
+
+import argparse
+import json
+import random
+import timeit
+
+from ebird.api import get_taxonomy
+from ebird.api.index import NameSearch
+
+COLOURS = (
+    "Black Blue Brown Buff Chestnut Cinnamon Golden Gray Green Olive Orange "
+    "Red Rufous Rusty Scarlet Slaty White Yellow"
+).split()
+
+PARTS = (
+    "backed bellied billed breasted browed capped cheeked chinned crested "
+    "crowned eared faced fronted headed necked rumped tailed throated winged"
+).split()
+
+ADJECTIVES = (
+    "Common Great Greater Lesser Little Long Northern Southern Eastern "
+    "Western Spotted Striped Streaked Plain Scaly Masked Collared Ornate"
+).split()
+
+GROUPS = (
+    "Antbird Antshrike Babbler Bunting Dove Finch Flycatcher Hawk Honeyeater "
+    "Hummingbird Kingfisher Lark Owl Parrot Pigeon Sparrow Swallow Tanager "
+    "Thrush Tyrannulet Warbler White-eye Woodpecker Wren"
+).split()
+
+SYLLABLES = (
+    "an ar ba bo ca da el en er ga ha in ka la li lo ma mi na ni or pa "
+    "ra ri ro sa se ta ti to va"
+).split()
+
+
+def _word(count):
+    return "".join(random.choices(SYLLABLES, k=count)).capitalize()
+
+
+# Like the real names, the modifiers and group names include many which are
+# only used for a few species, e.g. Cassin's or Greenlet, as well as the
+# common ones.
+MODIFIERS = ["%s's" % _word(random.choice((2, 3))) for _ in range(1500)] + [
+    _word(random.choice((3, 4))) for _ in range(1500)
+]
+GROUP_NAMES = [
+    _word(random.choice((2, 3))) + random.choice(("bird", "let", "er", "ling"))
+    for _ in range(600)
+]
+
+
+def _name():
+    words = []
+    if random.random() < 0.6:
+        words.append(random.choice(MODIFIERS))
+    elif random.random() < 0.5:
+        words.append(random.choice(ADJECTIVES))
+    if random.random() < 0.6:
+        words.append("%s-%s" % (random.choice(COLOURS), random.choice(PARTS)))
+    if random.random() < 0.6:
+        words.append(random.choice(GROUPS))
+    else:
+        words.append(random.choice(GROUP_NAMES))
+    return " ".join(words)
+
+
+def taxonomy(count=17000):
+    return [
+        {
+            "speciesCode": "sp%05d" % index,
+            "comName": _name(),
+            "sciName": "%s %s" % (_word(3), _word(3).lower()),
+        }
+        for index in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", help="the taxonomy, one per locale")
+    parser.add_argument("--key", help="an API key, to download the taxonomy")
+    parser.add_argument(
+        "--locales", default="en,es,fr,de", help="the locales to search"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=200, help="the number of times to search"
+    )
+    args = parser.parse_args()
+
+    search = NameSearch()
+    if args.files:
+        for index, filename in enumerate(args.files):
+            with open(filename) as fp:
+                records = json.load(fp)
+            search.add_locale(args.locales.split(",")[index], records)
+    else:
+        for locale in args.locales.split(","):
+            if args.key:
+                records = get_taxonomy(args.key, locale=locale)
+            else:
+                records = taxonomy()
+            search.add_locale(locale, records)
+    print("%d names" % len(search))
+
+    random.seed(1)
+    names = [record["comName"] for record in random.sample(records, 20)]
+    queries = {
+        "prefix": [name[:3] for name in names],
+        "word": [name.split()[-1][:4] for name in names],
+        "misspelt": [name[:4] + name[5:9] for name in names],
+        "swapped": [name[:2] + name[3] + name[2] + name[4:] for name in names],
+    }
+    for label, texts in queries.items():
+        for method in (search.search, search.fuzzy):
+            best = min(
+                timeit.repeat(
+                    lambda: [method(text) for text in texts], number=args.repeat
+                )
+            )
+            average = best * 1000 / args.repeat / len(texts)
+            print("  %-10s %-8s %8.3f ms" % (label, method.__name__, average))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare the memory used by the taxonomy as lists of dicts, as returned
+by get_taxonomy(), and as a TaxonomyTable.
+
+Run it from the root of the project:
+
+    PYTHONPATH=src python benchmarks/table.py --locales 20
+
+A synthetic taxonomy is used, with about 17,000 records in 250 families,
+and the common names changed for each locale.
+
+"""
+
+import argparse
+import json
+import random
+import tracemalloc
+
+from decoders import _word
+
+from ebird.api.constants import LOCALES
+from ebird.api.table import TaxonomyTable
+
+
+def taxonomy(count=17000, families=250):
+    groups = [
+        (_word(7), "%s and %s" % (_word(6), _word(7)), _word(9).capitalize())
+        for _ in range(families)
+    ]
+    orders = [_word(12).capitalize() for _ in range(40)]
+    records = []
+    for index in range(count):
+        code, name, sci_name = groups[index * families // count]
+        records.append(
+            {
+                "sciName": "%s %s" % (_word(8).capitalize(), _word(10)),
+                "comName": "%s %s" % (_word(7).capitalize(), _word(6)),
+                "speciesCode": _word(6),
+                "category": random.choice(["species", "issf", "slash", "spuh"]),
+                "taxonOrder": float(index),
+                "bandingCodes": [_word(4).upper()],
+                "comNameCodes": [_word(4).upper()],
+                "sciNameCodes": [_word(4).upper()],
+                "order": orders[index * len(orders) // count],
+                "familyCode": code,
+                "familyComName": name,
+                "familySciName": sci_name,
+            }
+        )
+    return records
+
+
+def translate(records):
+    # Decode a copy, as each locale would be downloaded separately.
+    records = json.loads(json.dumps(records))
+    for record in records:
+        record["comName"] = "%s %s" % (_word(7).capitalize(), _word(6))
+    return records
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--locales", type=int, default=20, help="the number of locales to add"
+    )
+    args = parser.parse_args()
+
+    base = taxonomy()
+    payloads = [json.dumps(translate(base)) for _ in range(args.locales)]
+
+    lists, size = measure(lambda: [json.loads(payload) for payload in payloads])
+    print("lists of dicts: %8.1f MB" % (size / 1e6))
+
+    def build():
+        table = TaxonomyTable(json.loads(payloads[0]))
+        for locale, payload in zip(sorted(LOCALES.values()), payloads[1:]):
+            table.add_locale(locale, json.loads(payload))
+        return table
+
+    table, size = measure(build)
+    print("TaxonomyTable:  %8.1f MB" % (size / 1e6))
+
+
+if __name__ == "__main__":
+    main()
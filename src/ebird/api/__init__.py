@@ -5,13 +5,14 @@
 __version__ = "3.4.2"
 
 from ebird.api.checklists import get_checklist, get_visits
-from ebird.api.client import Client
+from ebird.api.client import AsyncClient, Client
 from ebird.api.constants import LOCALES
 from ebird.api.hotspots import (
     get_hotspot,
     get_hotspots,
     get_location,
     get_nearby_hotspots,
+    iter_hotspots,
 )
 from ebird.api.observations import (
     get_historic_observations,
@@ -22,6 +23,7 @@ from ebird.api.observations import (
     get_notable_observations,
     get_observations,
     get_species_observations,
+    iter_observations,
 )
 from ebird.api.regions import get_adjacent_regions, get_region, get_regions
 from ebird.api.species import get_species_list
@@ -32,4 +34,5 @@ from ebird.api.taxonomy import (
     get_taxonomy_groups,
     get_taxonomy_locales,
     get_taxonomy_versions,
+    iter_taxonomy,
 )
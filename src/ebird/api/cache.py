@@ -0,0 +1,1186 @@
+"""Classes for caching the responses from the eBird API."""
+
+import hashlib
+import json
+import os
+import re
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict, defaultdict, namedtuple
+from fnmatch import fnmatchcase
+from urllib.parse import parse_qs, urlsplit
+
+# How long, in seconds, responses are cached for each family of endpoints.
+# The longest matching prefix, of the path after the API version, is used.
+# Reference data, such as regions, hotspots and the taxonomy, rarely
+# changes, while the recent observations change all the time.
+DEFAULT_TTLS = {
+    "ref/": 24 * 60 * 60,
+    "product/checklist/view/": 60 * 60,
+    "product/": 5 * 60,
+    "data/obs/": 5 * 60,
+}
+
+DEFAULT_TTL = 5 * 60
+
+# The endpoints where expired responses are kept so they can be revalidated,
+# i.e. the API is asked whether the response has changed rather than
+# downloading it again.
+DEFAULT_REVALIDATE = ("ref/",)
+
+CacheEntry = namedtuple("CacheEntry", ["content", "etag", "last_modified", "digest"])
+
+# The words used in the paths of the endpoints. Any other part of a path is
+# a code, e.g. for a region, location or species, or a date.
+_ENDPOINT_WORDS = frozenset(
+    [
+        "adjacent",
+        "checklist",
+        "data",
+        "ebird",
+        "forms",
+        "geo",
+        "historic",
+        "hotspot",
+        "info",
+        "list",
+        "lists",
+        "nearest",
+        "notable",
+        "obs",
+        "product",
+        "recent",
+        "ref",
+        "region",
+        "spplist",
+        "sppgroup",
+        "stats",
+        "taxa-locales",
+        "taxon",
+        "taxonomy",
+        "top100",
+        "versions",
+        "view",
+    ]
+)
+
+# The events counted, for each endpoint, by Cache.get_stats().
+STATISTICS = (
+    "hits",
+    "misses",
+    "stale",
+    "evictions",
+    "not_modified",
+    "unchanged",
+    "conflicts",
+)
+
+
+def get_endpoint(key):
+    """Get the endpoint, the path after the API version, for a call.
+
+    :param key: the URL for the call, with or without the query string.
+
+    :return: the path, e.g. 'ref/hotspot/US-NY'.
+    :rtype: str
+
+    """
+    path = urlsplit(key).path.lstrip("/")
+    version, sep, endpoint = path.partition("/")
+    return endpoint if sep and version[:1] == "v" else path
+
+
+def get_endpoint_name(key):
+    """Get the name used to group the statistics for the calls to an
+    endpoint.
+
+    :param key: the URL for the call, with or without the query string.
+
+    :return: the endpoint with the codes, e.g. for regions or species,
+    replaced with '*', e.g. 'data/obs/*/recent'.
+    :rtype: str
+
+    """
+    parts = []
+    for segment in get_endpoint(key).split("/"):
+        if segment not in _ENDPOINT_WORDS:
+            if parts and parts[-1] == "*":
+                continue
+            segment = "*"
+        parts.append(segment)
+    return "/".join(parts)
+
+
+def get_codes(key):
+    """Get the codes, e.g. for regions, locations or species, in a call.
+
+    :param key: the URL for the call, with or without the query string.
+
+    :return: the codes in the path and the areas in the 'r' parameter.
+    :rtype: list
+
+    """
+    codes = [
+        segment
+        for segment in get_endpoint(key).split("/")
+        if segment not in _ENDPOINT_WORDS
+    ]
+    for value in parse_qs(urlsplit(key).query).get("r", []):
+        codes.extend(value.split(","))
+    return codes
+
+
+class Cache:
+    """The base class for caches of the responses from the eBird API.
+
+    The cache maps the key for a call, see ebird.api.utils.get_key(), to
+    the bytes returned by the API. The records are decoded each time the
+    cache is read so each caller gets its own copy which can be changed
+    without affecting the cache.
+
+    This class defines the interface used by ebird.api.utils.call(). A
+    backend, where the responses are stored, implements get(), get_stale(),
+    get_entry(), set(), compare_and_set(), ttl(), refresh(), delete(),
+    clear(), keys() and describe(). MemoryCache, SQLiteCache and RedisCache
+    are the backends included.
+
+    :param ttls: a dict mapping the prefix of an endpoint, e.g. 'ref/', to
+    the time, in seconds, to cache the responses. A value of zero means the
+    responses are not cached. The default is DEFAULT_TTLS.
+
+    :param default_ttl: the time to cache responses for endpoints which
+    do not match any of the prefixes.
+
+    :param revalidate: the prefixes of the endpoints where expired responses
+    are kept and revalidated. The default is DEFAULT_REVALIDATE.
+
+    :param max_stale: the time, in seconds, after a response expires that
+    it can still be returned, while it is refreshed in the background
+    (stale-while-revalidate). The default, zero, means expired responses
+    are never returned.
+
+    :param max_refreshes: the maximum number of responses which are
+    refreshed in the background at the same time. If the limit is reached
+    the stale response is returned without being refreshed.
+
+    """
+
+    def __init__(
+        self,
+        ttls=None,
+        default_ttl=DEFAULT_TTL,
+        revalidate=None,
+        max_stale=0,
+        max_refreshes=4,
+    ):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.revalidate = tuple(
+            DEFAULT_REVALIDATE if revalidate is None else revalidate
+        )
+        self.max_stale = max_stale
+        self.max_refreshes = max_refreshes
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
+        self._stats = defaultdict(Counter)
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def get_entry_for(content):
+        """Get the entry to add to the cache for a response.
+
+        :param content: the content returned by the API. If it is a
+        ebird.api.transport.Response then the ETag and Last-Modified
+        headers are saved.
+
+        :return: the content along with the validators, used to check
+        whether the response has changed: the ETag and Last-Modified
+        headers and a hash of the content.
+        :rtype: CacheEntry
+
+        """
+        headers = getattr(content, "headers", None) or {}
+        return CacheEntry(
+            content,
+            headers.get("ETag"),
+            headers.get("Last-Modified"),
+            hashlib.sha256(content).hexdigest(),
+        )
+
+    def get_ttl(self, key):
+        """Get the time to cache the response for a call.
+
+        :param key: the key for the call.
+
+        :return: the time in seconds.
+
+        """
+        endpoint = get_endpoint(key)
+        matches = [prefix for prefix in self.ttls if endpoint.startswith(prefix)]
+        if not matches:
+            return self.default_ttl
+        return self.ttls[max(matches, key=len)]
+
+    def can_revalidate(self, key):
+        """Check whether an expired response for a call is revalidated.
+
+        :param key: the key for the call.
+
+        :return: True if the endpoint matches one of the prefixes in
+        revalidate.
+
+        """
+        return get_endpoint(key).startswith(self.revalidate)
+
+    def record(self, key, name, value=1):
+        """Count an event, such as a hit, for the endpoint of a call.
+
+        :param key: the key for the call.
+
+        :param name: the name of the event, one of STATISTICS.
+
+        :param value: the amount to add, the default is 1.
+
+        """
+        with self._stats_lock:
+            self._stats[get_endpoint_name(key)][name] += value
+
+    def get_stats(self):
+        """Get the statistics for each endpoint.
+
+        The events, see STATISTICS, are counted since the cache was created,
+        or reset_stats() was called, by this process. The number of entries,
+        their size in bytes and their average age, in seconds, describe the
+        responses in the cache now.
+
+        :return: a dict with the statistics for each endpoint, keyed by the
+        name from get_endpoint_name().
+
+        """
+        with self._stats_lock:
+            counters = {name: Counter(stats) for name, stats in self._stats.items()}
+
+        entries = defaultdict(lambda: [0, 0, 0.0])
+        for key, size, age in self.describe():
+            totals = entries[get_endpoint_name(key)]
+            totals[0] += 1
+            totals[1] += size
+            totals[2] += age
+
+        results = {}
+        for name in sorted(set(counters) | set(entries)):
+            stats = counters.get(name, Counter())
+            count, size, age = entries.get(name, (0, 0, 0.0))
+            results[name] = {event: stats[event] for event in STATISTICS}
+            results[name]["entries"] = count
+            results[name]["bytes"] = size
+            results[name]["average_age"] = age / count if count else None
+        return results
+
+    def reset_stats(self):
+        """Set the counts of all the events back to zero."""
+        with self._stats_lock:
+            self._stats.clear()
+
+    def find(self, endpoint=None, region=None):
+        """Find the keys for the responses in the cache.
+
+        :param endpoint: a pattern, e.g. 'data/obs/*', which matches the
+        endpoint, or the name from get_endpoint_name(). The default, None,
+        matches all endpoints.
+
+        :param region: a pattern, e.g. 'US-NY*', which matches any of the
+        codes in the call, see get_codes(). The default, None, matches all
+        regions.
+
+        :return: the keys, sorted.
+        :rtype: list
+
+        """
+        found = []
+        for key in self.keys():
+            if endpoint is not None and not (
+                fnmatchcase(get_endpoint(key), endpoint)
+                or fnmatchcase(get_endpoint_name(key), endpoint)
+            ):
+                continue
+            if region is not None and not any(
+                fnmatchcase(code, region) for code in get_codes(key)
+            ):
+                continue
+            found.append(key)
+        return sorted(found)
+
+    def purge(self, endpoint=None, region=None):
+        """Remove the responses which match an endpoint or region pattern.
+
+        Takes the same arguments as find().
+
+        :return: the number of responses removed.
+
+        """
+        keys = self.find(endpoint, region)
+        for key in keys:
+            self.delete(key)
+        return len(keys)
+
+    def keys(self):
+        """Get the keys for all the responses in the cache.
+
+        :return: the keys.
+        :rtype: list
+
+        """
+        raise NotImplementedError
+
+    def describe(self):
+        """Describe the responses in the cache.
+
+        :return: a list of (key, size, age) tuples, with the size, in bytes,
+        and the age, in seconds, of each response.
+
+        """
+        raise NotImplementedError
+
+    def start_refresh(self, key):
+        """Reserve a place to refresh a stale response in the background.
+
+        :param key: the key for the call.
+
+        :return: True if the response should be refreshed, or False if it is
+        already being refreshed or max_refreshes are in progress.
+
+        """
+        with self._refreshing_lock:
+            if key in self._refreshing or len(self._refreshing) >= self.max_refreshes:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def finish_refresh(self, key):
+        """Release the place reserved with start_refresh().
+
+        :param key: the key for the call.
+
+        """
+        with self._refreshing_lock:
+            self._refreshing.discard(key)
+
+    def get(self, key):
+        """Get a response from the cache.
+
+        :param key: the key for the call.
+
+        :return: the content returned by the API, or None if the response
+        is not in the cache or it has expired.
+
+        """
+        raise NotImplementedError
+
+    def get_stale(self, key):
+        """Get an expired response from the cache, if it expired less than
+        max_stale seconds ago.
+
+        :param key: the key for the call.
+
+        :return: the content returned by the API, or None.
+
+        """
+        raise NotImplementedError
+
+    def get_entry(self, key):
+        """Get a response, and its validators, from the cache, even if it
+        has expired.
+
+        :param key: the key for the call.
+
+        :return: the entry, or None if the response is not in the cache.
+        :rtype: CacheEntry
+
+        """
+        raise NotImplementedError
+
+    def set(self, key, content, ttl=None):
+        """Add a response to the cache.
+
+        :param key: the key for the call.
+
+        :param content: the content returned by the API.
+        :type content: bytes
+
+        :param ttl: the time, in seconds, to keep the response. The default,
+        None, uses get_ttl().
+
+        """
+        raise NotImplementedError
+
+    def compare_and_set(self, key, digest, content, ttl=None):
+        """Add a response to the cache, but only if the cached response has
+        not changed since it was read.
+
+        This is used when the cache is shared, so a response which took a
+        long time to download does not replace a response added in the
+        meantime, by another thread, process or host.
+
+        :param key: the key for the call.
+
+        :param digest: the hash, from the CacheEntry, of the response which
+        was read, or None if there was no response in the cache.
+
+        :param content: the content returned by the API.
+        :type content: bytes
+
+        :param ttl: the time, in seconds, to keep the response. The default,
+        None, uses get_ttl().
+
+        :return: True if the response was added, or False if the cached
+        response changed.
+
+        """
+        raise NotImplementedError
+
+    def ttl(self, key):
+        """Get the time until a cached response expires.
+
+        :param key: the key for the call.
+
+        :return: the time in seconds, which is negative if the response has
+        expired, or None if the response is not in the cache.
+
+        """
+        raise NotImplementedError
+
+    def refresh(self, key, ttl=None):
+        """Restart the time a response is cached for, after the API
+        confirmed it has not changed.
+
+        :param key: the key for the call.
+
+        :param ttl: the time, in seconds, to keep the response. The default,
+        None, uses get_ttl().
+
+        """
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Remove a response from the cache.
+
+        :param key: the key for the call.
+
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove all the responses from the cache."""
+        raise NotImplementedError
+
+
+class MemoryCache(Cache):
+    """A thread-safe cache which keeps the responses in memory.
+
+    The total size of the responses is limited. When the limit is reached
+    the least recently used responses are removed.
+
+    :param max_size: the maximum number of bytes to keep. The default is
+    64MB.
+
+    The other arguments are the same as for Cache.
+
+    """
+
+    def __init__(self, max_size=64 * 1024 * 1024, **kwargs):
+        super().__init__(**kwargs)
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._entries:
+                self.record(key, "misses")
+                return None
+            entry, expires, fetched = self._entries[key]
+            if expires <= now:
+                if now - expires >= self.max_stale and not self.can_revalidate(key):
+                    self._remove(key)
+                self.record(key, "misses")
+                return None
+            self._entries.move_to_end(key)
+            self.record(key, "hits")
+            return entry.content
+
+    def get_stale(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._entries:
+                return None
+            entry, expires, fetched = self._entries[key]
+            if now - expires >= self.max_stale:
+                return None
+            self._entries.move_to_end(key)
+            self.record(key, "stale")
+            return entry.content
+
+    def get_entry(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def set(self, key, content, ttl=None):
+        entry = self.get_entry_for(content)
+        with self._lock:
+            self._set(key, entry, ttl)
+
+    def compare_and_set(self, key, digest, content, ttl=None):
+        entry = self.get_entry_for(content)
+        with self._lock:
+            current = self._entries.get(key)
+            if (current[0].digest if current else None) != digest:
+                return False
+            self._set(key, entry, ttl)
+            return True
+
+    def ttl(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            return self._entries[key][1] - time.monotonic()
+
+    def _set(self, key, entry, ttl):
+        if ttl is None:
+            ttl = self.get_ttl(key)
+        if key in self._entries:
+            self._remove(key)
+        if ttl <= 0 or len(entry.content) > self.max_size:
+            return
+        now = time.monotonic()
+        self._entries[key] = (entry, now + ttl, now)
+        self.size += len(entry.content)
+        while self.size > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.record(oldest, "evictions")
+
+    def refresh(self, key, ttl=None):
+        if ttl is None:
+            ttl = self.get_ttl(key)
+        with self._lock:
+            if key in self._entries:
+                now = time.monotonic()
+                entry = self._entries[key][0]
+                self._entries[key] = (entry, now + ttl, now)
+                self._entries.move_to_end(key)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def describe(self):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, len(entry.content), now - fetched)
+                for key, (entry, expires, fetched) in self._entries.items()
+            ]
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)[0]
+        self.size -= len(entry.content)
+
+
+class SQLiteCache(Cache):
+    """A cache which keeps the responses in an SQLite database.
+
+    The cache is shared by all the processes, on the same host, which use
+    the same file, so a process which starts after another has downloaded
+    the reference data does not need to download it again. The responses
+    are compressed and the total size, after compression, is limited. When
+    the limit is reached the least recently used responses are removed.
+
+    :param path: the path to the SQLite database file.
+
+    :param max_size: the maximum number of bytes to keep. The default is
+    256MB.
+
+    The other arguments are the same as for Cache. The statistics, from
+    get_stats(), count the events in this process, while the entries are
+    those shared by all the processes. A process which is forked from one
+    using the cache opens its own connection to the database.
+
+    """
+
+    def __init__(self, path, max_size=256 * 1024 * 1024, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._inherited = []
+        self._connection = self._connect()
+
+    def _connect(self):
+        connection = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " content BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " fetched REAL NOT NULL,"
+            " ttl REAL NOT NULL,"
+            " accessed REAL NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " digest TEXT NOT NULL,"
+            " keep INTEGER NOT NULL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        return connection
+
+    def _check_process(self):
+        # An SQLite connection cannot be used in a forked process, not even
+        # to close it, so a new one, with a new lock, is opened. The one from
+        # the parent is kept so it is not closed when garbage collected.
+        pid = os.getpid()
+        if pid != self._pid:
+            self._inherited.append(self._connection)
+            self._connection = self._connect()
+            self._lock = threading.Lock()
+            self._pid = pid
+
+    def __len__(self):
+        self._check_process()
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+
+    @property
+    def size(self):
+        """The number of bytes, after compression, in the cache."""
+        self._check_process()
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+
+    def close(self):
+        """Close the connection to the database."""
+        self._check_process()
+        with self._lock:
+            self._connection.close()
+
+    def get(self, key):
+        now = time.time()
+        self._check_process()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content, fetched, ttl FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.record(key, "misses")
+                return None
+            content, fetched, ttl = row
+            if fetched + ttl <= now:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE key = ? AND fetched + ttl + ? <= ?"
+                    " AND NOT keep",
+                    (key, self.max_stale, now),
+                )
+                self.record(key, "misses")
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+        self.record(key, "hits")
+        return zlib.decompress(content)
+
+    def get_stale(self, key):
+        now = time.time()
+        self._check_process()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content FROM responses WHERE key = ? AND fetched + ttl + ? > ?",
+                (key, self.max_stale, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+        self.record(key, "stale")
+        return zlib.decompress(row[0])
+
+    def get_entry(self, key):
+        self._check_process()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content, etag, last_modified, digest"
+                " FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+        content, etag, last_modified, digest = row
+        return CacheEntry(zlib.decompress(content), etag, last_modified, digest)
+
+    def set(self, key, content, ttl=None):
+        self._store(key, content, ttl, False, None)
+
+    def compare_and_set(self, key, digest, content, ttl=None):
+        return self._store(key, content, ttl, True, digest)
+
+    def _store(self, key, content, ttl, check, digest):
+        if ttl is None:
+            ttl = self.get_ttl(key)
+        entry = self.get_entry_for(content)
+        compressed = zlib.compress(content)
+        now = time.time()
+
+        self._check_process()
+
+        with self._lock:
+            cursor = self._connection.cursor()
+            # Lock the database so the response is compared, the size is
+            # checked and the least recently used responses are removed
+            # atomically across processes.
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                row = cursor.execute(
+                    "SELECT digest FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if check and (row[0] if row else None) != digest:
+                    cursor.execute("ROLLBACK")
+                    return False
+                if ttl <= 0 or len(compressed) > self.max_size:
+                    cursor.execute("DELETE FROM responses WHERE key = ?", (key,))
+                else:
+                    cursor.execute(
+                        "INSERT OR REPLACE INTO responses"
+                        " (key, content, size, fetched, ttl, accessed,"
+                        " etag, last_modified, digest, keep)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            key,
+                            compressed,
+                            len(compressed),
+                            now,
+                            ttl,
+                            now,
+                            entry.etag,
+                            entry.last_modified,
+                            entry.digest,
+                            self.can_revalidate(key),
+                        ),
+                    )
+                    self._evict(cursor, now)
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+        return True
+
+    def ttl(self, key):
+        self._check_process()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT fetched + ttl FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return None if row is None else row[0] - time.time()
+
+    def _evict(self, cursor, now):
+        cursor.execute(
+            "DELETE FROM responses WHERE fetched + ttl + ? <= ? AND NOT keep",
+            (self.max_stale, now),
+        )
+        excess = (
+            cursor.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            - self.max_size
+        )
+        if excess <= 0:
+            return
+        keys = []
+        for key, size in cursor.execute(
+            "SELECT key, size FROM responses ORDER BY accessed"
+        ).fetchall():
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        cursor.executemany("DELETE FROM responses WHERE key = ?", keys)
+        for (key,) in keys:
+            self.record(key, "evictions")
+
+    def refresh(self, key, ttl=None):
+        if ttl is None:
+            ttl = self.get_ttl(key)
+        now = time.time()
+        self._check_process()
+        with self._lock:
+            self._connection.execute(
+                "UPDATE responses SET fetched = ?, ttl = ?, accessed = ? WHERE key = ?",
+                (now, ttl, now, key),
+            )
+
+    def keys(self):
+        self._check_process()
+        with self._lock:
+            rows = self._connection.execute("SELECT key FROM responses").fetchall()
+        return [row[0] for row in rows]
+
+    def describe(self):
+        now = time.time()
+        self._check_process()
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT key, size, fetched FROM responses"
+            ).fetchall()
+        return [(key, size, now - fetched) for key, size, fetched in rows]
+
+    def delete(self, key):
+        self._check_process()
+        with self._lock:
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self):
+        self._check_process()
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+
+
+class RedisError(Exception):
+    """An error returned by a Redis server."""
+
+
+def encode_command(*args):
+    """Encode a command using the Redis protocol (RESP).
+
+    :param args: the name of the command and its arguments. Strings are
+    encoded as UTF-8 and numbers are formatted.
+
+    :return: the bytes to send to the server.
+    :rtype: bytes
+
+    """
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif not isinstance(arg, bytes):
+            arg = str(arg).encode("ascii")
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+def read_reply(reader):
+    """Read a reply using the Redis protocol (RESP).
+
+    :param reader: a binary file, e.g. from socket.makefile().
+
+    :return: the reply: a str for a status, an int, bytes, None, a list
+    or, for an error, a RedisError, which is returned rather than raised
+    so the replies to any other commands sent at the same time can still
+    be read.
+
+    :raises ConnectionError: if the connection was closed.
+
+    """
+    line = reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed by the Redis server")
+    kind, value = line[:1], line[1:-2]
+    if kind == b"+":
+        return value.decode("utf-8")
+    if kind == b"-":
+        return RedisError(value.decode("utf-8"))
+    if kind == b":":
+        return int(value)
+    if kind == b"$":
+        length = int(value)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("Connection closed by the Redis server")
+        return data[:-2]
+    if kind == b"*":
+        length = int(value)
+        if length < 0:
+            return None
+        return [read_reply(reader) for _ in range(length)]
+    raise RedisError("Unknown reply from the Redis server: %r" % line)
+
+
+class RedisCache(Cache):
+    """A cache which keeps the responses in a Redis server.
+
+    The cache is shared by all the processes, on any host, which use the
+    same server, database and prefix. Only the Redis protocol (RESP) is
+    used, over a socket, so no client library is needed and compatible
+    servers, such as Valkey, also work.
+
+    Each response is stored, compressed, in one value along with its
+    validators. Responses which are not revalidated expire on the server
+    once they are older than their ttl plus max_stale. The total size is
+    not limited here, instead set maxmemory and an LRU maxmemory-policy
+    on the server.
+
+    Errors connecting to the server are raised. The connection is opened
+    again on the next call.
+
+    :param host: the name or address of the server.
+
+    :param port: the port the server listens on.
+
+    :param db: the number of the database to use.
+
+    :param password: the password, if the server requires one.
+
+    :param prefix: added to each key so other data can be kept in the
+    same database.
+
+    :param timeout: the time, in seconds, to wait for the server.
+
+    The other arguments are the same as for Cache.
+
+    """
+
+    def __init__(
+        self,
+        host="localhost",
+        port=6379,
+        db=0,
+        password=None,
+        prefix="ebird:",
+        timeout=5,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.timeout = timeout
+        self._socket = None
+        self._reader = None
+        # Re-entrant so all the commands in a transaction can be sent
+        # while holding the lock.
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.keys())
+
+    @property
+    def size(self):
+        """The number of bytes, after compression, in the cache."""
+        return sum(size for key, size, age in self.describe())
+
+    def close(self):
+        """Close the connection to the server."""
+        with self._lock:
+            if self._socket is not None:
+                self._reader.close()
+                self._socket.close()
+                self._socket = self._reader = None
+
+    def _connect(self):
+        self._socket = socket.create_connection((self.host, self.port), self.timeout)
+        self._reader = self._socket.makefile("rb")
+        if self.password is not None:
+            self._execute(("AUTH", self.password))
+        if self.db:
+            self._execute(("SELECT", self.db))
+
+    def _execute(self, *commands):
+        """Send one or more commands, together, and read the replies.
+
+        :raises RedisError: if the server returns an error.
+
+        """
+        with self._lock:
+            if self._socket is None:
+                self._connect()
+            try:
+                self._socket.sendall(b"".join(encode_command(*cmd) for cmd in commands))
+                replies = [read_reply(self._reader) for _ in commands]
+            except OSError:
+                self.close()
+                raise
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def _command(self, *args):
+        return self._execute(args)[0]
+
+    def _read(self, key):
+        """Get the metadata and the compressed content for a response."""
+        value = self._command("GET", self.prefix + key)
+        if value is None:
+            return None, None
+        metadata, _, compressed = value.partition(b"\n")
+        return json.loads(metadata), compressed
+
+    def _get_set_command(self, key, metadata, compressed):
+        value = json.dumps(metadata).encode("utf-8") + b"\n" + compressed
+        if self.can_revalidate(key):
+            return "SET", self.prefix + key, value
+        expires = max(int((metadata["ttl"] + self.max_stale) * 1000), 1)
+        return "SET", self.prefix + key, value, "PX", expires
+
+    def _get_store_command(self, key, content, ttl):
+        if ttl is None:
+            ttl = self.get_ttl(key)
+        if ttl <= 0:
+            return "DEL", self.prefix + key
+        entry = self.get_entry_for(content)
+        metadata = {
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "digest": entry.digest,
+            "fetched": time.time(),
+            "ttl": ttl,
+        }
+        return self._get_set_command(key, metadata, zlib.compress(content))
+
+    def _update(self, key, get_command):
+        """Change a response using an optimistic transaction, so it is left
+        unchanged if another client changes it first.
+
+        :param key: the key for the call.
+
+        :param get_command: a function which takes the metadata and the
+        compressed content, or (None, None), for the current response and
+        returns the command to run, or None to leave it unchanged.
+
+        :return: True if the command was run.
+
+        """
+        with self._lock:
+            self._command("WATCH", self.prefix + key)
+            command = get_command(*self._read(key))
+            if command is None:
+                self._command("UNWATCH")
+                return False
+            return self._execute(("MULTI",), command, ("EXEC",))[2] is not None
+
+    def get(self, key):
+        metadata, compressed = self._read(key)
+        if metadata is None or metadata["fetched"] + metadata["ttl"] <= time.time():
+            self.record(key, "misses")
+            return None
+        self.record(key, "hits")
+        return zlib.decompress(compressed)
+
+    def get_stale(self, key):
+        metadata, compressed = self._read(key)
+        if metadata is None:
+            return None
+        if metadata["fetched"] + metadata["ttl"] + self.max_stale <= time.time():
+            return None
+        self.record(key, "stale")
+        return zlib.decompress(compressed)
+
+    def get_entry(self, key):
+        metadata, compressed = self._read(key)
+        if metadata is None:
+            return None
+        return CacheEntry(
+            zlib.decompress(compressed),
+            metadata["etag"],
+            metadata["last_modified"],
+            metadata["digest"],
+        )
+
+    def set(self, key, content, ttl=None):
+        self._execute(self._get_store_command(key, content, ttl))
+
+    def compare_and_set(self, key, digest, content, ttl=None):
+        command = self._get_store_command(key, content, ttl)
+
+        def get_command(metadata, compressed):
+            current = metadata["digest"] if metadata else None
+            return command if current == digest else None
+
+        return self._update(key, get_command)
+
+    def ttl(self, key):
+        metadata, compressed = self._read(key)
+        if metadata is None:
+            return None
+        return metadata["fetched"] + metadata["ttl"] - time.time()
+
+    def refresh(self, key, ttl=None):
+        if ttl is None:
+            ttl = self.get_ttl(key)
+
+        def get_command(metadata, compressed):
+            if metadata is None:
+                return None
+            metadata.update(fetched=time.time(), ttl=ttl)
+            return self._get_set_command(key, metadata, compressed)
+
+        self._update(key, get_command)
+
+    def _scan(self):
+        pattern = re.sub(r"([*?\[\]\\])", r"\\\1", self.prefix) + "*"
+        cursor = b"0"
+        while True:
+            cursor, names = self._command(
+                "SCAN", cursor, "MATCH", pattern, "COUNT", 1000
+            )
+            yield from names
+            if cursor == b"0":
+                break
+
+    def keys(self):
+        start = len(self.prefix.encode("utf-8"))
+        return [name[start:].decode("utf-8") for name in self._scan()]
+
+    def describe(self):
+        now = time.time()
+        results = []
+        for key in self.keys():
+            metadata, compressed = self._read(key)
+            if metadata is not None:
+                results.append((key, len(compressed), now - metadata["fetched"]))
+        return results
+
+    def delete(self, key):
+        self._command("DEL", self.prefix + key)
+
+    def clear(self):
+        names = list(self._scan())
+        while names:
+            self._command("DEL", *names[:1000])
+            del names[:1000]
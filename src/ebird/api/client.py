@@ -2,7 +2,12 @@
 
 """Classes for simplifying calls to the eBird API."""
 
+import asyncio
+import contextvars
+import functools
 import socket
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.error import HTTPError
 
 from ebird.api import (
     checklists,
@@ -12,10 +17,109 @@ from ebird.api import (
     regions,
     statistics,
     taxonomy,
+    utils,
 )
+from ebird.api.singleflight import SingleFlight
+from ebird.api.transport import AsyncConnectionPool
 from ebird.api.validation import clean_locale
 
 
+def _configured(method):
+    """Make the API calls in a method using the settings from the Client."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with utils.settings(**self.get_settings()):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class Batch:
+    """Make calls to the API concurrently, using a pool of threads.
+
+    A Batch is created with Client.batch() and used as a context manager,
+    which waits for all the calls to finish when the block exits:
+
+        with client.batch(max_workers=8) as batch:
+            visits = client.get_visits("US-NY")
+            checklists = batch.map(client.get_checklist, [v["subId"] for v in visits])
+
+    Any callable can be used, so methods of Client and the API functions,
+    e.g. get_checklist, work equally well. The settings (see
+    ebird.api.utils.settings()) in effect when a call is submitted are
+    used when it runs.
+
+    :param max_workers: the number of threads used to make the calls.
+
+    """
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Wait for all the calls to finish then stop the threads."""
+        self._executor.shutdown(wait=True)
+
+    def submit(self, func, *args, **kwargs):
+        """Schedule a call.
+
+        :param func: the method or function to call.
+
+        :param args: the positional arguments for the function.
+
+        :param kwargs: the keyword arguments for the function.
+
+        :return: the Future for the result of the call.
+        :rtype: concurrent.futures.Future
+
+        """
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, func, *args, **kwargs)
+
+    def map(self, func, arguments, return_exceptions=True):
+        """Call a function for each set of arguments and wait for the results.
+
+        :param func: the method or function to call.
+
+        :param arguments: an iterable with the arguments for each call. Each
+        item is either a tuple of positional arguments or, when the function
+        only needs one argument, the value itself.
+
+        :param return_exceptions: if True (the default) an error in one call
+        does not stop the others. The exception raised is returned in place
+        of the result. If False the first error is raised, once all the
+        calls have finished.
+
+        :return: the results, in the same order as the arguments.
+        :rtype: list
+
+        """
+        futures = [
+            self.submit(func, *(args if isinstance(args, tuple) else (args,)))
+            for args in arguments
+        ]
+        wait(futures)
+
+        results = []
+        for future in futures:
+            error = future.exception()
+            if error is None:
+                results.append(future.result())
+            elif return_exceptions:
+                results.append(error)
+            else:
+                raise error
+        return results
+
+
 class Client:
     """Client class to simplify interacting with the API calls.
 
@@ -28,8 +132,24 @@ class Client:
     cannot be validated; URLError if there is an error with the connection
     to the eBird site or HTTPError if the eBird API returns an error.
 
+    The attributes named in Client.settings, e.g. pool and limiter, hold the
+    settings used for sending requests to the API. Any that are None use the
+    defaults set with ebird.api.utils.configure().
+
     """
 
+    # The attributes which hold settings for ebird.api.utils.settings().
+    settings = (
+        "pool",
+        "metrics",
+        "limiter",
+        "retry",
+        "coalesce",
+        "decoder",
+        "cache",
+        "names",
+    )
+
     def __init__(self, api_key, locale):
         self.api_key = api_key
         self.locale = clean_locale(locale)
@@ -43,8 +163,97 @@ class Client:
         self.hotspot = False
         self.provisional = True
         self.sort = "date"
+        self.pool = None
+        self.metrics = None
+        self.limiter = None
+        self.retry = None
+        self.coalesce = None
+        self.decoder = None
+        self.cache = None
+        self.names = None
         socket.setdefaulttimeout(constants.DEFAULT_TIMEOUT)
 
+    def batch(self, max_workers=8):
+        """Get a Batch for making calls concurrently.
+
+        Each thread keeps a connection open so you should also increase
+        the size of the ConnectionPool if max_workers is larger.
+
+        :param max_workers: the number of threads used to make the calls.
+
+        :return: the Batch, to be used as a context manager.
+
+        """
+        return Batch(max_workers=max_workers)
+
+    def get_settings(self):
+        """Get the settings, which are not None, used for calls to the API.
+
+        :return: a dict with the name and value for each setting.
+
+        """
+        return {
+            name: getattr(self, name)
+            for name in self.settings
+            if getattr(self, name) is not None
+        }
+
+    def get_cache(self):
+        """Get the Cache used for calls made with the client.
+
+        :return: Client.cache if it is set, otherwise the default cache set
+        with ebird.api.utils.configure(), which may be None.
+
+        """
+        return self.cache if self.cache is not None else utils.get_setting("cache")
+
+    def cache_stats(self):
+        """Get the statistics, for each endpoint, from the cache.
+
+        :return: a dict with the hits, misses, stale responses returned,
+        evictions and revalidation outcomes (not_modified and unchanged)
+        for each endpoint, along with the number of entries, their size and
+        their average age. See ebird.api.cache.Cache.get_stats().
+
+        """
+        cache = self.get_cache()
+        return {} if cache is None else cache.get_stats()
+
+    def reset_cache_stats(self):
+        """Set the counts of the events in the cache statistics to zero."""
+        cache = self.get_cache()
+        if cache is not None:
+            cache.reset_stats()
+
+    def cached_keys(self, endpoint=None, region=None):
+        """List the keys for the responses in the cache.
+
+        :param endpoint: a pattern, e.g. 'data/obs/*', which matches the
+        endpoint for the call.
+
+        :param region: a pattern, e.g. 'US-NY*', which matches the codes for
+        the regions, locations or species in the call.
+
+        :return: the keys, which are the URLs for the calls.
+        :rtype: list
+
+        """
+        cache = self.get_cache()
+        return [] if cache is None else cache.find(endpoint, region)
+
+    def purge_cache(self, endpoint=None, region=None):
+        """Remove responses from the cache.
+
+        Takes the same arguments as cached_keys(). If neither is given then
+        all the responses are removed.
+
+        :return: the number of responses removed.
+
+        """
+        cache = self.get_cache()
+        return 0 if cache is None else cache.purge(endpoint, region)
+
+    @_configured
     def get_observations(self, area):
         """Get recent observations (up to 30 days ago) for a region or location.
 
@@ -66,6 +275,7 @@ class Client:
             category=self.category,
         )
 
+    @_configured
     def get_notable_observations(self, area):
         """Get recent observations of a rare species for a region or location
 
@@ -85,6 +295,7 @@ class Client:
             detail=self.detail,
         )
 
+    @_configured
     def get_species_observations(self, species, area):
         """Get recent observations for a given species in a region.
 
@@ -109,6 +320,7 @@ class Client:
             category=self.category,
         )
 
+    @_configured
     def get_historic_observations(self, area, date):
         """Get recent observations for a region.
 
@@ -132,6 +344,7 @@ class Client:
             category=self.category,
         )
 
+    @_configured
     def get_nearby_observations(self, lat, lng, dist=25):
         """Get nearby recent observations of each species.
 
@@ -158,6 +371,7 @@ class Client:
             category=self.category,
         )
 
+    @_configured
     def get_nearby_notable(self, lat, lng, dist=25):
         """Get the nearby, recent observations of rare species.
 
@@ -183,6 +397,7 @@ class Client:
             detail=self.detail,
         )
 
+    @_configured
     def get_nearby_species(self, species, lat, lng, dist=25):
         """Get most recent observation of a species nearby.
 
@@ -213,6 +428,7 @@ class Client:
             category=self.category,
         )
 
+    @_configured
     def get_nearest_species(self, species, lat, lng, dist=25):
         """Get most recent observation of a species nearby.
 
@@ -241,6 +457,7 @@ class Client:
             hotspot=self.hotspot,
         )
 
+    @_configured
     def get_hotspots(self, region, back=14):
         """List all hotspots within a region.
 
@@ -253,6 +470,7 @@ class Client:
         """
         return hotspots.get_hotspots(self.api_key, region, back)
 
+    @_configured
     def get_nearby_hotspots(self, lat, lng, dist=25):
         """Get the list of nearby hotspots.
 
@@ -270,6 +488,7 @@ class Client:
             self.api_key, lat, lng, dist, back=self.back
         )
 
+    @_configured
     def get_hotspot(self, loc_id):
         """Get the geographical details of a hotspot.
 
@@ -280,6 +499,7 @@ class Client:
         """
         return hotspots.get_hotspot(self.api_key, loc_id)
 
+    @_configured
     def get_regions(self, rtype, region):
         """Get the list of sub-regions or a given region.
 
@@ -294,6 +514,7 @@ class Client:
         """
         return regions.get_regions(self.api_key, rtype, region)
 
+    @_configured
     def get_adjacent_regions(self, region):
         """Get the regions adjacent to a given region.
 
@@ -305,6 +526,7 @@ class Client:
         """
         return regions.get_adjacent_regions(self.api_key, region)
 
+    @_configured
     def get_region(self, region):
         """Get the geographical details of a country, region or sub-region.
 
@@ -315,6 +537,7 @@ class Client:
         """
         return regions.get_region(self.api_key, region)
 
+    @_configured
     def get_visits(self, area, date=None):
         """
         Get the list of checklists for an area. The most recent checklists are
@@ -332,6 +555,7 @@ class Client:
             self.api_key, area, date, max_results=self.max_visits
         )
 
+    @_configured
     def get_checklist(self, sub_id):
         """
         Get the contents of a checklist.
@@ -343,6 +567,7 @@ class Client:
         """
         return checklists.get_checklist(self.api_key, sub_id)
 
+    @_configured
     def get_top_100(self, region, date, rank="spp"):
         """
         Get the observers who have seen the most species or submitted the
@@ -362,6 +587,7 @@ class Client:
             self.api_key, region, date, rank=rank, max_results=self.max_observers
         )
 
+    @_configured
     def get_totals(self, area, date):
         """
         Get the number of contributors, checklists submitted and species
@@ -377,6 +603,7 @@ class Client:
         """
         return statistics.get_totals(self.api_key, area, date)
 
+    @_configured
     def get_taxonomy(self):
         """Get the full or specific subset of the taxonomy used by eBird.
 
@@ -385,6 +612,7 @@ class Client:
         """
         return taxonomy.get_taxonomy(self.api_key, self.category, locale=self.locale)
 
+    @_configured
     def get_taxonomy_forms(self, code):
         """Get all the sub-specific forms of a given species.
 
@@ -393,6 +621,7 @@ class Client:
         """
         return taxonomy.get_taxonomy_forms(self.api_key, code)
 
+    @_configured
     def get_taxonomy_groups(self):
         """Get the names of the groups of species used in the taxonomy.
 
@@ -401,6 +630,7 @@ class Client:
         """
         return taxonomy.get_taxonomy_groups(self.api_key, locale=self.locale)
 
+    @_configured
     def get_taxonomy_versions(self):
         """Get all versions of the taxonomy, indicating which is the latest.
 
@@ -408,3 +638,254 @@ class Client:
 
         """
         return taxonomy.get_taxonomy_versions(self.api_key)
+
+
+def _coroutine(method):
+    """Turn a method of Client into a coroutine for AsyncClient."""
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        return await self.call(method, *args, **kwargs)
+
+    return wrapper
+
+
+class AsyncClient(Client):
+    """An asyncio version of Client.
+
+    The methods are the same as Client, and use the same attributes, but
+    they are coroutines, e.g.
+
+        async with AsyncClient(api_key, "en") as client:
+            results = await asyncio.gather(
+                *[client.get_observations(region) for region in regions]
+            )
+
+    The requests are sent using an AsyncConnectionPool so many requests
+    can be waiting for a response at the same time. The number of requests
+    sent at the same time is limited by max_concurrency.
+
+    If a task is cancelled then the connection used for the request is
+    closed, so the pool never contains connections with a response only
+    partly read.
+
+    """
+
+    def __init__(self, api_key, locale, max_concurrency=10):
+        super().__init__(api_key, locale)
+        self.pool = AsyncConnectionPool()
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._loop = None
+        self._refreshes = set()
+        self._name_loads = SingleFlight()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close all the idle connections in the pool."""
+        self.pool.close()
+
+    async def call(self, method, *args, **kwargs):
+        """Call a method from Client, sending the request asynchronously.
+
+        :param method: the method, e.g. Client.get_observations.
+
+        :param args: the positional arguments for the method.
+
+        :param kwargs: the keyword arguments for the method.
+
+        :return: the records decoded from the JSON payload.
+
+        """
+        prepared = utils.prepare(method, self, *args, **kwargs)
+
+        with utils.settings(**self.get_settings()):
+            url, params, headers = prepared
+            params, locale = utils.localize_parameters(url, params)
+            records = await self._call(utils.PreparedCall(url, params, headers))
+            if locale is not None:
+                names = utils.get_setting("names")
+                records = names.translate(records, await self._load_names(locale))
+            return records
+
+    async def _call(self, prepared):
+        """Get the records for a call, from the cache or the API."""
+        key = utils.get_key(prepared.url, prepared.params)
+        cache = utils.get_setting("cache")
+        content = None
+
+        if cache is not None:
+
+            def lookup():
+                content = cache.get(key)
+                if content is not None:
+                    return content, False
+                content = utils.get_stale(cache, key)
+                return content, content is not None and cache.start_refresh(key)
+
+            content, refresh = await self._run_in_thread(lookup)
+            if refresh:
+                self._refresh(cache, key, prepared)
+
+        if content is None:
+            coalesce = utils.get_setting("coalesce")
+            if coalesce is None:
+                content = await self._fetch(key, prepared)
+            else:
+                content = await coalesce.call_async(
+                    key,
+                    lambda: self._fetch(key, prepared),
+                    utils.get_setting("metrics"),
+                )
+
+        return utils.get_json(content)
+
+    async def _load_names(self, locale):
+        """Get the common names for a locale, from the names setting,
+        downloading the taxonomy if they are not loaded.
+
+        Tasks which need the same locale at the same time wait for a single
+        download, the same way CommonNames.load() works for threads.
+
+        """
+        names = utils.get_setting("names")
+        table = names.get_names(locale)
+        if table is not None:
+            return table
+
+        async def load():
+            table = names.get_names(locale)
+            if table is not None:
+                return table
+            if names.store is not None:
+                # The store uses SQLite and the synchronous API functions,
+                # so run it in a thread, with the default, synchronous, pool
+                # in place of the AsyncConnectionPool.
+                def load_store():
+                    with utils.settings(pool=utils._settings["pool"]):
+                        return names.load(self.api_key, locale)
+
+                return await self._run_in_thread(load_store)
+            prepared = utils.prepare(taxonomy.get_taxonomy, self.api_key, locale=locale)
+            return names.set_names(locale, await self._call(prepared))
+
+        return await self._name_loads.call_async((id(names), locale), load)
+
+    def _refresh(self, cache, key, prepared):
+        """Refresh a stale response in a background task."""
+
+        async def refresh():
+            try:
+                await self._fetch(key, prepared)
+            except Exception:
+                metrics = utils.get_setting("metrics")
+                if metrics is not None:
+                    metrics.increment("refresh_errors")
+            finally:
+                await self._run_in_thread(cache.finish_refresh, key)
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    async def _fetch(self, key, prepared):
+        """Get the content from the eBird API and add it to the cache."""
+        url, params, headers = prepared
+        cache = utils.get_setting("cache")
+        if cache is None:
+            return await self.get_response(url, params, headers)
+        entry = await self._run_in_thread(utils.get_cached_entry, cache, key)
+        headers = utils.get_conditional_headers(headers, entry)
+        try:
+            content = await self.get_response(url, params, headers)
+        except HTTPError as error:
+            return await self._run_in_thread(
+                utils.get_not_modified, cache, key, entry, error
+            )
+        return await self._run_in_thread(utils.update_cache, cache, key, entry, content)
+
+    async def _run_in_thread(self, func, *args):
+        """Call a function in the event loop's default executor, e.g. to use
+        the cache, so a backend which waits, on a socket or a lock, does not
+        block the other tasks. The function runs in a copy of the context
+        so it uses the same settings.
+
+        """
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            None, context.run, func, *args
+        )
+
+    async def get_response(self, url, params, headers):
+        """Get the content from the eBird API.
+
+        This is the asyncio version of ebird.api.utils.get_response(), which
+        uses the same settings for the limiter, retry policy and metrics.
+
+        :param url: the URL for the API call.
+
+        :param params: the query parameters for the API call.
+
+        :param headers: the headers to add to the request.
+
+        :return: the content returned by the API.
+        :rtype: ebird.api.transport.Response
+
+        """
+        url = utils.get_url(url, params)
+
+        metrics = utils.get_setting("metrics")
+        limiter = utils.get_setting("limiter")
+        retry = utils.get_setting("retry")
+
+        # Create the semaphore here so it belongs to the running event loop,
+        # and again if the client is used in a new one, e.g. in a second
+        # call to asyncio.run().
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+
+        async def send():
+            async with self._semaphore:
+                if limiter is not None:
+                    await limiter.acquire_async(headers.get("X-eBirdApiToken"))
+                return await self.pool.request(url, headers)
+
+        if retry is None:
+            content = await send()
+        else:
+            content = await retry.call_async(send, metrics)
+
+        if metrics is not None:
+            metrics.record_response(url, content)
+
+        return content
+
+    get_observations = _coroutine(Client.get_observations)
+    get_notable_observations = _coroutine(Client.get_notable_observations)
+    get_species_observations = _coroutine(Client.get_species_observations)
+    get_historic_observations = _coroutine(Client.get_historic_observations)
+    get_nearby_observations = _coroutine(Client.get_nearby_observations)
+    get_nearby_notable = _coroutine(Client.get_nearby_notable)
+    get_nearby_species = _coroutine(Client.get_nearby_species)
+    get_nearest_species = _coroutine(Client.get_nearest_species)
+    get_hotspots = _coroutine(Client.get_hotspots)
+    get_nearby_hotspots = _coroutine(Client.get_nearby_hotspots)
+    get_hotspot = _coroutine(Client.get_hotspot)
+    get_regions = _coroutine(Client.get_regions)
+    get_adjacent_regions = _coroutine(Client.get_adjacent_regions)
+    get_region = _coroutine(Client.get_region)
+    get_visits = _coroutine(Client.get_visits)
+    get_checklist = _coroutine(Client.get_checklist)
+    get_top_100 = _coroutine(Client.get_top_100)
+    get_totals = _coroutine(Client.get_totals)
+    get_taxonomy = _coroutine(Client.get_taxonomy)
+    get_taxonomy_forms = _coroutine(Client.get_taxonomy_forms)
+    get_taxonomy_groups = _coroutine(Client.get_taxonomy_groups)
+    get_taxonomy_versions = _coroutine(Client.get_taxonomy_versions)
@@ -1,8 +1,11 @@
 """Functions for fetching information about hotspots."""
 
+import threading
+import time
+from collections import OrderedDict
 from urllib.error import HTTPError
 
-from ebird.api.utils import call
+from ebird.api.utils import call, get_stream, is_preparing, prepare
 from ebird.api.validation import (
     clean_back,
     clean_dist,
@@ -17,6 +20,47 @@ NEARBY_HOTSPOTS_URL = "https://api.ebird.org/v2/ref/hotspot/geo"
 HOTSPOT_INFO_URL = "https://api.ebird.org/v2/ref/hotspot/info/%s"
 LOCATION_INFO_URL = "https://api.ebird.org/v2/ref/region/info/%s"
 
+# How long, in seconds, get_location() remembers that a location is private,
+# and the details it returned for the location.
+PRIVATE_LOCATION_TTL = 30 * 24 * 60 * 60
+LOCATION_TTL = 24 * 60 * 60
+
+# The maximum number of locations remembered.
+MAX_LOCATIONS = 10000
+
+
+class _Memo:
+    """A thread-safe, size-limited store for values which expire."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value, expires = self._values.get(key, (None, 0))
+            if expires <= time.monotonic():
+                self._values.pop(key, None)
+                return None
+            self._values.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._values[key] = (value, time.monotonic() + ttl)
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+_private_locations = _Memo(MAX_LOCATIONS)
+_locations = _Memo(MAX_LOCATIONS)
+
 
 def get_hotspots(token, region, back=None):
     """List all hotspots within a region.
@@ -186,22 +230,47 @@ def get_location(token, loc_id):
     # get_region() does not return "isHotspot" in the results, so we
     # try get_hotspot() first and if the call fails with HTTP 410 Gone,
     # indicating it's a private location, we call get_region and
-    # massage the result.
+    # massage the result. Private locations are remembered so the next
+    # time get_region is called directly, and the result is memoized.
+
+    loc_id = clean_location(loc_id)
+    preparing = is_preparing()
+
+    if not preparing:
+        result = _locations.get(loc_id)
+        if result is not None:
+            return dict(result)
 
-    try:
-        return get_hotspot(token, loc_id)
-    except HTTPError as err:
-        if err.code != 410:
-            raise
+    if preparing or not _private_locations.get(loc_id):
+        try:
+            return get_hotspot(token, loc_id)
+        except HTTPError as err:
+            if err.code != 410:
+                raise
+        _private_locations.set(loc_id, True, PRIVATE_LOCATION_TTL)
 
-    url = LOCATION_INFO_URL % clean_location(loc_id)
+    url = LOCATION_INFO_URL % loc_id
 
     headers = {
         "X-eBirdApiToken": token,
     }
 
-    data: dict = call(url, {}, headers)
+    result = _flatten_location(call(url, {}, headers))
+    _locations.set(loc_id, result, LOCATION_TTL)
+
+    return dict(result)
+
+
+def clear_locations():
+    """Forget the private locations, and their details, remembered by
+    get_location()."""
+    _private_locations.clear()
+    _locations.clear()
 
+
+def _flatten_location(data):
+    """Convert the details of a region, returned by get_region(), to the
+    format returned by get_hotspot()."""
     result = {
         "locId": data["code"],
         "name": data["result"],
@@ -237,3 +306,27 @@ def get_location(token, loc_id):
     result["hierarchicalName"] = result["name"] + full_name
 
     return result
+
+
+def iter_hotspots(*args, **kwargs):
+    """Iterate over all the hotspots within a region.
+
+    This takes the same arguments as get_hotspots() but the records are
+    decoded and yielded one at a time as the response is read, rather than
+    all at once when it is complete. That keeps the memory used small when
+    fetching all the hotspots for a country.
+
+    :return: an iterator over the hotspots.
+
+    :raises ValueError: if an invalid region code is given or if the value for
+    'back', if given, is not in the range 1..30. The arguments are checked,
+    and the request sent, when this function is called, not when the first
+    record is read.
+
+    :raises URLError if there is an error with the connection to the
+    eBird site.
+
+    :raises HTTPError if the eBird API returns an error.
+
+    """
+    return get_stream(*prepare(get_hotspots, *args, **kwargs))
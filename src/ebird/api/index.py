@@ -0,0 +1,770 @@
+"""Classes for looking up species in the eBird taxonomy."""
+
+import heapq
+import threading
+from bisect import bisect_left
+from collections import Counter
+from operator import itemgetter
+
+from ebird.api import constants, taxonomy
+from ebird.api.client import Batch
+from ebird.api.validation import (
+    clean_categories,
+    clean_locale,
+    clean_species_code,
+)
+
+# The number of names, in the lists for each sequence of four characters,
+# which are counted to find the candidates for a fuzzy search.
+MAX_POSTINGS = 2000
+
+# The number of candidates which are scored in a fuzzy search.
+MAX_CANDIDATES = 50
+
+
+def normalize_name(name):
+    """Normalize a name so lookups ignore differences in case and spacing.
+
+    :param name: a common or scientific name.
+
+    :return: the name, case-folded, with runs of whitespace replaced by a
+    single space.
+    :rtype: str
+
+    """
+    return " ".join(name.split()).casefold()
+
+
+class TaxonomyIndex:
+    """An index of the taxonomy, built once, for looking up species.
+
+    Looking up a species by scanning the list returned by get_taxonomy()
+    means checking around 17,000 records each time. The index is built
+    from the same list and uses dicts, so each lookup takes the same time
+    however large the taxonomy is. Names are matched ignoring the case and
+    any extra whitespace.
+
+        index = TaxonomyIndex(get_taxonomy(api_key))
+        index.get_by_banding_code("HOLA")["sciName"]  # 'Eremophila alpestris'
+
+    The records are the ones passed in, not copies, so they should not be
+    changed once the index is built.
+
+    :param records: the taxonomy, as returned by get_taxonomy().
+
+    :param locale: the language used for the common names in the records.
+
+    """
+
+    def __init__(self, records, locale=constants.DEFAULT_LOCALE):
+        self.locale = clean_locale(locale)
+        self.records = list(records)
+        self._codes = {}
+        self._scientific_names = {}
+        self._common_names = {self.locale: {}}
+        self._banding_codes = {}
+        self._categories = {}
+
+        common_names = self._common_names[self.locale]
+
+        for record in self.records:
+            self._codes[record["speciesCode"]] = record
+            self._scientific_names.setdefault(normalize_name(record["sciName"]), record)
+            common_names.setdefault(normalize_name(record["comName"]), record)
+            for code in record.get("bandingCodes") or ():
+                self._banding_codes.setdefault(code.upper(), record)
+            self._categories.setdefault(record.get("category"), []).append(record)
+
+        self._category_codes = {
+            category: frozenset(record["speciesCode"] for record in records)
+            for category, records in self._categories.items()
+        }
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __contains__(self, code):
+        return code in self._codes
+
+    def __getitem__(self, code):
+        return self._codes[code]
+
+    def get(self, code, default=None):
+        """Get the record for a species code.
+
+        :param code: the species code, e.g. 'horlar'.
+
+        :param default: the value returned if the code is not found.
+
+        :return: the record from the taxonomy.
+        :rtype: dict
+
+        """
+        return self._codes.get(code, default)
+
+    def get_by_scientific_name(self, name):
+        """Get the record for a scientific name.
+
+        :param name: the scientific name, e.g. 'Eremophila alpestris'.
+
+        :return: the record from the taxonomy, or None if the name is not
+        found.
+        :rtype: dict
+
+        """
+        return self._scientific_names.get(normalize_name(name))
+
+    def get_by_common_name(self, name, locale=None):
+        """Get the record for a common name.
+
+        :param name: the common name, e.g. 'Horned Lark'.
+
+        :param locale: the language of the name. The default, None, uses
+        the locale the index was built with. Other locales must first be
+        added with add_locale().
+
+        :return: the record from the taxonomy, or None if the name is not
+        found.
+        :rtype: dict
+
+        :raises KeyError: if the common names for the locale were not added.
+
+        """
+        names = self._common_names[self.locale if locale is None else locale]
+        return names.get(normalize_name(name))
+
+    def get_by_banding_code(self, code):
+        """Get the record for a four-letter banding code.
+
+        :param code: the banding code, e.g. 'HOLA'.
+
+        :return: the record from the taxonomy, or None if the code is not
+        found. Where codes are shared, the first record, in taxonomic
+        order, is returned.
+        :rtype: dict
+
+        """
+        return self._banding_codes.get(code.strip().upper())
+
+    def lookup(self, value):
+        """Get the record for a species code, scientific name, common name,
+        in any of the locales added, or a banding code.
+
+        This is useful for importing records where the species could have
+        been identified in any of these ways.
+
+        :param value: the code or name.
+
+        :return: the record from the taxonomy, or None if it is not found.
+        :rtype: dict
+
+        """
+        record = self._codes.get(value.strip())
+        if record is not None:
+            return record
+        name = normalize_name(value)
+        record = self._scientific_names.get(name)
+        if record is not None:
+            return record
+        for names in self._common_names.values():
+            record = names.get(name)
+            if record is not None:
+                return record
+        return self._banding_codes.get(name.upper())
+
+    def add_locale(self, locale, records):
+        """Add the common names in another language.
+
+        :param locale: the language used for the common names, e.g. 'es'.
+
+        :param records: the taxonomy, as returned by get_taxonomy(), for
+        the locale. The records are matched using the species code.
+
+        """
+        names = {}
+        for record in records:
+            indexed = self._codes.get(record["speciesCode"])
+            if indexed is not None:
+                names.setdefault(normalize_name(record["comName"]), indexed)
+        self._common_names[clean_locale(locale)] = names
+
+    def get_locales(self):
+        """Get the locales which can be used for looking up common names.
+
+        :return: the locales, sorted.
+        :rtype: list
+
+        """
+        return sorted(self._common_names)
+
+    def get_codes(self, category):
+        """Get the species codes for one or more categories.
+
+        :param category: one or more categories, e.g. 'species' or
+        'issf,form', as a comma-separated string or a list.
+
+        :return: the species codes.
+        :rtype: frozenset
+
+        :raises ValueError: if a category is not valid.
+
+        """
+        categories = clean_categories(category)
+        if len(categories) == 1:
+            return self._category_codes.get(categories[0], frozenset())
+        return frozenset().union(
+            *(self._category_codes.get(name, ()) for name in categories)
+        )
+
+    def get_records(self, category):
+        """Get the records for one or more categories.
+
+        :param category: one or more categories, e.g. 'species' or
+        'issf,form', as a comma-separated string or a list.
+
+        :return: the records, in taxonomic order.
+        :rtype: list
+
+        :raises ValueError: if a category is not valid.
+
+        """
+        categories = dict.fromkeys(clean_categories(category))
+        lists = [self._categories.get(name, []) for name in categories]
+        if len(lists) == 1:
+            return list(lists[0])
+        return list(heapq.merge(*lists, key=itemgetter("taxonOrder")))
+
+
+def get_trigrams(name):
+    """Get the sequences of three characters in a name, used for fuzzy
+    matching.
+
+    :param name: the name, normalized with normalize_name().
+
+    :return: the trigrams. The name is padded with spaces so the first and
+    last letters also count, as part of the start and end of the name.
+    :rtype: set
+
+    """
+    padded = " %s " % name
+    return {"".join(chars) for chars in zip(padded, padded[1:], padded[2:])}
+
+
+def get_quadgrams(name):
+    """Get the sequences of four characters in a name, used to find the
+    names to score in a fuzzy search.
+
+    :param name: the name, normalized with normalize_name().
+
+    :return: the quadgrams, from the name padded with spaces, as for
+    get_trigrams().
+    :rtype: set
+
+    """
+    padded = " %s " % name
+    return {padded[index : index + 4] for index in range(len(padded) - 3)}
+
+
+def get_word_starts(name):
+    """Get the positions in a name where each word starts.
+
+    :param name: the name, normalized with normalize_name().
+
+    :return: the indexes of the letters, or digits, which follow a space,
+    hyphen or other punctuation, or start the name.
+    :rtype: list
+
+    """
+    return [
+        index
+        for index, char in enumerate(name)
+        if char.isalnum() and (index == 0 or not name[index - 1].isalnum())
+    ]
+
+
+class NameSearch:
+    """Search the common and scientific names in the taxonomy, e.g. to
+    suggest species as a name is typed.
+
+    Names are matched in two ways. A prefix search finds the names where
+    the text is the start of the name, or of any word in it, so 'lark'
+    finds 'Horned Lark'. It uses sorted lists and a binary search so it
+    takes about the same time however many names there are. A fuzzy search
+    finds names with similar sequences of letters, so misspellings such as
+    'hornd lakr' still find a match. Only the names which share the least
+    common sequences with the text are scored, so it also takes well under
+    a millisecond for the full taxonomy in several languages.
+
+        search = NameSearch(get_taxonomy(api_key))
+        search.add_locale("es", get_taxonomy(api_key, locale="es"))
+        search.search("alondra c")
+
+    Each match is a dict with the speciesCode, the name matched, its locale
+    (None for scientific names) and a score from 0 to 1, e.g.
+
+        {"speciesCode": "horlar", "name": "Alondra Cornuda", "locale": "es",
+         "score": 0.9}
+
+    so the species code can be passed to get_species_observations().
+
+    :param records: the taxonomy, as returned by get_taxonomy(). The default,
+    None, creates an empty index. Use add_locale() to add the names.
+
+    :param locale: the language used for the common names in the records.
+
+    """
+
+    def __init__(self, records=None, locale=constants.DEFAULT_LOCALE):
+        self._entries = []
+        self._added = set()
+        self._starts = []
+        self._words = []
+        self._names = []
+        self._sizes = []
+        self._quadgrams = {}
+        self._sorted = True
+        if records is not None:
+            self.add_locale(locale, records)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add_locale(self, locale, records):
+        """Add the common names in a language, along with any scientific
+        names which were not already added.
+
+        :param locale: the language used for the common names, e.g. 'es'.
+
+        :param records: the taxonomy, as returned by get_taxonomy(), for
+        the locale.
+
+        """
+        locale = clean_locale(locale)
+        for record in records:
+            code = record["speciesCode"]
+            self._add(code, record["comName"], locale)
+            if record.get("sciName"):
+                self._add(code, record["sciName"], None)
+        self._sorted = False
+
+    def _add(self, code, name, locale):
+        if (code, locale) in self._added:
+            return
+        self._added.add((code, locale))
+        normalized = normalize_name(name)
+        if not normalized:
+            return
+        entry = len(self._entries)
+        self._entries.append((code, name, locale))
+        for index in get_word_starts(normalized):
+            items = self._starts if index == 0 else self._words
+            items.append((normalized[index:], entry))
+        self._names.append(" %s " % normalized)
+        self._sizes.append(len(get_trigrams(normalized)))
+        for quadgram in get_quadgrams(normalized):
+            self._quadgrams.setdefault(quadgram, []).append(entry)
+
+    def _sort(self):
+        if not self._sorted:
+            self._starts.sort()
+            self._words.sort()
+            # The shortest names come first, so they are the candidates
+            # when many names have the same count in a fuzzy search.
+            for entries in self._quadgrams.values():
+                entries.sort(key=self._sizes.__getitem__)
+            self._sorted = True
+
+    def _get_match(self, entry, score):
+        code, name, locale = self._entries[entry]
+        return {"speciesCode": code, "name": name, "locale": locale, "score": score}
+
+    def prefix(self, text, limit=10, locales=None):
+        """Find the names which start with some text, or which contain a
+        word which starts with it.
+
+        :param text: the text, e.g. as typed so far.
+
+        :param limit: the maximum number of species to return.
+
+        :param locales: the locales to search. The default, None, searches
+        all of them. Scientific names are always searched.
+
+        :return: the matches, one for each species. Names which start with
+        the text come first, in alphabetical order, followed by the names
+        where a later word matches.
+        :rtype: list
+
+        """
+        return self._prefix(normalize_name(text), limit, locales, set())
+
+    def _prefix(self, text, limit, locales, seen):
+        matches = []
+        if not text or limit <= 0:
+            return matches
+        self._sort()
+        for items, score in ((self._starts, 0.9), (self._words, 0.8)):
+            for index in range(bisect_left(items, (text,)), len(items)):
+                key, entry = items[index]
+                if not key.startswith(text):
+                    break
+                code, name, locale = self._entries[entry]
+                if code in seen or (locales and locale and locale not in locales):
+                    continue
+                seen.add(code)
+                exact = score == 0.9 and key == text
+                matches.append(self._get_match(entry, 1.0 if exact else score))
+                if len(matches) == limit:
+                    return matches
+        return matches
+
+    def fuzzy(self, text, limit=10, locales=None, min_score=0.3):
+        """Find the names which are similar to some text, allowing for
+        misspellings.
+
+        The score is the proportion of the sequences of three characters
+        which the text and the name have in common (the Dice coefficient).
+        Only the names which share the least common sequences of four
+        characters with the text are scored, so a name which is misspelt
+        in several places might not be found.
+
+        :param text: the text to match.
+
+        :param limit: the maximum number of species to return.
+
+        :param locales: the locales to search. The default, None, searches
+        all of them. Scientific names are always searched.
+
+        :param min_score: the lowest score, from 0 to 1, for a match.
+
+        :return: the matches, one for each species, with the highest score
+        first.
+        :rtype: list
+
+        """
+        return self._fuzzy(normalize_name(text), limit, locales, min_score, set())
+
+    def _fuzzy(self, text, limit, locales, min_score, seen):
+        matches = []
+        if not text or limit <= 0:
+            return matches
+        # The lists of names for the rarest quadgrams in the text are
+        # counted, up to MAX_POSTINGS names, skipping the common ones, e.g.
+        # 'ler ', which are in thousands of names. Only the names with the
+        # highest counts are then scored.
+        self._sort()
+        quadgrams = sorted(
+            get_quadgrams(text),
+            key=lambda quadgram: len(self._quadgrams.get(quadgram, ())),
+        )
+        counts = Counter()
+        total = 0
+        for quadgram in quadgrams:
+            entries = self._quadgrams.get(quadgram, ())
+            total += len(entries)
+            if counts and total > MAX_POSTINGS:
+                break
+            counts.update(entries)
+        trigrams = get_trigrams(text)
+        scored = []
+        for entry in heapq.nlargest(MAX_CANDIDATES, counts, key=counts.__getitem__):
+            padded = self._names[entry]
+            shared = sum(trigram in padded for trigram in trigrams)
+            score = 2.0 * shared / (len(trigrams) + self._sizes[entry])
+            if score >= min_score:
+                scored.append((-score, entry))
+        for score, entry in sorted(scored):
+            code, name, locale = self._entries[entry]
+            if code in seen or (locales and locale and locale not in locales):
+                continue
+            seen.add(code)
+            matches.append(self._get_match(entry, round(-score, 3)))
+            if len(matches) == limit:
+                break
+        return matches
+
+    def search(self, text, limit=10, locales=None, min_score=0.3):
+        """Find the names which match some text, using a prefix search and,
+        if there are fewer than limit matches, a fuzzy search.
+
+        Takes the same arguments as prefix() and fuzzy().
+
+        :return: the matches, one for each species, with the best first.
+        :rtype: list
+
+        """
+        text = normalize_name(text)
+        seen = set()
+        matches = self._prefix(text, limit, locales, seen)
+        if len(matches) < limit:
+            matches += self._fuzzy(text, limit - len(matches), locales, min_score, seen)
+        return matches
+
+
+class TaxonomyTree:
+    """The taxonomy arranged as a tree: orders, families, species and the
+    forms, e.g. subspecies groups, which are reported as each species.
+
+    The tree is built from the order, familyCode, reportAs and taxonOrder
+    fields in the records returned by get_taxonomy(), so questions such as
+    which taxa are in a family, or which forms are reported as a species,
+    are answered without calling the API:
+
+        tree = TaxonomyTree(get_taxonomy(api_key))
+        tree.get_subtree("Anatidae")  # all the ducks, geese and swans
+        tree.get_forms("mallar3")  # the forms reported as Mallard
+        tree.get_species("mallar1")  # 'mallar3'
+
+    Taxa without a reportAs field, e.g. species, hybrids and spuhs, are
+    placed directly under their family. Each list of taxa is in taxonomic
+    order.
+
+    :param records: the taxonomy, as returned by get_taxonomy().
+
+    """
+
+    def __init__(self, records):
+        self._records = {}
+        self._orders = {}
+        self._families = {}
+        self._family_names = {}
+        self._children = {}
+        self._parents = {}
+
+        records = sorted(records, key=itemgetter("taxonOrder"))
+        for record in records:
+            self._records[record["speciesCode"]] = record
+        for record in records:
+            code, family = record["speciesCode"], record.get("familyCode")
+            if family not in self._families:
+                self._families[family] = []
+                self._orders.setdefault(record.get("order"), []).append(family)
+                for field in ("familySciName", "familyComName"):
+                    if record.get(field):
+                        self._family_names[normalize_name(record[field])] = family
+            parent = record.get("reportAs")
+            if parent in self._records and parent != code:
+                self._add_child(parent, code)
+            else:
+                self._families[family].append(code)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, code):
+        return code in self._records or code in self._parents
+
+    def _add_child(self, parent, code):
+        self._children.setdefault(parent, []).append(code)
+        self._parents[code] = parent
+
+    def get(self, code):
+        """Get the record for a taxon.
+
+        :param code: the species code, e.g. 'mallar3'.
+
+        :return: the record from the taxonomy, or None if it is not in the
+        tree, or was only added by load_forms().
+        :rtype: dict
+
+        """
+        return self._records.get(code)
+
+    def get_orders(self):
+        """Get the orders, in taxonomic order.
+
+        :return: the names of the orders, e.g. 'Anseriformes'.
+        :rtype: list
+
+        """
+        return list(self._orders)
+
+    def get_families(self, order=None):
+        """Get the families, in taxonomic order.
+
+        :param order: the name of an order, e.g. 'Anseriformes'. The
+        default, None, returns the families in all the orders.
+
+        :return: the family codes, e.g. 'anatid1'.
+        :rtype: list
+
+        :raises KeyError: if the order is not in the tree.
+
+        """
+        if order is None:
+            return list(self._families)
+        return list(self._orders[order])
+
+    def get_family(self, name):
+        """Get the code for a family.
+
+        :param name: the family code, e.g. 'anatid1', or the scientific or
+        common name of the family, e.g. 'Anatidae'.
+
+        :return: the family code, or None if the family is not in the tree.
+        :rtype: str
+
+        """
+        if name in self._families:
+            return name
+        return self._family_names.get(normalize_name(name))
+
+    def get_children(self, name):
+        """Get the taxa directly below an order, family or taxon.
+
+        :param name: the name of an order, the code or name of a family, or
+        a species code.
+
+        :return: the family codes for an order, otherwise the species codes.
+        :rtype: list
+
+        :raises KeyError: if the name is not in the tree.
+
+        """
+        if name in self._orders:
+            return list(self._orders[name])
+        family = self.get_family(name)
+        if family is not None:
+            return list(self._families[family])
+        if name in self:
+            return list(self._children.get(name, ()))
+        raise KeyError(name)
+
+    def get_parent(self, code):
+        """Get the taxon a form is reported as, or the family for any other
+        taxon.
+
+        :param code: the species code.
+
+        :return: the species code, or the family code.
+        :rtype: str
+
+        :raises KeyError: if the code is not in the tree.
+
+        """
+        if code in self._parents:
+            return self._parents[code]
+        return self._records[code].get("familyCode")
+
+    def get_species(self, code):
+        """Get the taxon at the top of the tree of forms which contains a
+        taxon, i.e. the one its observations are reported as.
+
+        :param code: the species code, e.g. 'mallar1'.
+
+        :return: the species code, e.g. 'mallar3', which is the code itself
+        if it is not reported as another taxon.
+        :rtype: str
+
+        :raises KeyError: if the code is not in the tree.
+
+        """
+        if code not in self:
+            raise KeyError(code)
+        while code in self._parents:
+            code = self._parents[code]
+        return code
+
+    def get_forms(self, code):
+        """Get all the forms reported as a taxon, directly or through other
+        forms.
+
+        :param code: the species code, e.g. 'mallar3'.
+
+        :return: the species codes of the forms, in taxonomic order, not
+        including the code itself.
+        :rtype: list
+
+        :raises KeyError: if the code is not in the tree.
+
+        """
+        if code not in self:
+            raise KeyError(code)
+        return self._walk(self._children.get(code, ()))
+
+    def get_subtree(self, name):
+        """Get all the taxa below an order, family or taxon.
+
+        :param name: the name of an order, e.g. 'Anseriformes', the code or
+        name of a family, e.g. 'Anatidae', or a species code.
+
+        :return: the species codes, in taxonomic order. For a taxon the
+        code itself comes first, followed by its forms.
+        :rtype: list
+
+        :raises KeyError: if the name is not in the tree.
+
+        """
+        if name in self._orders:
+            return self._walk(
+                code for family in self._orders[name] for code in self._families[family]
+            )
+        family = self.get_family(name)
+        if family is not None:
+            return self._walk(self._families[family])
+        if name in self:
+            return self._walk([name])
+        raise KeyError(name)
+
+    def _walk(self, codes):
+        found = []
+        stack = list(codes)[::-1]
+        while stack:
+            code = stack.pop()
+            found.append(code)
+            stack.extend(reversed(self._children.get(code, ())))
+        return found
+
+    def load_forms(self, token, codes, max_workers=8):
+        """Download the forms for species, concurrently, and add any which
+        are not in the tree.
+
+        This is only needed when the tree was built from part of the
+        taxonomy, e.g. get_taxonomy(token, category="species"), since the
+        full taxonomy already links each form to its species. One call to
+        get_taxonomy_forms() is made for each species, so pass only the
+        species which are needed: all the 11,000 or so species in the
+        taxonomy means 11,000 requests. The calls are made using a Batch,
+        so the current settings, including any RateLimiter, are used. The
+        forms for all the species which succeed are added before any error
+        is raised.
+
+        :param token: the token needed to access the API.
+
+        :param codes: the species codes to load the forms for. Species which
+        already have forms in the tree are skipped.
+
+        :param max_workers: the number of calls made at the same time.
+
+        :return: the number of forms added.
+        :rtype: int
+
+        :raises ValueError if any of the species codes is invalid. The codes
+        are checked before any calls are made.
+
+        :raises URLError if there is an error with the connection to the
+        eBird site.
+
+        :raises HTTPError if the eBird API returns an error.
+
+        """
+        pending = [
+            clean_species_code(code) for code in codes if code not in self._children
+        ]
+
+        added = []
+        lock = threading.Lock()
+
+        def load(species):
+            forms = taxonomy.get_taxonomy_forms(token, species)
+            with lock:
+                for code in forms:
+                    if code != species and code not in self:
+                        self._add_child(species, code)
+                        added.append(code)
+
+        with Batch(max_workers=max_workers) as batch:
+            batch.map(load, pending, return_exceptions=False)
+        return len(added)
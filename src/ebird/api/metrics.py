@@ -0,0 +1,123 @@
+"""Classes for measuring the calls made to the eBird API."""
+
+import threading
+from collections import Counter
+
+
+class Metrics:
+    """Thread-safe counters for the calls made to the eBird API.
+
+    Along with the running totals, the details for each call can be
+    passed to listeners, e.g. to send them to a monitoring system.
+
+    The counters are:
+
+        calls: the number of responses received.
+        wire_bytes: the number of bytes received, before decompression.
+        decoded_bytes: the number of bytes after decompression.
+        retries: the number of calls retried by a RetryPolicy.
+        retry_delay: the total time, in seconds, spent waiting to retry.
+        retries_exhausted: the number of calls which still failed after
+            all the retries.
+        coalesced: the number of calls which shared the result of an
+            identical call, made at the same time, by a SingleFlight.
+        not_modified: the number of expired, cached responses which the
+            API confirmed had not changed, with 304 Not Modified.
+        unchanged: the number of expired, cached responses which were
+            downloaded again but had not changed.
+        stale: the number of expired, cached responses returned while
+            they were refreshed in the background.
+        refresh_errors: the number of background refreshes which failed.
+
+    """
+
+    def __init__(self):
+        self._counters = Counter()
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener):
+        """Add a function which is called with the details of each call.
+
+        :param listener: a function which takes a dict, for example,
+        {"url": "...", "status": 200, "wire_bytes": 5120,
+        "decoded_bytes": 40960}.
+
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Remove a function added with add_listener()."""
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def increment(self, name, value=1):
+        """Add a value to one of the counters.
+
+        :param name: the name of the counter.
+
+        :param value: the amount to add, the default is 1.
+
+        """
+        with self._lock:
+            self._counters[name] += value
+
+    def record_response(self, url, content):
+        """Record the response for a call to the API.
+
+        :param url: the URL, including the query string, for the call.
+
+        :param content: the content returned by the API. If it is a
+        ebird.api.transport.Response then the status and the number of
+        bytes received is also recorded.
+
+        """
+        self.record(
+            url,
+            getattr(content, "status", 200),
+            getattr(content, "wire_bytes", len(content)),
+            len(content),
+        )
+
+    def record(self, url, status, wire_bytes, decoded_bytes):
+        """Record the details of a call to the API.
+
+        :param url: the URL, including the query string, for the call.
+
+        :param status: the HTTP status code of the response.
+
+        :param wire_bytes: the number of bytes received.
+
+        :param decoded_bytes: the number of bytes after decompression.
+
+        """
+        details = {
+            "url": url,
+            "status": status,
+            "wire_bytes": wire_bytes,
+            "decoded_bytes": decoded_bytes,
+        }
+
+        with self._lock:
+            self._counters["calls"] += 1
+            self._counters["wire_bytes"] += wire_bytes
+            self._counters["decoded_bytes"] += decoded_bytes
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            listener(details)
+
+    def snapshot(self):
+        """Get the current value of all the counters.
+
+        :return: a dict with the name and value for each counter.
+
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        """Set all the counters back to zero."""
+        with self._lock:
+            self._counters.clear()
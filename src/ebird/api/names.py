@@ -0,0 +1,310 @@
+"""Classes for translating the common names of species locally."""
+
+import threading
+
+from ebird.api import constants, taxonomy
+from ebird.api.client import Batch
+from ebird.api.validation import clean_locale
+
+
+class CommonNames:
+    """Translate the common names in observations using the taxonomy.
+
+    The observations endpoints return the common names in the locale given
+    in the sppLocale parameter, which means the same observations are
+    downloaded, and cached, separately for each language. Set a CommonNames
+    with the names setting, or Client.names, and the observations are
+    always fetched in one locale, then the common names are replaced using
+    the taxonomy for the locale requested, matching on the speciesCode.
+
+    The taxonomy for each locale is downloaded once, the first time it is
+    needed, and kept in memory. If a TaxonomyStore is given then it is used
+    to get the taxonomy, so it is only downloaded once across restarts.
+
+    :param locale: the locale used to fetch the observations. The default
+    is 'en'.
+
+    :param store: the TaxonomyStore used to get the taxonomy. The default,
+    None, calls the API, so the taxonomy is cached by any cache setting.
+    :type store: ebird.api.stores.TaxonomyStore
+
+    """
+
+    def __init__(self, locale=constants.DEFAULT_LOCALE, store=None):
+        self.locale = clean_locale(locale)
+        self.store = store
+        self._tables = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get_locales(self):
+        """Get the locales for which the common names are loaded.
+
+        :return: the locales, sorted.
+        :rtype: list
+
+        """
+        with self._lock:
+            return sorted(self._tables)
+
+    def get_names(self, locale):
+        """Get the common names for a locale, if they are loaded.
+
+        :param locale: the language used for the common names.
+
+        :return: a dict mapping the species codes to the common names, or
+        None if the names for the locale have not been loaded.
+
+        """
+        with self._lock:
+            return self._tables.get(locale)
+
+    def set_names(self, locale, records):
+        """Load the common names for a locale from the taxonomy.
+
+        :param locale: the language used for the common names.
+
+        :param records: the taxonomy, as returned by get_taxonomy(), for
+        the locale.
+
+        :return: a dict mapping the species codes to the common names.
+
+        """
+        names = {record["speciesCode"]: record["comName"] for record in records}
+        with self._lock:
+            self._tables[locale] = names
+        return names
+
+    def load(self, token, locale):
+        """Get the common names for a locale, downloading the taxonomy if
+        they are not already loaded.
+
+        Only one thread downloads the taxonomy for each locale. Any others
+        which need it at the same time wait for it to finish.
+
+        :param token: the token needed to access the API.
+
+        :param locale: the language used for the common names.
+
+        :return: a dict mapping the species codes to the common names.
+
+        :raises URLError if there is an error with the connection to the
+        eBird site.
+
+        :raises HTTPError if the eBird API returns an error.
+
+        """
+        with self._lock:
+            if locale in self._tables:
+                return self._tables[locale]
+            lock = self._loading.setdefault(locale, threading.Lock())
+
+        with lock:
+            names = self.get_names(locale)
+            if names is not None:
+                return names
+            if self.store is None:
+                records = taxonomy.get_taxonomy(token, locale=locale)
+            else:
+                records = self.store.get_taxonomy(token, locale=locale)
+            return self.set_names(locale, records)
+
+    def clear(self):
+        """Forget the common names for all the locales, e.g. after a new
+        version of the taxonomy is published."""
+        with self._lock:
+            self._tables.clear()
+
+    @staticmethod
+    def translate(records, names):
+        """Replace the common names in a list of records.
+
+        :param records: the records, e.g. observations, which have the
+        speciesCode and comName fields. They are changed in place.
+
+        :param names: a dict mapping the species codes to the common names.
+        Records for species which are not in the dict are not changed.
+
+        :return: the records.
+
+        """
+        for record in records:
+            name = names.get(record.get("speciesCode"))
+            if name is not None:
+                record["comName"] = name
+        return records
+
+
+class NameMatrix:
+    """The common names of all the species in many locales.
+
+    The names are kept in a list for each locale, with one entry for each
+    species, so once the row for a species and the column for a locale
+    are known, e.g. when translating lots of records into the same
+    language, each name is a single list access:
+
+        row, column = matrix.get_row("horlar"), matrix.get_column("es")
+        matrix.names[column][row]  # 'Alondra Cornuda'
+
+    Use load_names() to download the names for many locales concurrently.
+
+    """
+
+    def __init__(self):
+        self.codes = []
+        self.locales = []
+        self.names = []
+        self._rows = {}
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, locale):
+        return locale in self._columns
+
+    def get_row(self, code):
+        """Get the row for a species.
+
+        :param code: the species code, e.g. 'horlar'.
+
+        :return: the index of the species in codes, and in each list of
+        names, or None if the species is not in the matrix.
+        :rtype: int
+
+        """
+        return self._rows.get(code)
+
+    def get_column(self, locale):
+        """Get the column for a locale.
+
+        :param locale: the language used for the common names.
+
+        :return: the index of the locale in locales and names, or None if
+        the names for the locale have not been added.
+        :rtype: int
+
+        """
+        return self._columns.get(locale)
+
+    def get_name(self, code, locale):
+        """Get the common name of a species in a locale.
+
+        :param code: the species code, e.g. 'horlar'.
+
+        :param locale: the language used for the common names.
+
+        :return: the name, or None if the species or locale is not in the
+        matrix.
+        :rtype: str
+
+        """
+        row, column = self._rows.get(code), self._columns.get(locale)
+        if row is None or column is None:
+            return None
+        return self.names[column][row]
+
+    def get_names(self, locale):
+        """Get the common names for a locale.
+
+        :param locale: the language used for the common names.
+
+        :return: a dict mapping the species codes to the common names, e.g.
+        for CommonNames.translate().
+
+        :raises KeyError: if the names for the locale have not been added.
+
+        """
+        names = self.names[self._columns[locale]]
+        return {code: name for code, name in zip(self.codes, names) if name}
+
+    def add(self, locale, records):
+        """Add the common names for a locale, replacing any already added.
+
+        :param locale: the language used for the common names.
+
+        :param records: the taxonomy, as returned by get_taxonomy(), for
+        the locale.
+
+        """
+        with self._lock:
+            column = [None] * len(self.codes)
+            for record in records:
+                code = record["speciesCode"]
+                row = self._rows.get(code)
+                if row is None:
+                    # Extend the lists first so readers, which do not take
+                    # the lock, never find a row which is out of range.
+                    row = len(self.codes)
+                    self.codes.append(code)
+                    for names in self.names:
+                        names.append(None)
+                    column.append(None)
+                    self._rows[code] = row
+                column[row] = record["comName"]
+            if locale in self._columns:
+                self.names[self._columns[locale]] = column
+            else:
+                self._columns[locale] = len(self.locales)
+                self.locales.append(locale)
+                self.names.append(column)
+
+
+def load_names(token, locales=None, store=None, matrix=None, max_workers=8):
+    """Download the common names for many locales, concurrently, into a
+    NameMatrix.
+
+    The taxonomy for each locale is downloaded using a Batch, so the
+    current settings are used, including any RateLimiter. Loading can be
+    resumed: locales already in the matrix are skipped and, if a store is
+    given, locales already in the store are read from it rather than
+    downloaded again. If any download fails, the others still finish and
+    are added before the error is raised, so calling load_names() again,
+    with the same matrix or store, only downloads the locales which are
+    missing.
+
+    :param token: the token needed to access the API.
+
+    :param locales: the locales to load. The default, None, loads all the
+    locales returned by get_taxonomy_locales().
+
+    :param store: the TaxonomyStore used to keep the taxonomy for each
+    locale. The default, None, downloads each locale from the API.
+    :type store: ebird.api.stores.TaxonomyStore
+
+    :param matrix: the NameMatrix to add the names to. The default, None,
+    creates a new one.
+
+    :param max_workers: the number of locales downloaded at the same time.
+
+    :return: the matrix.
+    :rtype: NameMatrix
+
+    :raises URLError if there is an error with the connection to the
+    eBird site.
+
+    :raises HTTPError if the eBird API returns an error.
+
+    """
+    if matrix is None:
+        matrix = NameMatrix()
+    if locales is None:
+        locales = [entry["code"] for entry in taxonomy.get_taxonomy_locales(token)]
+    pending = [locale for locale in locales if locale not in matrix]
+    if not pending:
+        return matrix
+
+    # Get the version once so all the locales come from the same version.
+    version = None if store is None else store.get_latest_version(token)
+
+    def load(locale):
+        if store is None:
+            records = taxonomy.get_taxonomy(token, locale=locale)
+        else:
+            records = store.get_taxonomy(token, locale=locale, version=version)
+        matrix.add(locale, records)
+
+    with Batch(max_workers=max_workers) as batch:
+        batch.map(load, pending, return_exceptions=False)
+    return matrix
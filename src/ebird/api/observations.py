@@ -2,7 +2,7 @@
 
 """Functions for fetching information about what species have been seen."""
 
-from ebird.api.utils import call
+from ebird.api.utils import call, get_stream, prepare
 from ebird.api.validation import (
     clean_areas,
     clean_back,
@@ -705,3 +705,27 @@ def get_historic_observations(
     }
 
     return call(url, params, headers)
+
+
+def iter_observations(*args, **kwargs):
+    """Iterate over recent observations for a region or location.
+
+    This takes the same arguments as get_observations() but the records are
+    decoded and yielded one at a time as the response is read, rather than
+    all at once when it is complete. That way processing can start with
+    the first record and the memory used stays small, even for downloads
+    such as get_observations(token, "US", detail="full").
+
+    :return: an iterator over the observations.
+
+    :raises ValueError: if any of the arguments fail the validation checks.
+    The arguments are checked, and the request sent, when this function is
+    called, not when the first record is read.
+
+    :raises URLError if there is an error with the connection to the
+    eBird site.
+
+    :raises HTTPError if the eBird API returns an error.
+
+    """
+    return get_stream(*prepare(get_observations, *args, **kwargs))
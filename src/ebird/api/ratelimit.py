@@ -0,0 +1,174 @@
+"""Classes for limiting the rate of calls to the eBird API."""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+class RateLimiter:
+    """Limit the rate of calls to the eBird API, for each API token.
+
+    This is a token bucket: each call takes a token from the bucket and
+    the bucket is refilled at a fixed rate, up to a maximum, the burst.
+    When the bucket is empty a call waits until a token is available.
+    Calls are served in the order they were made, even when they come
+    from different threads.
+
+    The buckets are kept in memory so they are shared by all the threads
+    in a process. Use SQLiteRateLimiter to share them between processes.
+
+    :param rate: the number of calls allowed per second.
+
+    :param burst: the number of calls which can be made at once, when the
+    bucket is full. The default is the rate, or 1 if that is smaller.
+
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("Value for 'rate', %s, must be greater than 0" % rate)
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, self.rate))
+        if self.burst < 1:
+            raise ValueError("Value for 'burst', %s, cannot be less than 1" % burst)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _take(self, now, tokens, updated):
+        """Take a token from a bucket.
+
+        :return: the number of tokens left, which is negative if the
+        call has to wait, and the time to wait, in seconds.
+
+        """
+        if updated is not None:
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        tokens -= 1
+        return tokens, max(0.0, -tokens / self.rate)
+
+    def reserve(self, key):
+        """Reserve a call, without waiting.
+
+        :param key: the bucket to use, usually the API token.
+
+        :return: the number of seconds to wait before making the call.
+        :rtype: float
+
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, None))
+            tokens, delay = self._take(now, tokens, updated)
+            self._buckets[key] = (tokens, now)
+        return delay
+
+    def acquire(self, key):
+        """Wait until a call can be made.
+
+        :param key: the bucket to use, usually the API token.
+
+        """
+        delay = self.reserve(key)
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self, key):
+        """Wait until a call can be made, without blocking the event loop.
+
+        :param key: the bucket to use, usually the API token.
+
+        """
+        delay = self.reserve(key)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """A RateLimiter which keeps the buckets in an SQLite database.
+
+    The buckets are shared by all the processes, on the same host, which
+    use the same file. The key for each bucket is hashed so API tokens are
+    not written to the file. A process which is forked from one using the
+    limiter opens its own connection to the database.
+
+    :param path: the path to the SQLite database file.
+
+    :param rate: the number of calls allowed per second.
+
+    :param burst: the number of calls which can be made at once.
+
+    """
+
+    def __init__(self, path, rate, burst=None):
+        super().__init__(rate, burst)
+        self.path = path
+        self._pid = os.getpid()
+        self._inherited = []
+        self._connection = self._connect()
+
+    def _connect(self):
+        connection = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS buckets"
+            " (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        return connection
+
+    def _check_process(self):
+        # An SQLite connection cannot be used in a forked process, not even
+        # to close it, so a new one, with a new lock, is opened. The one from
+        # the parent is kept so it is not closed when garbage collected.
+        pid = os.getpid()
+        if pid != self._pid:
+            self._inherited.append(self._connection)
+            self._connection = self._connect()
+            self._lock = threading.Lock()
+            self._pid = pid
+
+    def close(self):
+        """Close the connection to the database."""
+        self._check_process()
+        with self._lock:
+            self._connection.close()
+
+    def reserve(self, key):
+        """Reserve a call, without waiting.
+
+        :param key: the bucket to use, usually the API token.
+
+        :return: the number of seconds to wait before making the call.
+        :rtype: float
+
+        """
+        key = hashlib.sha256(str(key).encode("utf-8")).hexdigest()
+
+        self._check_process()
+        with self._lock:
+            cursor = self._connection.cursor()
+            # Lock the database so the read and update are atomic
+            # across processes.
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = cursor.execute(
+                    "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens, updated = row if row else (self.burst, None)
+                tokens, delay = self._take(now, tokens, updated)
+                cursor.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated)"
+                    " VALUES (?, ?, ?)",
+                    (key, tokens, now),
+                )
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+
+        return delay
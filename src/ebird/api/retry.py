@@ -0,0 +1,188 @@
+"""Classes for retrying calls to the eBird API which fail."""
+
+import asyncio
+import http.client
+import random
+import socket
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.error import HTTPError, URLError
+
+DEFAULT_STATUSES = (429, 500, 502, 503, 504)
+
+
+class RetryPolicy:
+    """Retry calls which fail because of a transient error.
+
+    Calls are retried when there is an error with the connection, the
+    request times out or the eBird API returns one of the HTTP status codes
+    in statuses. The delay between attempts doubles each time, from backoff
+    up to max_backoff seconds, and a random amount is subtracted (jitter)
+    so that calls which failed at the same time are not all retried at the
+    same time. If the response includes a Retry-After header then that is
+    used instead.
+
+    :param max_attempts: the maximum number of times a call is made,
+    including the first attempt.
+
+    :param backoff: the delay, in seconds, before the first retry.
+
+    :param max_backoff: the maximum delay, in seconds, between attempts.
+
+    :param deadline: the maximum time, in seconds, to keep trying, from the
+    start of the first attempt. No retry is made if it would start after
+    the deadline. The default of None means there is no deadline.
+
+    :param jitter: use a random delay between zero and the calculated delay.
+
+    :param statuses: the HTTP status codes which are retried.
+
+    """
+
+    def __init__(
+        self,
+        max_attempts=3,
+        backoff=0.5,
+        max_backoff=30.0,
+        deadline=None,
+        jitter=True,
+        statuses=DEFAULT_STATUSES,
+    ):
+        if max_attempts < 1:
+            raise ValueError(
+                "Value for 'max_attempts', %s, must be at least 1" % max_attempts
+            )
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.jitter = jitter
+        self.statuses = tuple(statuses)
+
+    def is_retryable(self, error):
+        """Check whether an error is transient, so the call can be retried.
+
+        :param error: the exception raised by the call.
+
+        :return: True if the call can be retried.
+
+        """
+        if isinstance(error, HTTPError):
+            return error.code in self.statuses
+        return isinstance(
+            error,
+            (URLError, socket.timeout, ConnectionError, http.client.HTTPException),
+        )
+
+    @staticmethod
+    def get_retry_after(error):
+        """Get the delay requested by the server with a Retry-After header.
+
+        :param error: the exception raised by the call.
+
+        :return: the delay in seconds or None if the error is not an
+        HTTPError or the header is missing or invalid.
+
+        """
+        headers = getattr(error, "headers", None)
+        value = headers.get("Retry-After") if headers else None
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+    def get_delay(self, attempt, error, elapsed=0.0):
+        """Get the time to wait before the next attempt.
+
+        :param attempt: the number of the attempt which failed, from 1.
+
+        :param error: the exception raised by the call.
+
+        :param elapsed: the time, in seconds, since the first attempt started.
+
+        :return: the delay in seconds or None if the call should not be
+        retried.
+
+        """
+        if attempt >= self.max_attempts or not self.is_retryable(error):
+            return None
+
+        delay = self.get_retry_after(error)
+        if delay is None:
+            delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+            if self.jitter:
+                delay = random.uniform(0, delay)
+
+        if self.deadline is not None and elapsed + delay > self.deadline:
+            return None
+
+        return delay
+
+    def call(self, func, metrics=None):
+        """Call a function, retrying it if it fails with a transient error.
+
+        :param func: the function to call, which takes no arguments.
+
+        :param metrics: the Metrics where the number of retries is counted.
+
+        :return: the value returned by the function.
+
+        :raises: the error from the last attempt if all of them fail.
+
+        """
+        start = time.monotonic()
+        attempt = 1
+        while True:
+            try:
+                return func()
+            except Exception as error:
+                delay = self.get_delay(attempt, error, time.monotonic() - start)
+                self._record(metrics, error, delay)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, func, metrics=None):
+        """Call a coroutine function, retrying it if it fails with a
+        transient error.
+
+        :param func: the coroutine function to call, which takes no arguments.
+
+        :param metrics: the Metrics where the number of retries is counted.
+
+        :return: the value returned by the function.
+
+        :raises: the error from the last attempt if all of them fail.
+
+        """
+        start = time.monotonic()
+        attempt = 1
+        while True:
+            try:
+                return await func()
+            except Exception as error:
+                delay = self.get_delay(attempt, error, time.monotonic() - start)
+                self._record(metrics, error, delay)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _record(self, metrics, error, delay):
+        if metrics is None or not self.is_retryable(error):
+            return
+        if delay is None:
+            metrics.increment("retries_exhausted")
+        else:
+            metrics.increment("retries")
+            metrics.increment("retry_delay", delay)
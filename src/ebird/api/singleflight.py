@@ -0,0 +1,107 @@
+"""Classes for combining identical calls to the eBird API."""
+
+import asyncio
+import threading
+
+
+class _Flight:
+    """A call in progress, and its result, shared by all the callers."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Combine identical calls which are in progress at the same time.
+
+    The first caller for a given key makes the call. Any other callers,
+    which arrive before it finishes, wait and get the same result, or the
+    same error, rather than making the call themselves. Once the call
+    finishes the next caller for the key makes a new call.
+
+    Calls are combined separately for threads, using call(), and asyncio
+    tasks, using call_async().
+
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def call(self, key, func, metrics=None):
+        """Make a call, or wait for the identical call in progress.
+
+        :param key: the key which identifies identical calls.
+
+        :param func: the function which makes the call, with no arguments.
+
+        :param metrics: the Metrics where the number of calls which waited
+        for another call, 'coalesced', is counted.
+
+        :return: the value returned by the function.
+
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if metrics is not None:
+                metrics.increment("coalesced")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+        return flight.result
+
+    async def call_async(self, key, func, metrics=None):
+        """Make a call, or wait for the identical call in progress, from an
+        asyncio task.
+
+        The call runs in its own task so if the caller which started it is
+        cancelled the call continues for the others which are waiting.
+
+        :param key: the key which identifies identical calls.
+
+        :param func: the coroutine function which makes the call, with no
+        arguments.
+
+        :param metrics: the Metrics where the number of calls which waited
+        for another call, 'coalesced', is counted.
+
+        :return: the value returned by the function.
+
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        task = self._tasks.get(task_key)
+
+        if task is None:
+            task = self._tasks[task_key] = loop.create_task(func())
+            task.add_done_callback(lambda done: self._finished(task_key, done))
+        elif metrics is not None:
+            metrics.increment("coalesced")
+
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        self._tasks.pop(key, None)
+        if not task.cancelled():
+            # Mark the error as retrieved, in case every caller was cancelled.
+            task.exception()
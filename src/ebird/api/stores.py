@@ -0,0 +1,401 @@
+"""Classes for keeping local copies of records from the eBird API."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from ebird.api import checklists, taxonomy, utils
+from ebird.api.validation import clean_code, clean_locale
+
+# Checklists which have not been edited for this long are assumed not to
+# change again.
+DEFAULT_IMMUTABLE_AFTER = timedelta(days=7)
+
+# How often, in seconds, TaxonomyStore checks for a new version.
+DEFAULT_CHECK_INTERVAL = 24 * 60 * 60
+
+
+def get_revision(checklist):
+    """Get the time a checklist was last changed.
+
+    :param checklist: the checklist returned by get_checklist().
+
+    :return: the time the checklist was last edited, or created, or None if
+    neither is included. Times are local to the observer, so there is no
+    timezone.
+    :rtype: datetime
+
+    """
+    value = checklist.get("lastEditedDt") or checklist.get("creationDt")
+    if not value:
+        return None
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    return None
+
+
+class ChecklistStore:
+    """Keep local copies of checklists, in an SQLite database.
+
+    Submitted checklists are often edited in the first few days, but after
+    that they rarely change. Once a checklist has not been edited for
+    immutable_after it is always returned from the store, without calling
+    the API. Newer checklists are downloaded each time, which allows edits
+    to be picked up, and refresh() downloads any checklist on demand.
+
+    Each checklist is stored with the time it was last edited and a hash
+    of its contents, so it is easy to see whether it changed.
+
+    :param path: the path to the SQLite database file. Use ':memory:' to
+    keep the checklists in memory.
+
+    :param immutable_after: how long after it was last edited a checklist
+    is assumed not to change.
+    :type immutable_after: datetime.timedelta
+
+    """
+
+    def __init__(self, path, immutable_after=DEFAULT_IMMUTABLE_AFTER):
+        self.path = path
+        self.immutable_after = immutable_after
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS checklists ("
+            " sub_id TEXT PRIMARY KEY,"
+            " content BLOB NOT NULL,"
+            " digest TEXT NOT NULL,"
+            " revised TEXT,"
+            " fetched REAL NOT NULL)"
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM checklists"
+            ).fetchone()[0]
+
+    def __contains__(self, sub_id):
+        return self._get_row(sub_id) is not None
+
+    def close(self):
+        """Close the connection to the database."""
+        with self._lock:
+            self._connection.close()
+
+    def _get_row(self, sub_id):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT content, digest, revised FROM checklists WHERE sub_id = ?",
+                (sub_id,),
+            ).fetchone()
+
+    def get(self, sub_id):
+        """Get a checklist from the store, without calling the API.
+
+        :param sub_id: the unique identifier for the checklist, e.g. S22893621.
+
+        :return: the checklist, or None if it is not in the store.
+        :rtype: dict
+
+        """
+        row = self._get_row(sub_id)
+        return None if row is None else utils.get_json(zlib.decompress(row[0]))
+
+    def get_digest(self, sub_id):
+        """Get the hash of the contents of a stored checklist.
+
+        :param sub_id: the unique identifier for the checklist.
+
+        :return: the SHA-256 hash, or None if it is not in the store.
+        :rtype: str
+
+        """
+        row = self._get_row(sub_id)
+        return None if row is None else row[1]
+
+    def is_immutable(self, sub_id):
+        """Check whether a stored checklist is old enough not to change.
+
+        :param sub_id: the unique identifier for the checklist.
+
+        :return: True if the checklist is in the store and was last edited
+        longer ago than immutable_after.
+
+        """
+        row = self._get_row(sub_id)
+        if row is None or row[2] is None:
+            return False
+        revised = datetime.fromisoformat(row[2])
+        return datetime.now() - revised > self.immutable_after
+
+    def add(self, checklist):
+        """Add, or replace, a checklist in the store.
+
+        :param checklist: the checklist returned by get_checklist().
+
+        :return: True if the checklist is new or its contents changed.
+
+        """
+        content = json.dumps(checklist, sort_keys=True).encode("utf-8")
+        digest = hashlib.sha256(content).hexdigest()
+        revised = get_revision(checklist)
+        sub_id = checklist["subId"]
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT digest FROM checklists WHERE sub_id = ?", (sub_id,)
+            ).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO checklists"
+                " (sub_id, content, digest, revised, fetched)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (
+                    sub_id,
+                    zlib.compress(content),
+                    digest,
+                    revised.isoformat() if revised else None,
+                    time.time(),
+                ),
+            )
+        return row is None or row[0] != digest
+
+    def delete(self, sub_id):
+        """Remove a checklist from the store.
+
+        :param sub_id: the unique identifier for the checklist.
+
+        """
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM checklists WHERE sub_id = ?", (sub_id,)
+            )
+
+    def get_checklist(self, token, sub_id, refresh=False):
+        """Get a checklist, from the store if it is old enough not to change,
+        otherwise from the API.
+
+        :param token: the token needed to access the API.
+
+        :param sub_id: the unique identifier for the checklist, e.g. S22893621.
+
+        :param refresh: always download the checklist from the API.
+
+        :return: the details of the checklist, including the list of
+        observations.
+
+        :raises ValueError: if any of the arguments fail the validation checks.
+
+        :raises URLError if there is an error with the connection to the
+        eBird site.
+
+        :raises HTTPError if the eBird API returns an error.
+
+        """
+        sub_id = clean_code(sub_id)
+        if not refresh and self.is_immutable(sub_id):
+            return self.get(sub_id)
+        return self.refresh(token, sub_id)[0]
+
+    def refresh(self, token, sub_id):
+        """Download a checklist from the API and update the store.
+
+        Any response cache is bypassed so the latest version is returned.
+
+        :param token: the token needed to access the API.
+
+        :param sub_id: the unique identifier for the checklist, e.g. S22893621.
+
+        :return: the checklist and True if it is new or it changed.
+        :rtype: tuple
+
+        """
+        with utils.settings(cache=None):
+            checklist = checklists.get_checklist(token, sub_id)
+        return checklist, self.add(checklist)
+
+
+def get_version(value):
+    """Format a version of the taxonomy, as returned in the authorityVer
+    field by get_taxonomy_versions().
+
+    :param value: the version, e.g. 2023.0.
+
+    :return: the version as used in the query string, e.g. '2023'.
+    :rtype: str
+
+    """
+    return "%g" % float(value)
+
+
+class TaxonomyStore:
+    """Keep local copies of the eBird taxonomy, in an SQLite database.
+
+    The taxonomy is downloaded once for each version and locale. After
+    that the only call made to the API is to get_taxonomy_versions(), at
+    most once every check_interval seconds, to see whether there is a new
+    version.
+
+    :param path: the path to the SQLite database file. Use ':memory:' to
+    keep the taxonomy in memory.
+
+    :param check_interval: how often, in seconds, to check for a new
+    version of the taxonomy.
+
+    """
+
+    def __init__(self, path, check_interval=DEFAULT_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._latest = None
+        self._checked = None
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS taxonomies ("
+            " version TEXT NOT NULL,"
+            " locale TEXT NOT NULL,"
+            " content BLOB NOT NULL,"
+            " fetched REAL NOT NULL,"
+            " PRIMARY KEY (version, locale))"
+        )
+
+    def close(self):
+        """Close the connection to the database."""
+        with self._lock:
+            self._connection.close()
+
+    def get_versions(self):
+        """Get the versions, and locales, of the taxonomy in the store.
+
+        :return: a list of (version, locale) tuples.
+
+        """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT version, locale FROM taxonomies ORDER BY version, locale"
+            ).fetchall()
+
+    def get_latest_version(self, token, refresh=False):
+        """Get the latest version of the taxonomy.
+
+        :param token: the token needed to access the API.
+
+        :param refresh: check the API even if it was checked less than
+        check_interval seconds ago.
+
+        :return: the version, e.g. '2023'.
+        :rtype: str
+
+        :raises URLError if there is an error with the connection to the
+        eBird site.
+
+        :raises HTTPError if the eBird API returns an error.
+
+        """
+        now = time.monotonic()
+        if (
+            refresh
+            or self._checked is None
+            or now - self._checked >= self.check_interval
+        ):
+            versions = taxonomy.get_taxonomy_versions(token)
+            latest = [entry for entry in versions if entry.get("latest")]
+            entry = latest[0] if latest else versions[-1]
+            self._latest, self._checked = get_version(entry["authorityVer"]), now
+        return self._latest
+
+    def get(self, version, locale="en"):
+        """Get a version of the taxonomy from the store, without calling
+        the API.
+
+        :param version: the version of the taxonomy, e.g. '2023'.
+
+        :param locale: the language used for the common names.
+
+        :return: the taxonomy, or None if it is not in the store.
+        :rtype: list
+
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content FROM taxonomies WHERE version = ? AND locale = ?",
+                (get_version(version), locale),
+            ).fetchone()
+        return None if row is None else utils.get_json(zlib.decompress(row[0]))
+
+    def get_taxonomy(self, token, locale="en", version=None):
+        """Get the taxonomy, downloading it only if the version and locale
+        are not in the store.
+
+        :param token: the token needed to access the API.
+
+        :param locale: the language used for the common names.
+
+        :param version: the version of the taxonomy. The default, None, is
+        the latest version.
+
+        :return: all the entries in the taxonomy.
+        :rtype: list
+
+        :raises ValueError: if an invalid locale is given.
+
+        :raises URLError if there is an error with the connection to the
+        eBird site.
+
+        :raises HTTPError if the eBird API returns an error.
+
+        """
+        locale = clean_locale(locale)
+        if version is None:
+            version = self.get_latest_version(token)
+        version = get_version(version)
+
+        records = self.get(version, locale)
+        if records is not None:
+            return records
+
+        # Get the bytes, rather than the records, so they can be stored
+        # without being encoded again.
+        content = utils.get_response(
+            *utils.prepare(taxonomy.get_taxonomy, token, locale=locale, version=version)
+        )
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO taxonomies (version, locale, content, fetched)"
+                " VALUES (?, ?, ?, ?)",
+                (version, locale, zlib.compress(content), time.time()),
+            )
+        return utils.get_json(content)
+
+    def delete(self, version, locale=None):
+        """Remove a version of the taxonomy from the store.
+
+        :param version: the version of the taxonomy.
+
+        :param locale: the locale to remove. The default, None, removes all
+        the locales for the version.
+
+        """
+        query = "DELETE FROM taxonomies WHERE version = ?"
+        args = [get_version(version)]
+        if locale is not None:
+            query += " AND locale = ?"
+            args.append(locale)
+        with self._lock:
+            self._connection.execute(query, args)
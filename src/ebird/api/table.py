@@ -0,0 +1,329 @@
+"""Classes for keeping the eBird taxonomy compactly in memory."""
+
+import sys
+from array import array
+from collections.abc import Mapping
+
+from ebird.api import constants
+from ebird.api.validation import clean_locale
+
+# The fields which are translated, so they are stored for each locale.
+LOCALE_FIELDS = ("comName", "familyComName")
+
+# The fields with a different value for almost every record. All the other
+# fields are stored as categories: each distinct value is kept once and
+# each row holds the index of its value.
+UNIQUE_FIELDS = (
+    "speciesCode",
+    "sciName",
+    "comName",
+    "taxonOrder",
+    "bandingCodes",
+    "comNameCodes",
+    "sciNameCodes",
+)
+
+# Used in the columns for the records which do not have a field.
+_MISSING = object()
+
+
+def _intern(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return tuple(_intern(item) for item in value)
+    return value
+
+
+class _ListColumn:
+    """A column which keeps the value for each row."""
+
+    def __init__(self):
+        self.values = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, value):
+        self.values.append(_intern(value))
+
+    def set(self, row, value):
+        self.values[row] = _intern(value)
+
+    def get(self, row):
+        return self.values[row]
+
+
+class _CategoryColumn:
+    """A column which keeps each distinct value once, with the index of
+    the value for each row."""
+
+    def __init__(self):
+        self.values = [_MISSING]
+        self.indexes = {}
+        self.rows = array("I")
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _get_index(self, value):
+        if value is _MISSING:
+            return 0
+        value = _intern(value)
+        index = self.indexes.get(value)
+        if index is None:
+            index = self.indexes[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def append(self, value):
+        self.rows.append(self._get_index(value))
+
+    def set(self, row, value):
+        self.rows[row] = self._get_index(value)
+
+    def get(self, row):
+        return self.values[self.rows[row]]
+
+
+def _get_column(field):
+    return _ListColumn() if field in UNIQUE_FIELDS else _CategoryColumn()
+
+
+class TaxonomyRow(Mapping):
+    """A read-only, dict-like view of one record in a TaxonomyTable.
+
+    The values are read from the table's columns when they are accessed.
+    Use dict(row) to get a copy of the record.
+
+    """
+
+    __slots__ = ("table", "row", "locale")
+
+    def __init__(self, table, row, locale):
+        self.table = table
+        self.row = row
+        self.locale = locale
+
+    def __getitem__(self, field):
+        value = self.table.get_value(self.row, field, self.locale)
+        if value is _MISSING:
+            raise KeyError(field)
+        if isinstance(value, tuple):
+            return list(value)
+        return value
+
+    def __iter__(self):
+        for field in self.table.fields:
+            if self.table.get_value(self.row, field, self.locale) is not _MISSING:
+                yield field
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return "TaxonomyRow(%r)" % dict(self)
+
+
+class TaxonomyTable:
+    """The taxonomy, for one or more locales, stored by column.
+
+    The list returned by get_taxonomy() is a dict for each of the 17,000
+    or so records, which repeats all the keys, and the same family names,
+    orders and categories, many times. Keeping it for lots of locales means
+    keeping all of that once for each locale. The table keeps one column
+    for each field instead. Fields with few distinct values, such as order
+    or category, keep each value once with a small integer for each row,
+    and all the strings are interned. Only the translated fields, see
+    LOCALE_FIELDS, are stored again for each locale.
+
+    Each record has a row number, its position in taxonomic order. Rows are
+    returned as TaxonomyRow objects, which behave like the original dicts
+    but are only created when they are needed:
+
+        table = TaxonomyTable(get_taxonomy(api_key))
+        table.add_locale("es", get_taxonomy(api_key, locale="es"))
+        table.get("horlar", locale="es")["comName"]  # 'Alondra Cornuda'
+
+    :param records: the taxonomy, as returned by get_taxonomy().
+
+    :param locale: the language used for the common names in the records.
+
+    """
+
+    def __init__(self, records, locale=constants.DEFAULT_LOCALE):
+        self.locale = clean_locale(locale)
+        self.fields = []
+        self._columns = {}
+        self._translations = {self.locale: {}}
+        self._rows = {}
+        self._size = 0
+
+        for record in records:
+            self._append(record)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return self.rows()
+
+    def __getitem__(self, row):
+        if not -self._size <= row < self._size:
+            raise IndexError("Row %s is out of range" % row)
+        return TaxonomyRow(self, row % self._size, self.locale)
+
+    def _add_field(self, field):
+        self.fields.append(field)
+        if field in LOCALE_FIELDS:
+            columns = self._translations[self.locale]
+        else:
+            columns = self._columns
+        column = columns[field] = _get_column(field)
+        for _ in range(self._size):
+            column.append(_MISSING)
+
+    def _append(self, record):
+        translations = self._translations[self.locale]
+        for field in record:
+            if field not in self._columns and field not in translations:
+                self._add_field(field)
+        for field in self.fields:
+            column = self._columns.get(field)
+            if column is None:
+                column = translations[field]
+            column.append(record.get(field, _MISSING))
+        self._rows[record["speciesCode"]] = self._size
+        self._size += 1
+
+    def _get_locale(self, locale):
+        locale = locale or self.locale
+        if locale not in self._translations:
+            raise KeyError("The locale %s has not been added" % locale)
+        return locale
+
+    def add_locale(self, locale, records):
+        """Add the translated fields, e.g. the common names, for a locale.
+
+        :param locale: the language used for the common names, e.g. 'es'.
+
+        :param records: the taxonomy, as returned by get_taxonomy(), for
+        the locale. The records are matched using the species code. Records
+        which are not in the table are ignored. For any record which is
+        missing, the values from the table's locale are used.
+
+        """
+        columns = {}
+        for field in self._translations[self.locale]:
+            column = columns[field] = _get_column(field)
+            for _ in range(self._size):
+                column.append(_MISSING)
+        for record in records:
+            row = self._rows.get(record["speciesCode"])
+            if row is not None:
+                for field, column in columns.items():
+                    column.set(row, record.get(field, _MISSING))
+        self._translations[clean_locale(locale)] = columns
+
+    def get_locales(self):
+        """Get the locales which have been added.
+
+        :return: the locales, sorted.
+        :rtype: list
+
+        """
+        return sorted(self._translations)
+
+    def get_value(self, row, field, locale=None):
+        """Get the value of a field for a row.
+
+        :param row: the row number.
+
+        :param field: the name of the field, e.g. 'familyComName'.
+
+        :param locale: the language for translated fields. The default,
+        None, uses the table's locale.
+
+        :return: the value. Lists, e.g. bandingCodes, are returned as
+        tuples. A special value, which is not None, is returned if the
+        record does not have the field, see TaxonomyRow.
+
+        :raises KeyError: if the locale has not been added.
+
+        """
+        column = self._columns.get(field)
+        if column is not None:
+            return column.get(row)
+        translations = self._translations[self._get_locale(locale)]
+        if field not in translations:
+            return _MISSING
+        value = translations[field].get(row)
+        if value is _MISSING and locale not in (None, self.locale):
+            value = self._translations[self.locale][field].get(row)
+        return value
+
+    def get_row(self, code):
+        """Get the row number for a species.
+
+        :param code: the species code, e.g. 'horlar'.
+
+        :return: the row number, or None if the species is not in the table.
+        :rtype: int
+
+        """
+        return self._rows.get(code)
+
+    def get(self, code, locale=None):
+        """Get the record for a species.
+
+        :param code: the species code, e.g. 'horlar'.
+
+        :param locale: the language for the translated fields. The default,
+        None, uses the table's locale.
+
+        :return: the record, or None if the species is not in the table.
+        :rtype: TaxonomyRow
+
+        :raises KeyError: if the locale has not been added.
+
+        """
+        row = self._rows.get(code)
+        if row is None:
+            return None
+        return TaxonomyRow(self, row, self._get_locale(locale))
+
+    def rows(self, locale=None):
+        """Iterate over the records in taxonomic order.
+
+        :param locale: the language for the translated fields. The default,
+        None, uses the table's locale.
+
+        :return: an iterator over the TaxonomyRow for each record.
+
+        :raises KeyError: if the locale has not been added.
+
+        """
+        locale = self._get_locale(locale)
+        return (TaxonomyRow(self, row, locale) for row in range(self._size))
+
+    def column(self, field, locale=None):
+        """Get all the values for a field.
+
+        :param field: the name of the field, e.g. 'speciesCode'.
+
+        :param locale: the language for translated fields. The default,
+        None, uses the table's locale.
+
+        :return: the value for each row, in taxonomic order, with None for
+        the records which do not have the field.
+        :rtype: list
+
+        :raises KeyError: if the locale has not been added.
+
+        """
+        locale = self._get_locale(locale)
+        values = []
+        for row in range(self._size):
+            value = self.get_value(row, field, locale)
+            values.append(None if value is _MISSING else value)
+        return values
@@ -1,6 +1,6 @@
 """Functions for fetching information about the taxonomy used by eBird."""
 
-from ebird.api.utils import call
+from ebird.api.utils import call, get_stream, prepare
 from ebird.api.validation import (
     clean_categories,
     clean_codes,
@@ -84,7 +84,8 @@ def get_taxonomy_forms(token, species):
 
     :return: the list of codes of each sub-species.
 
-    :raises ValueError is the species code is invalid (not 6 letters).
+    :raises ValueError is the species code is invalid (not 6 letters,
+    optionally followed by digits).
 
     :raises URLError if there is an error with the connection to the
     eBird site.
@@ -211,3 +212,25 @@ def get_taxonomy_locales(token):
     }
 
     return call(TAXONOMY_LOCALES_URL, {}, headers)
+
+
+def iter_taxonomy(*args, **kwargs):
+    """Iterate over the full or specific subset of the taxonomy used by eBird.
+
+    This takes the same arguments as get_taxonomy() but the entries are
+    decoded and yielded one at a time as the response is read, rather than
+    all at once when it is complete.
+
+    :return: an iterator over the entries in the taxonomy.
+
+    :raises ValueError: if an invalid category or locale is given. The
+    arguments are checked, and the request sent, when this function is
+    called, not when the first entry is read.
+
+    :raises URLError if there is an error with the connection to the
+    eBird site.
+
+    :raises HTTPError if the eBird API returns an error.
+
+    """
+    return get_stream(*prepare(get_taxonomy, *args, **kwargs))
@@ -0,0 +1,751 @@
+"""Classes for managing the connections to the eBird API."""
+
+import asyncio
+import http.client
+import io
+import os
+import socket
+import ssl
+import threading
+import time
+import zlib
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_IDLE_TIMEOUT = 30.0
+MAX_REDIRECTS = 5
+CHUNK_SIZE = 64 * 1024
+
+ACCEPT_ENCODING = "gzip, deflate"
+
+_REDIRECTS = (301, 302, 303, 307, 308)
+
+# Errors raised when a connection taken from the pool was closed by
+# the server while it sat idle. The request is repeated on a new one.
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class Response(bytes):
+    """The (decoded) content returned by the server.
+
+    This is a bytes object so it can be used anywhere the content is
+    expected. The attributes describe the response: status, reason and headers,
+    the number of bytes received, wire_bytes, and the number of bytes
+    after the content was decompressed, decoded_bytes.
+
+    """
+
+    status = 200
+    reason = "OK"
+    wire_bytes = 0
+
+    def __new__(cls, *args, **kwargs):
+        response = super().__new__(cls, *args, **kwargs)
+        response.headers = {}
+        return response
+
+    @property
+    def decoded_bytes(self):
+        return len(self)
+
+
+class ContentReader:
+    """Read and decompress the content of a response, a chunk at a time.
+
+    The content is decompressed as it is read, so the compressed and
+    decompressed copies of the content are never held in memory at the
+    same time.
+
+    :param fp: the file-like object with the content, e.g. HTTPResponse.
+    It is only used when iterating over the reader. Otherwise the chunks
+    can be passed to decode() as they are received.
+
+    :param encoding: the value of the Content-Encoding header.
+
+    :raises URLError: if the encoding is not supported.
+
+    """
+
+    def __init__(self, fp, encoding=None):
+        self.fp = fp
+        self.encoding = (encoding or "identity").strip().lower()
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        if self.encoding in ("gzip", "x-gzip"):
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.encoding in ("deflate", "identity"):
+            self._decompressor = None
+        else:
+            raise URLError("Unsupported Content-Encoding: %s" % encoding)
+
+    def decode(self, data):
+        """Decompress a chunk of the content, as received from the server.
+
+        :param data: the bytes received.
+
+        :return: the decompressed bytes, which may be empty.
+
+        :raises URLError: if the content cannot be decompressed.
+
+        """
+        self.wire_bytes += len(data)
+        if self.encoding == "identity":
+            decoded = data
+        else:
+            if self._decompressor is None:
+                # Servers send deflate either with a zlib header, as the
+                # standard requires, or as a raw stream, so check which.
+                wrapped = len(data) > 1 and (data[0] & 0x0F) == 8
+                wrapped = wrapped and (data[0] << 8 | data[1]) % 31 == 0
+                wbits = zlib.MAX_WBITS if wrapped else -zlib.MAX_WBITS
+                self._decompressor = zlib.decompressobj(wbits)
+            try:
+                decoded = self._decompressor.decompress(data)
+            except zlib.error as err:
+                raise URLError("Could not decompress the content: %s" % err)
+        self.decoded_bytes += len(decoded)
+        return decoded
+
+    def flush(self):
+        """Get any remaining content once all the chunks have been decoded.
+
+        :return: the decompressed bytes, which may be empty.
+
+        """
+        if self._decompressor is None:
+            return b""
+        decoded = self._decompressor.flush()
+        self.decoded_bytes += len(decoded)
+        return decoded
+
+    def __iter__(self):
+        while True:
+            data = self.fp.read(CHUNK_SIZE)
+            if not data:
+                break
+            decoded = self.decode(data)
+            if decoded:
+                yield decoded
+
+        decoded = self.flush()
+        if decoded:
+            yield decoded
+
+
+def _split_url(url):
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        raise URLError("Unsupported URL scheme: %s" % parts.scheme)
+    key = (parts.scheme, parts.hostname, parts.port)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return key, parts.netloc, path
+
+
+class Stream:
+    """The content of a response, read and decompressed a chunk at a time.
+
+    Iterating over a Stream yields the decompressed chunks of content as
+    they are received. Once all the content has been read, the connection
+    is returned to the pool it came from. If the Stream is closed before
+    then, the connection is closed, since the rest of the response would
+    still be waiting to be read.
+
+    :param response: the response, from http.client or urllib.
+
+    :param release: a function called, once, when the stream is finished
+    with, with True if all the content was read. The default is to close
+    the response.
+
+    """
+
+    def __init__(self, response, release=None):
+        self.response = response
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self._reader = ContentReader(response, response.getheader("Content-Encoding"))
+        self._release = release or (lambda complete: response.close())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def wire_bytes(self):
+        return self._reader.wire_bytes
+
+    @property
+    def decoded_bytes(self):
+        return self._reader.decoded_bytes
+
+    def __iter__(self):
+        try:
+            yield from self._reader
+        except (OSError, http.client.HTTPException) as err:
+            self._finish(False)
+            raise URLError(err)
+        self._finish(True)
+
+    def _finish(self, complete):
+        release, self._release = self._release, None
+        if release is not None:
+            release(complete)
+
+    def close(self):
+        """Finish with the stream, closing the connection if it was not
+        completely read."""
+        self._finish(False)
+
+    def read(self):
+        """Read all the remaining content.
+
+        :return: the decompressed content.
+        :rtype: Response
+
+        """
+        content = bytearray()
+        for chunk in self:
+            content += chunk
+        result = Response(content)
+        result.status = self.status
+        result.reason = self.reason
+        result.headers = self.headers
+        result.wire_bytes = self.wire_bytes
+        return result
+
+
+def read_response(response):
+    """Read the content from an HTTP response.
+
+    :param response: the response, from http.client or urllib.
+
+    :return: the decompressed content.
+    :rtype: Response
+
+    """
+    with Stream(response) as stream:
+        return stream.read()
+
+
+class ConnectionPool:
+    """A thread-safe pool of persistent (keep-alive) HTTP connections.
+
+    Connections are kept for each host so each request to the eBird API
+    does not pay the cost of a new TCP connection and TLS handshake.
+    Connections which have been idle for longer than idle_timeout seconds
+    are closed rather than reused, since the server has probably dropped
+    them already. If the process forks, e.g. to start the workers for a
+    server, the child drops the connections it inherited, since sharing
+    them with the parent would corrupt the responses in both.
+
+    :param max_size: the maximum number of idle connections kept for
+    each host. There is no limit on the number of connections in use at
+    the same time; connections are simply closed when they are returned
+    to a full pool.
+
+    :param idle_timeout: the number of seconds an idle connection is kept.
+
+    :param timeout: the timeout, in seconds, for the socket operations.
+    The default of None uses the value set by socket.setdefaulttimeout().
+
+    """
+
+    def __init__(
+        self,
+        max_size=DEFAULT_POOL_SIZE,
+        idle_timeout=DEFAULT_IDLE_TIMEOUT,
+        timeout=None,
+    ):
+        if max_size < 0:
+            raise ValueError("Value for 'max_size', %s, cannot be negative" % max_size)
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._context = None
+        self._pid = os.getpid()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _connect(self, key):
+        scheme, host, port = key
+        kwargs = {} if self.timeout is None else {"timeout": self.timeout}
+        if scheme == "https":
+            if self._context is None:
+                self._context = ssl.create_default_context()
+            return http.client.HTTPSConnection(
+                host, port, context=self._context, **kwargs
+            )
+        return http.client.HTTPConnection(host, port, **kwargs)
+
+    def _check_process(self):
+        # The connections, and the lock, belong to the process which
+        # created them. They are dropped, not closed, in a forked process
+        # so the parent can keep using them.
+        pid = os.getpid()
+        if pid != self._pid:
+            self._idle = {}
+            self._lock = threading.Lock()
+            self._pid = pid
+
+    def _acquire(self, key):
+        self._check_process()
+        expired = []
+        connection = None
+        now = time.monotonic()
+
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used < self.idle_timeout:
+                    connection = conn
+                    break
+                expired.append(conn)
+
+        for conn in expired:
+            conn.close()
+
+        return connection
+
+    def _release(self, key, connection):
+        self._check_process()
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_size:
+                idle.append((connection, time.monotonic()))
+                return
+        connection.close()
+
+    def size(self, host=None):
+        """Get the number of idle connections in the pool.
+
+        :param host: count only the connections to this host. The default
+        is to count the connections for all hosts.
+
+        :return: the number of idle connections.
+
+        """
+        self._check_process()
+        with self._lock:
+            return sum(
+                len(idle)
+                for key, idle in self._idle.items()
+                if host is None or key[1] == host
+            )
+
+    def evict(self):
+        """Close all the connections which have been idle for too long."""
+        self._check_process()
+        expired = []
+        now = time.monotonic()
+
+        with self._lock:
+            for key, idle in self._idle.items():
+                keep = []
+                for conn, last_used in idle:
+                    if now - last_used < self.idle_timeout:
+                        keep.append((conn, last_used))
+                    else:
+                        expired.append(conn)
+                self._idle[key] = keep
+
+        for conn in expired:
+            conn.close()
+
+    def close(self):
+        """Close all the idle connections."""
+        self._check_process()
+        with self._lock:
+            idle, self._idle = self._idle, {}
+
+        for connections in idle.values():
+            for conn, _ in connections:
+                conn.close()
+
+    def _send(self, key, path, headers):
+        connection = self._acquire(key)
+        reused = connection is not None
+
+        while True:
+            if connection is None:
+                connection = self._connect(key)
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+            except _STALE_ERRORS as err:
+                connection.close()
+                if not reused:
+                    raise URLError(err)
+                connection, reused = None, False
+                continue
+            except (OSError, http.client.HTTPException) as err:
+                connection.close()
+                raise URLError(err)
+
+            def release(complete):
+                if complete and not response.will_close:
+                    self._release(key, connection)
+                else:
+                    connection.close()
+
+            return Stream(response, release)
+
+    def open(self, url, headers=None):
+        """Send a GET request and return the response, without reading it.
+
+        The request accepts content compressed with gzip or deflate,
+        unless the headers include Accept-Encoding.
+
+        :param url: the URL, including any query string.
+        :type url: str
+
+        :param headers: the headers to add to the request.
+        :type headers: dict
+
+        :return: the response, which must be read completely, or closed.
+        :rtype: Stream
+
+        :raises URLError if there is an error with the connection.
+
+        :raises HTTPError if the server returns an error.
+
+        """
+        headers = dict(headers or {})
+        headers.setdefault("Accept-Encoding", ACCEPT_ENCODING)
+
+        for _ in range(MAX_REDIRECTS + 1):
+            key, _, path = _split_url(url)
+            stream = self._send(key, path, headers)
+
+            location = stream.headers.get("Location")
+            if stream.status in _REDIRECTS and location:
+                stream.read()
+                url = urljoin(url, location)
+                continue
+
+            if stream.status >= 300:
+                raise HTTPError(
+                    url,
+                    stream.status,
+                    stream.reason,
+                    stream.headers,
+                    io.BytesIO(stream.read()),
+                )
+
+            return stream
+
+        raise URLError("Too many redirects: %s" % url)
+
+    def request(self, url, headers=None):
+        """Send a GET request and return the content of the response.
+
+        The request accepts content compressed with gzip or deflate,
+        unless the headers include Accept-Encoding.
+
+        :param url: the URL, including any query string.
+        :type url: str
+
+        :param headers: the headers to add to the request.
+        :type headers: dict
+
+        :return: the decompressed content returned by the server.
+        :rtype: Response
+
+        :raises URLError if there is an error with the connection.
+
+        :raises HTTPError if the server returns an error.
+
+        """
+        with self.open(url, headers) as stream:
+            return stream.read()
+
+
+class AsyncConnectionPool:
+    """A pool of persistent (keep-alive) HTTP connections for asyncio.
+
+    This works the same way as ConnectionPool except that the requests
+    are sent using asyncio streams so waiting for a response does not
+    block the event loop. Connections belong to the event loop in which
+    they were opened, so if the pool is used in a new event loop, e.g. in
+    a second call to asyncio.run(), the existing connections are dropped.
+
+    :param max_size: the maximum number of idle connections kept for
+    each host.
+
+    :param idle_timeout: the number of seconds an idle connection is kept.
+
+    :param timeout: the time, in seconds, allowed for each request. The
+    default of None uses the value set by socket.setdefaulttimeout().
+
+    """
+
+    def __init__(
+        self,
+        max_size=DEFAULT_POOL_SIZE,
+        idle_timeout=DEFAULT_IDLE_TIMEOUT,
+        timeout=None,
+    ):
+        if max_size < 0:
+            raise ValueError("Value for 'max_size', %s, cannot be negative" % max_size)
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle = {}
+        self._context = None
+        self._loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    async def _connect(self, key):
+        scheme, host, port = key
+        if scheme == "https":
+            if self._context is None:
+                self._context = ssl.create_default_context()
+            return await asyncio.open_connection(host, port or 443, ssl=self._context)
+        return await asyncio.open_connection(host, port or 80)
+
+    @staticmethod
+    def _close(writer):
+        try:
+            writer.close()
+        except RuntimeError:
+            pass  # The event loop for the connection is already closed.
+
+    def _acquire(self, key):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self.close()
+            self._loop = loop
+
+        now = time.monotonic()
+        idle = self._idle.get(key, [])
+        while idle:
+            reader, writer, last_used = idle.pop()
+            if now - last_used < self.idle_timeout and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    def _release(self, key, reader, writer):
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.max_size:
+            idle.append((reader, writer, time.monotonic()))
+        else:
+            writer.close()
+
+    def size(self, host=None):
+        """Get the number of idle connections in the pool.
+
+        :param host: count only the connections to this host. The default
+        is to count the connections for all hosts.
+
+        :return: the number of idle connections.
+
+        """
+        return sum(
+            len(idle)
+            for key, idle in self._idle.items()
+            if host is None or key[1] == host
+        )
+
+    def evict(self):
+        """Close all the connections which have been idle for too long."""
+        now = time.monotonic()
+        for key, idle in self._idle.items():
+            keep = []
+            for reader, writer, last_used in idle:
+                if now - last_used < self.idle_timeout:
+                    keep.append((reader, writer, last_used))
+                else:
+                    writer.close()
+            self._idle[key] = keep
+
+    def close(self):
+        """Close all the idle connections."""
+        idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for _, writer, _ in connections:
+                self._close(writer)
+
+    @staticmethod
+    async def _read_head(reader):
+        line = await reader.readline()
+        if not line:
+            raise http.client.RemoteDisconnected(
+                "Remote end closed connection without response"
+            )
+        parts = line.decode("iso-8859-1").rstrip("\r\n").split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise http.client.BadStatusLine(line)
+
+        headers = http.client.HTTPMessage()
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("iso-8859-1").partition(":")
+            headers[name.strip()] = value.strip()
+
+        status = int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ""
+        keep_alive = parts[0] == "HTTP/1.1"
+        keep_alive = keep_alive and headers.get("Connection", "").lower() != "close"
+
+        return status, reason, headers, keep_alive
+
+    @staticmethod
+    async def _read_body(reader, status, headers, content_reader):
+        content = bytearray()
+
+        if status in (204, 304) or 100 <= status < 200:
+            return content, True
+
+        if "chunked" in headers.get("Transfer-Encoding", "").lower():
+            while True:
+                line = await reader.readline()
+                size = int(line.split(b";")[0].strip(), 16)
+                if size == 0:
+                    break
+                content += content_reader.decode(await reader.readexactly(size))
+                await reader.readexactly(2)
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            complete = True
+        elif "Content-Length" in headers:
+            remaining = int(headers["Content-Length"])
+            while remaining:
+                data = await reader.read(min(CHUNK_SIZE, remaining))
+                if not data:
+                    raise http.client.IncompleteRead(bytes(content), remaining)
+                remaining -= len(data)
+                content += content_reader.decode(data)
+            complete = True
+        else:
+            while True:
+                data = await reader.read(CHUNK_SIZE)
+                if not data:
+                    break
+                content += content_reader.decode(data)
+            complete = False
+
+        content += content_reader.flush()
+        return content, complete
+
+    async def _send(self, key, netloc, path, headers):
+        connection = self._acquire(key)
+        reused = connection is not None
+
+        lines = ["GET %s HTTP/1.1" % path, "Host: %s" % netloc]
+        lines.extend("%s: %s" % (name, value) for name, value in headers.items())
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("iso-8859-1")
+
+        while True:
+            if connection is None:
+                connection = await self._connect(key)
+            reader, writer = connection
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, reason, message, keep_alive = await self._read_head(reader)
+                content_reader = ContentReader(None, message.get("Content-Encoding"))
+                content, complete = await self._read_body(
+                    reader, status, message, content_reader
+                )
+            except _STALE_ERRORS as err:
+                writer.close()
+                if not reused:
+                    raise URLError(err)
+                connection, reused = None, False
+                continue
+            except (OSError, EOFError, http.client.HTTPException) as err:
+                writer.close()
+                raise URLError(err)
+            except BaseException:
+                # Cancelled, part way through a request, so the connection
+                # cannot be reused.
+                writer.close()
+                raise
+
+            if keep_alive and complete:
+                self._release(key, reader, writer)
+            else:
+                writer.close()
+
+            response = Response(content)
+            response.status = status
+            response.reason = reason
+            response.headers = message
+            response.wire_bytes = content_reader.wire_bytes
+            return response
+
+    async def request(self, url, headers=None):
+        """Send a GET request and return the content of the response.
+
+        The request accepts content compressed with gzip or deflate,
+        unless the headers include Accept-Encoding.
+
+        :param url: the URL, including any query string.
+        :type url: str
+
+        :param headers: the headers to add to the request.
+        :type headers: dict
+
+        :return: the decompressed content returned by the server.
+        :rtype: Response
+
+        :raises URLError if there is an error with the connection or the
+        request timed out.
+
+        :raises HTTPError if the server returns an error.
+
+        """
+        headers = dict(headers or {})
+        headers.setdefault("Accept-Encoding", ACCEPT_ENCODING)
+        timeout = socket.getdefaulttimeout() if self.timeout is None else self.timeout
+
+        for _ in range(MAX_REDIRECTS + 1):
+            key, netloc, path = _split_url(url)
+            try:
+                response = await asyncio.wait_for(
+                    self._send(key, netloc, path, headers), timeout
+                )
+            except asyncio.TimeoutError:
+                raise URLError(socket.timeout("timed out"))
+
+            location = response.headers.get("Location")
+            if response.status in _REDIRECTS and location:
+                url = urljoin(url, location)
+                continue
+
+            if response.status >= 300:
+                raise HTTPError(
+                    url,
+                    response.status,
+                    response.reason,
+                    response.headers,
+                    io.BytesIO(response),
+                )
+
+            return response
+
+        raise URLError("Too many redirects: %s" % url)
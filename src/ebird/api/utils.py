@@ -1,10 +1,98 @@
 """Various functions used in the API."""
 
+import codecs
+import contextvars
+import importlib
 import json
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.error import HTTPError
+from urllib.parse import urlencode, urlsplit
+from urllib.request import Request, getproxies, urlopen
 
 from ebird.api import constants
+from ebird.api.cache import get_endpoint
+from ebird.api.metrics import Metrics
+from ebird.api.transport import (
+    ACCEPT_ENCODING,
+    ConnectionPool,
+    Stream,
+    read_response,
+)
+
+
+def _orjson():
+    loads = importlib.import_module("orjson").loads
+    return lambda content: loads(memoryview(content))
+
+
+def _msgspec():
+    decode = importlib.import_module("msgspec.json").decode
+    return lambda content: decode(memoryview(content))
+
+
+def _json():
+    return json.loads
+
+
+# The JSON decoders, in order of preference. orjson and msgspec are faster
+# than the standard library and parse the bytes in place, without first
+# copying them to a str.
+_decoders = {
+    "orjson": _orjson,
+    "msgspec": _msgspec,
+    "json": _json,
+}
+
+
+def get_decoder(name=None):
+    """Get a function for decoding the JSON returned by the eBird API.
+
+    :param name: the name of the decoder, 'orjson', 'msgspec' or 'json'.
+    The default, None, returns the fastest decoder which is installed.
+
+    :return: a function which takes the bytes of a response and returns
+    the decoded records.
+
+    :raises ValueError: if the name of the decoder is not recognised.
+
+    :raises ImportError: if the package for the decoder is not installed.
+
+    """
+    if name is not None:
+        if name not in _decoders:
+            raise ValueError("Unknown decoder: %s" % name)
+        return _decoders[name]()
+
+    for factory in _decoders.values():
+        try:
+            return factory()
+        except ImportError:
+            pass
+
+
+# The settings used for every call to the eBird API. The defaults are
+# shared by all threads. They can be changed for the current thread or
+# asyncio task, which is how Client applies its own settings.
+_settings = {
+    "pool": ConnectionPool(),
+    "metrics": Metrics(),
+    "limiter": None,
+    "retry": None,
+    "coalesce": None,
+    "decoder": get_decoder(),
+    "cache": None,
+    "names": None,
+}
+
+_overrides = ContextVar("ebird.api.settings", default={})
+
+# Set by prepare() so call() returns the request rather than sending it.
+_preparing = ContextVar("ebird.api.preparing", default=False)
+
+PreparedCall = namedtuple("PreparedCall", ["url", "params", "headers"])
 
 _parameter_defaults = {
     "back": constants.DEFAULT_BACK,
@@ -23,6 +111,16 @@ _parameter_defaults = {
     "rankedBy": constants.DEFAULT_TOP_100_RANK,
 }
 
+# The parameters which contain a comma-separated list of codes where the
+# order does not matter.
+_unordered_parameters = ("r", "cat", "species")
+
+# The endpoints which return the common names in the locale in sppLocale.
+_localized_endpoints = ("data/obs/", "data/nearest/")
+
+# The characters which can continue a number in JSON.
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
 _parameter_map = {
     "maxObservations": "maxResults",
     "maxObservers": "maxResults",
@@ -30,6 +128,80 @@ _parameter_map = {
 }
 
 
+def configure(**kwargs):
+    """Change the default settings used for all calls to the eBird API.
+
+    :param pool: the ConnectionPool used to send requests. Set it to None
+    to open a new connection for each request.
+
+    :param metrics: the Metrics where the details of each call are recorded.
+    Set it to None to turn off recording.
+
+    :param limiter: the RateLimiter used to limit the number of calls made
+    with each API token. The default is None, no limit.
+
+    :param retry: the RetryPolicy used to retry calls which fail because of
+    a transient error. The default is None, calls are not retried.
+
+    :param coalesce: the SingleFlight used to combine identical calls which
+    are made at the same time. The default is None, calls are not combined.
+
+    :param decoder: the function used to decode the JSON in each response,
+    which takes bytes. The default is the fastest one installed, see
+    get_decoder().
+
+    :param cache: the Cache, e.g. a MemoryCache, where responses are kept
+    so identical calls do not have to be sent to the API again. The default
+    is None, responses are not cached.
+
+    :param names: the CommonNames used to translate the common names in
+    observations, so they are fetched, and cached, in a single locale. The
+    default is None, the API returns the names in the locale requested.
+
+    :raises ValueError: if the name of a setting is not recognised.
+
+    """
+    for name, value in kwargs.items():
+        if name not in _settings:
+            raise ValueError("Unknown setting: %s" % name)
+        _settings[name] = value
+
+
+@contextmanager
+def settings(**kwargs):
+    """Change the settings used for calls to the eBird API made in the
+    current thread or asyncio task, within a with block.
+
+    Accepts the same arguments as configure().
+
+    :raises ValueError: if the name of a setting is not recognised.
+
+    """
+    for name in kwargs:
+        if name not in _settings:
+            raise ValueError("Unknown setting: %s" % name)
+    token = _overrides.set({**_overrides.get(), **kwargs})
+    try:
+        yield
+    finally:
+        _overrides.reset(token)
+
+
+def get_setting(name):
+    """Get the current value for one of the settings.
+
+    :param name: the name of the setting, e.g. 'pool'.
+
+    :return: the value set for the current thread or task, if any, otherwise
+    the default value.
+
+    """
+    overrides = _overrides.get()
+    if name in overrides:
+        return overrides[name]
+    return _settings[name]
+
+
 def map_parameters(params):
     """Translate the names of the query parameters to match those used
     in the API.
@@ -74,6 +246,72 @@ def filter_parameters(params):
     return filtered
 
 
+def get_url(url, params=None):
+    """Add the query string to the URL for an API call.
+
+    :param url: the URL for the API call.
+    :type url: str
+
+    :param params: the query parameters for the API call.
+    :type params: dict
+
+    :return: the URL with the parameters added.
+    :rtype: str
+
+    """
+    if params:
+        url += "?" + urlencode(params, doseq=True)
+    return url
+
+
+def get_key(url, params=None):
+    """Get the key which identifies a call to the API.
+
+    Calls with the same key return the same results so they can share a
+    single request and the same entry in the cache. The key is built from
+    the URL and the parameters, after they are cleaned, filtered and mapped
+    by call(), so a request which differs only in the case of the codes or
+    in parameters set to their default values already has the same key.
+    In addition, the key is made canonical:
+
+        * The comma-separated lists of codes which can be given in any order,
+          e.g. the areas in 'r', are sorted and any duplicates are removed.
+        * When the list of areas is sent in 'r', the area in the path of the
+          URL is replaced with the first one in the sorted list. An 'r'
+          containing a single area, the one in the path, is removed.
+        * The parameters are sorted by name.
+
+    :param url: the URL for the API call.
+    :type url: str
+
+    :param params: the filtered and mapped query parameters for the API call.
+    :type params: dict
+
+    :return: the URL with the canonical parameters added.
+    :rtype: str
+
+    """
+    params = dict(params or {})
+
+    for name in _unordered_parameters:
+        if isinstance(params.get(name), str):
+            codes = {code.strip() for code in params[name].split(",")}
+            params[name] = ",".join(sorted(codes - {""}))
+
+    if params.get("r"):
+        areas = params["r"].split(",")
+        parts = urlsplit(url)
+        segments = [
+            areas[0] if segment in areas else segment
+            for segment in parts.path.split("/")
+        ]
+        url = parts._replace(path="/".join(segments)).geturl()
+        if len(areas) == 1 and areas[0] in segments:
+            del params["r"]
+
+    return get_url(url, dict(sorted(params.items())))
+
+
 def get_response(url, params=None, headers=None):
     """Get the content from the eBird API.
 
@@ -86,38 +324,198 @@ def get_response(url, params=None, headers=None):
     :param headers: the headers to add to the request.
     :type params: dict
 
-    :return: the content returned by the API
-    :rtype: str
+    :return: the content returned by the API, decompressed if the response
+    was compressed with gzip or deflate.
+    :rtype: ebird.api.transport.Response
 
     :raises URLError if there is an error with the connection to the
     eBird site.
 
     :raises HTTPError if the eBird API returns an error.
 
+    If a RetryPolicy is set then transient errors are retried and only
+    raised once all the attempts fail.
+
     """
-    if params:
-        url += "?" + urlencode(params, doseq=True)
+    url = get_url(url, params)
+
+    pool = get_setting("pool")
+    metrics = get_setting("metrics")
+    limiter = get_setting("limiter")
+    retry = get_setting("retry")
+
+    def send():
+        if limiter is not None:
+            limiter.acquire((headers or {}).get("X-eBirdApiToken"))
+        if _use_pool(pool, url):
+            return pool.request(url, headers)
+        return read_response(_urlopen(url, headers))
+
+    content = send() if retry is None else retry.call(send, metrics)
+
+    if metrics is not None:
+        metrics.record_response(url, content)
+
+    return content
+
+
+def _use_pool(pool, url):
+    # The pool does not support proxies so fall back to urllib for them.
+    return pool is not None and not getproxies().get(urlsplit(url).scheme)
 
+
+def _urlopen(url, headers):
     request = Request(url)
+    request.add_header("Accept-Encoding", ACCEPT_ENCODING)
 
     if headers:
         for name, value in headers.items():
             request.add_header(name, value)
 
-    return urlopen(request).read()
+    return urlopen(request)
+
+
+def get_stream(url, params=None, headers=None):
+    """Get the content from the eBird API, one record at a time.
+
+    The records are decoded as the response is read, so the first record
+    is available as soon as it is received and only a small part of the
+    response is held in memory at any time.
+
+    The request is sent when the function is called. Any connection error
+    raised before the first record is returned is retried if a RetryPolicy
+    is set.
+
+    :param url: the URL for the API call.
+    :type url: str
+
+    :param params: the query parameters for the API call.
+    :type params: dict
+
+    :param headers: the headers to add to the request.
+    :type params: dict
+
+    :return: an iterator over the records, see iter_json().
+
+    :raises URLError if there is an error with the connection to the
+    eBird site.
+
+    :raises HTTPError if the eBird API returns an error.
+
+    """
+    url = get_url(url, params)
+
+    pool = get_setting("pool")
+    metrics = get_setting("metrics")
+    limiter = get_setting("limiter")
+    retry = get_setting("retry")
+
+    def send():
+        if limiter is not None:
+            limiter.acquire((headers or {}).get("X-eBirdApiToken"))
+        if _use_pool(pool, url):
+            return pool.open(url, headers)
+        return Stream(_urlopen(url, headers))
+
+    stream = send() if retry is None else retry.call(send, metrics)
+
+    def records():
+        with stream:
+            yield from iter_json(stream)
+        if metrics is not None:
+            metrics.record(url, stream.status, stream.wire_bytes, stream.decoded_bytes)
+
+    return records()
+
+
+def iter_json(chunks):
+    """Decode the records in a JSON array, as the content is received.
+
+    :param chunks: an iterable with the content, as bytes, in pieces of
+    any size.
+
+    :return: an iterator which yields each item in the array. If the content
+    is not an array, the value is returned as a single item.
+
+    :raises ValueError: if the content is not valid JSON.
+
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    text, pos, state = "", 0, "start"
+    chunks = iter(chunks)
+    final = False
+
+    while state != "end":
+        try:
+            text = text[pos:] + utf8.decode(next(chunks))
+        except StopIteration:
+            text, final = text[pos:] + utf8.decode(b"", final=True), True
+        pos = 0
+
+        while True:
+            while pos < len(text) and text[pos] in " \t\n\r":
+                pos += 1
+            if pos == len(text):
+                break
+
+            if state == "start":
+                if text[pos] == "[":
+                    state, pos = "first", pos + 1
+                    continue
+                if not final:
+                    break
+                # Not an array so return the complete value.
+                value, end = decoder.raw_decode(text, pos)
+                yield value
+                pos, state = end, "end"
+                break
+
+            if state == "separator" or (state == "first" and text[pos] == "]"):
+                if text[pos] == "]":
+                    pos, state = pos + 1, "end"
+                    break
+                if text[pos] != ",":
+                    raise ValueError("Expected ',' or ']' at position %d" % pos)
+                state, pos = "value", pos + 1
+                continue
+
+            # A number is only complete if it is followed by something which
+            # cannot be part of it, otherwise it might be cut short, e.g. the
+            # content could end with '2.' or '1.5e', which decode as 2 and 1.5.
+            try:
+                value, end = decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break
+            if not final and (end == len(text) or text[end] in _NUMBER_CHARS):
+                break
+            yield value
+            pos, state = end, "separator"
+
+        if final and state != "end":
+            raise ValueError("Incomplete JSON content")
+
+    # Read to the end, so the connection for a response can be reused.
+    for chunk in chunks:
+        text += utf8.decode(chunk)
+
+    if text[pos:].strip():
+        raise ValueError("Extra data after the JSON content")
 
 
 def get_json(content):
     """Decode the JSON records from the response.
 
     :param content: the content returned by the eBird API.
-    :type content: http.client.HTTPResponse:
+    :type content: bytes
 
     :return: the records decoded from the JSON payload.
     :rtype: list
 
     """
-    return json.loads(content.decode("utf-8"))
+    return get_setting("decoder")(content)
 
 
 def save_json(filename, data, indent=None):
@@ -161,4 +559,254 @@ def call(url, params, headers):
     """
     filtered = filter_parameters(params)
     mapped = map_parameters(filtered)
-    return get_json(get_response(url, mapped, headers))
+
+    if _preparing.get():
+        return PreparedCall(url, mapped, headers)
+
+    mapped, locale = localize_parameters(url, mapped)
+    key = get_key(url, mapped)
+    cache = get_setting("cache")
+    content = None if cache is None else cache.get(key)
+
+    if content is None:
+        content = get_stale(cache, key)
+        if content is not None and cache.start_refresh(key):
+            _refresh(cache, key, url, mapped, headers)
+
+    if content is None:
+        coalesce = get_setting("coalesce")
+        if coalesce is None:
+            content = _fetch(key, url, mapped, headers)
+        else:
+            content = coalesce.call(
+                key,
+                lambda: _fetch(key, url, mapped, headers),
+                get_setting("metrics"),
+            )
+
+    records = get_json(content)
+
+    if locale is not None:
+        names = get_setting("names")
+        records = names.translate(
+            records, names.load(headers.get("X-eBirdApiToken"), locale)
+        )
+
+    return records
+
+
+def localize_parameters(url, params):
+    """Set the locale for the common names to the one used by the names
+    setting, so the common names can be translated locally.
+
+    :param url: the URL for the API call.
+
+    :param params: the filtered and mapped query parameters for the call.
+
+    :return: the parameters to send and the locale requested, or None if
+    the common names do not need to be translated.
+    :rtype: tuple
+
+    """
+    names = get_setting("names")
+    if names is None or not get_endpoint(url).startswith(_localized_endpoints):
+        return params, None
+    locale = params.get("sppLocale", constants.DEFAULT_LOCALE)
+    if locale == names.locale:
+        return params, None
+    params = dict(params)
+    if names.locale == constants.DEFAULT_LOCALE:
+        del params["sppLocale"]
+    else:
+        params["sppLocale"] = names.locale
+    return params, locale
+
+
+def _fetch(key, url, params, headers):
+    """Get the content from the eBird API and add it to the cache."""
+    cache = get_setting("cache")
+    entry = get_cached_entry(cache, key)
+    try:
+        content = get_response(url, params, get_conditional_headers(headers, entry))
+    except HTTPError as error:
+        return get_not_modified(cache, key, entry, error)
+    return update_cache(cache, key, entry, content)
+
+
+def _refresh(cache, key, url, params, headers):
+    """Refresh a stale response in a background thread, using the same
+    settings as the call which returned it."""
+
+    def refresh():
+        try:
+            _fetch(key, url, params, headers)
+        except Exception:
+            _increment("refresh_errors")
+        finally:
+            cache.finish_refresh(key)
+
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(refresh,), daemon=True).start()
+
+
+def get_stale(cache, key):
+    """Get an expired response which can be returned while it is refreshed.
+
+    :param cache: the Cache, or None, where responses are kept.
+
+    :param key: the key for the call.
+
+    :return: the content, or None if there is no cache, stale responses
+    are not returned or the response expired more than max_stale ago.
+
+    """
+    if cache is None or not cache.max_stale:
+        return None
+    content = cache.get_stale(key)
+    if content is not None:
+        _increment("stale")
+    return content
+
+
+def get_cached_entry(cache, key):
+    """Get the expired response to revalidate for a call, if any.
+
+    :param cache: the Cache, or None, where responses are kept.
+
+    :param key: the key for the call.
+
+    :return: the response, and its validators, or None if there is no
+    cache, the endpoint is not revalidated or the response is not cached.
+    :rtype: ebird.api.cache.CacheEntry
+
+    """
+    if cache is None or not cache.can_revalidate(key):
+        return None
+    return cache.get_entry(key)
+
+
+def get_conditional_headers(headers, entry):
+    """Add the headers which ask the API to return the response only if it
+    has changed.
+
+    :param headers: the headers for the request.
+
+    :param entry: the cached response, or None.
+    :type entry: ebird.api.cache.CacheEntry
+
+    :return: the headers with If-None-Match and If-Modified-Since added,
+    when the cached response has an ETag or Last-Modified date.
+
+    """
+    if entry is None or not (entry.etag or entry.last_modified):
+        return headers
+    headers = dict(headers or {})
+    if entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    return headers
+
+
+def get_not_modified(cache, key, entry, error):
+    """Get the cached response when the API returns 304 Not Modified.
+
+    :param cache: the Cache where responses are kept.
+
+    :param key: the key for the call.
+
+    :param entry: the cached response, or None.
+    :type entry: ebird.api.cache.CacheEntry
+
+    :param error: the HTTPError raised by the call.
+
+    :return: the cached content.
+
+    :raises HTTPError: if there was no cached response or the error is not
+    304 Not Modified.
+
+    """
+    if entry is None or error.code != 304:
+        raise error
+    cache.refresh(key)
+    cache.record(key, "not_modified")
+    _increment("not_modified")
+    return entry.content
+
+
+def update_cache(cache, key, entry, content):
+    """Add a response to the cache.
+
+    If the response is the same as the cached one, checked using a hash of
+    the content, the time it is cached for is restarted instead. Responses
+    which are revalidated are only added if the cached response has not
+    changed, e.g. by another process, since it was read.
+
+    :param cache: the Cache, or None, where responses are kept.
+
+    :param key: the key for the call.
+
+    :param entry: the cached response, or None.
+    :type entry: ebird.api.cache.CacheEntry
+
+    :param content: the content returned by the API.
+
+    :return: the content.
+
+    """
+    if cache is None:
+        return content
+    if not cache.can_revalidate(key):
+        cache.set(key, content)
+    elif entry is not None and entry.digest == cache.get_entry_for(content).digest:
+        cache.refresh(key)
+        cache.record(key, "unchanged")
+        _increment("unchanged")
+    elif not cache.compare_and_set(key, entry.digest if entry else None, content):
+        cache.record(key, "conflicts")
+    return content
+
+
+def _increment(name):
+    metrics = get_setting("metrics")
+    if metrics is not None:
+        metrics.increment(name)
+
+
+def is_preparing():
+    """Check whether calls are being prepared, with prepare(), rather than
+    sent.
+
+    :return: True if call() returns a PreparedCall.
+
+    """
+    return _preparing.get()
+
+
+def prepare(func, *args, **kwargs):
+    """Get the request an API function would send, without sending it.
+
+    The arguments are validated and the query parameters are filtered and
+    mapped exactly as they would be for a real call. That way the request
+    can be sent some other way, e.g. using asyncio. Only the first request
+    is returned for functions which make more than one call to the API,
+    such as get_location().
+
+    :param func: the API function, e.g. get_observations, or a method
+    of Client.
+
+    :param args: the positional arguments for the function.
+
+    :param kwargs: the keyword arguments for the function.
+
+    :return: the URL, query parameters and headers for the request.
+    :rtype: PreparedCall
+
+    :raises ValueError: if any of the arguments fail the validation checks.
+
+    """
+    token = _preparing.set(True)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _preparing.reset(token)
@@ -309,11 +309,12 @@ def clean_sort(value):
 
 def clean_species_code(value):
     cleaned = clean_code(value, transform=Transform.LOWER)
-    if re.match(r"^\w{6}$", cleaned):
+    if re.match(r"^\w{6}\d*$", cleaned):
         return cleaned
 
     raise ValueError(
-        "Value for 'species code', %s, must be 6 letters, e.g. 'cangoo'" % value
+        "Value for 'species code', %s, must be 6 letters, optionally followed"
+        " by digits, e.g. 'cangoo' or 'mallar3'" % value
     )
 
 
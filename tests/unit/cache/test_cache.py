@@ -0,0 +1,574 @@
+import asyncio
+import hashlib
+import os
+import socket
+import tempfile
+import threading
+import time
+import zlib
+from unittest import TestCase, mock, skip
+from urllib.error import HTTPError
+
+from ebird.api import Client, get_regions, utils
+from ebird.api.cache import (
+    MemoryCache,
+    RedisCache,
+    RedisError,
+    SQLiteCache,
+    get_codes,
+    get_endpoint,
+    get_endpoint_name,
+)
+from ebird.api.client import AsyncClient
+from ebird.api.transport import Response
+from tests.unit.redis_server import LocalRedisServer
+
+
+class GetEndpointTests(TestCase):
+    """Tests for getting the endpoint for a call."""
+
+    def test_version_is_removed(self):
+        key = "https://api.ebird.org/v2/ref/hotspot/US-NY?fmt=json"
+        self.assertEqual("ref/hotspot/US-NY", get_endpoint(key))
+
+    def test_name_replaces_codes(self):
+        key = "https://api.ebird.org/v2/data/obs/US-NY/recent/horlar?back=7"
+        self.assertEqual("data/obs/*/recent/*", get_endpoint_name(key))
+
+    def test_name_combines_codes(self):
+        key = "https://api.ebird.org/v2/data/obs/US-NY/historic/2024/5/1"
+        self.assertEqual("data/obs/*/historic/*", get_endpoint_name(key))
+
+    def test_codes(self):
+        key = "https://api.ebird.org/v2/data/obs/US-ID/recent?r=US-ID%2CUS-NV"
+        self.assertEqual(["US-ID", "US-ID", "US-NV"], get_codes(key))
+
+
+class MemoryCacheTests(TestCase):
+    """Tests for the MemoryCache."""
+
+    def setUp(self):
+        self.now = 1000.0
+        for name in ("time.time", "time.monotonic"):
+            patcher = mock.patch(name, side_effect=lambda: self.now)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.cache = self.get_cache(max_size=10)
+
+    def get_cache(self, **kwargs):
+        return MemoryCache(**kwargs)
+
+    def tick(self, seconds=1):
+        self.now += seconds
+
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get("key"))
+
+    def test_set_and_get(self):
+        self.cache.set("key", b"[]")
+        self.assertEqual(b"[]", self.cache.get("key"))
+        self.assertEqual(1, len(self.cache))
+
+    def test_expired_entry_is_removed(self):
+        self.cache.set("key", b"[]", ttl=10)
+        self.tick(10)
+        self.assertIsNone(self.cache.get("key"))
+        self.assertEqual(0, len(self.cache))
+
+    def test_zero_ttl_is_not_cached(self):
+        self.cache.set("key", b"[]", ttl=0)
+        self.assertIsNone(self.cache.get("key"))
+
+    def test_delete_and_clear(self):
+        self.cache.set("a", b"1")
+        self.cache.set("b", b"2")
+        self.cache.delete("a")
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.clear()
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual(0, self.cache.size)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = self.get_cache(max_size=2 * self.entry_size(b"1234") + 1)
+        cache.set("a", b"1234")
+        self.tick()
+        cache.set("b", b"1234")
+        self.tick()
+        cache.get("a")
+        self.tick()
+        cache.set("c", b"1234")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(b"1234", cache.get("a"))
+        self.assertEqual(b"1234", cache.get("c"))
+
+    def test_large_content_is_not_cached(self):
+        self.cache.set("key", b"12345678901")
+        self.assertEqual(0, len(self.cache))
+
+    def test_ttl_for_endpoint(self):
+        cache = self.get_cache(ttls={"ref/": 100, "ref/hotspot/": 10}, default_ttl=1)
+        base = "https://api.ebird.org/v2/"
+        self.assertEqual(100, cache.get_ttl(base + "ref/region/list/country/world"))
+        self.assertEqual(10, cache.get_ttl(base + "ref/hotspot/US-NY"))
+        self.assertEqual(1, cache.get_ttl(base + "data/obs/US-NY/recent"))
+
+    def test_expired_reference_data_is_kept(self):
+        key = "https://api.ebird.org/v2/ref/region/list/country/world"
+        self.cache.set(key, b"[]", ttl=10)
+        self.tick(10)
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(b"[]", self.cache.get_entry(key).content)
+
+    def test_validators_are_saved(self):
+        content = Response(b"[]")
+        content.headers = {"ETag": '"abc"', "Last-Modified": "yesterday"}
+        self.cache.set("key", content)
+        entry = self.cache.get_entry("key")
+        self.assertEqual('"abc"', entry.etag)
+        self.assertEqual("yesterday", entry.last_modified)
+        self.assertEqual(hashlib.sha256(b"[]").hexdigest(), entry.digest)
+
+    def test_refresh_restarts_ttl(self):
+        self.cache.set("key", b"[]", ttl=10)
+        self.tick(5)
+        self.cache.refresh("key", ttl=10)
+        self.tick(8)
+        self.assertEqual(b"[]", self.cache.get("key"))
+
+    def test_get_stale(self):
+        cache = self.get_cache(max_stale=10)
+        cache.set("key", b"[]", ttl=10)
+        self.tick(15)
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(b"[]", cache.get_stale("key"))
+        self.tick(5)
+        self.assertIsNone(cache.get_stale("key"))
+
+    def test_refreshes_are_limited(self):
+        cache = self.get_cache(max_refreshes=2)
+        self.assertTrue(cache.start_refresh("a"))
+        self.assertFalse(cache.start_refresh("a"))
+        self.assertTrue(cache.start_refresh("b"))
+        self.assertFalse(cache.start_refresh("c"))
+        cache.finish_refresh("a")
+        self.assertTrue(cache.start_refresh("c"))
+
+    def test_stats(self):
+        base = "https://api.ebird.org/v2/data/obs/%s/recent"
+        cache = self.get_cache(max_size=2 * self.entry_size(b"1234"))
+        cache.set(base % "US-NY", b"1234")
+        cache.set(base % "US-NV", b"1234")
+        self.tick(10)
+        cache.get(base % "US-NY")
+        cache.get(base % "US-ID")
+        cache.set(base % "US-ID", b"1234")
+        cache.record(base % "US-ID", "not_modified")
+        stats = cache.get_stats()["data/obs/*/recent"]
+        self.assertEqual(1, stats["hits"])
+        self.assertEqual(1, stats["misses"])
+        self.assertEqual(1, stats["evictions"])
+        self.assertEqual(1, stats["not_modified"])
+        self.assertEqual(2, stats["entries"])
+        self.assertEqual(2 * self.entry_size(b"1234"), stats["bytes"])
+        self.assertEqual(5, stats["average_age"])
+        cache.reset_stats()
+        self.assertEqual(0, cache.get_stats()["data/obs/*/recent"]["hits"])
+
+    def test_find_and_purge(self):
+        base = "https://api.ebird.org/v2/"
+        keys = [
+            base + "data/obs/US-NY/recent",
+            base + "data/obs/US-NY-109/recent/notable",
+            base + "data/obs/US-ID/recent?r=US-ID%2CUS-NY",
+            base + "ref/hotspot/US-NV",
+        ]
+        for key in keys:
+            self.cache.max_size = 1000
+            self.cache.set(key, b"[]")
+        self.assertEqual(sorted(keys[:3]), self.cache.find(region="US-NY*"))
+        self.assertEqual(keys[3:], self.cache.find(endpoint="ref/*"))
+        self.assertEqual(
+            keys[1:2], self.cache.find(endpoint="data/obs/*/recent/notable")
+        )
+        self.assertEqual(3, self.cache.purge(endpoint="data/obs/*"))
+        self.assertEqual(keys[3:], self.cache.keys())
+
+    def test_compare_and_set(self):
+        self.assertTrue(self.cache.compare_and_set("key", None, b"1"))
+        digest = self.cache.get_entry("key").digest
+        self.assertFalse(self.cache.compare_and_set("key", None, b"2"))
+        self.assertTrue(self.cache.compare_and_set("key", digest, b"3"))
+        self.assertEqual(b"3", self.cache.get("key"))
+
+    def test_ttl(self):
+        self.assertIsNone(self.cache.ttl("key"))
+        self.cache.set("key", b"[]", ttl=10)
+        self.tick(4)
+        self.assertEqual(6, self.cache.ttl("key"))
+
+    def entry_size(self, content):
+        return len(content)
+
+
+class SQLiteCacheTests(MemoryCacheTests):
+    """Tests for caching responses in an SQLite database."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.db")
+        self.caches = []
+        super().setUp()
+
+    def tearDown(self):
+        for cache in self.caches:
+            cache.close()
+        self.directory.cleanup()
+
+    def get_cache(self, **kwargs):
+        cache = SQLiteCache(self.path, **kwargs)
+        self.caches.append(cache)
+        return cache
+
+    def entry_size(self, content):
+        return len(zlib.compress(content))
+
+    def test_large_content_is_not_cached(self):
+        self.cache.set("key", os.urandom(100))
+        self.assertEqual(0, len(self.cache))
+
+    def test_cache_is_shared(self):
+        self.cache.set("key", b"[]")
+        self.assertEqual(b"[]", self.get_cache().get("key"))
+
+    def test_content_is_compressed(self):
+        content = b"[" + b'{"code": "US"},' * 100 + b"]"
+        self.cache.max_size = 1000
+        self.cache.set("key", content)
+        self.assertTrue(self.cache.size < len(content))
+        self.assertEqual(content, self.cache.get("key"))
+
+    def test_connection_is_reopened_after_fork(self):
+        self.cache.set("key", b"[]")
+        inherited = self.cache._connection
+        with mock.patch("os.getpid", return_value=-1):
+            self.assertEqual(b"[]", self.cache.get("key"))
+            self.assertIsNot(inherited, self.cache._connection)
+        # The parent's connection is not closed.
+        self.assertEqual((1,), inherited.execute("SELECT 1").fetchone())
+        inherited.close()
+
+
+class RedisCacheTests(MemoryCacheTests):
+    """Tests for caching responses in a Redis server."""
+
+    def setUp(self):
+        self.server = LocalRedisServer().start()
+        self.caches = []
+        super().setUp()
+
+    def tearDown(self):
+        for cache in self.caches:
+            cache.close()
+        self.server.stop()
+
+    def get_cache(self, max_size=None, **kwargs):
+        cache = RedisCache(port=self.server.port, **kwargs)
+        self.caches.append(cache)
+        return cache
+
+    @skip("the size is limited by the maxmemory setting of the server")
+    def test_least_recently_used_is_evicted(self):
+        pass
+
+    @skip("the size is limited by the maxmemory setting of the server")
+    def test_large_content_is_not_cached(self):
+        pass
+
+    def test_stats(self):
+        base = "https://api.ebird.org/v2/data/obs/%s/recent"
+        self.cache.set(base % "US-NY", b"1234")
+        self.tick(10)
+        self.cache.get(base % "US-NY")
+        self.cache.get(base % "US-ID")
+        self.cache.set(base % "US-ID", b"1234")
+        stats = self.cache.get_stats()["data/obs/*/recent"]
+        self.assertEqual((1, 1, 2), (stats["hits"], stats["misses"], stats["entries"]))
+        self.assertEqual(5, stats["average_age"])
+
+    def test_cache_is_shared(self):
+        self.cache.set("key", b"[]")
+        self.assertEqual(b"[]", self.get_cache().get("key"))
+
+    def test_responses_expire_on_server(self):
+        self.cache.max_stale = 5
+        self.cache.set("key", b"[]", ttl=10)
+        self.tick(14)
+        self.assertEqual(b"[]", self.cache.get_stale("key"))
+        self.tick(1)
+        self.assertEqual([], self.cache.keys())
+
+    def test_prefix(self):
+        cache = self.get_cache(prefix="other:")
+        cache.set("key", b"[]")
+        self.cache.clear()
+        self.assertEqual([b"other:key"], list(self.server.values))
+        self.assertEqual(["key"], cache.keys())
+
+    def test_transaction_conflict(self):
+        self.cache.set("key", b"1")
+        digest = self.cache.get_entry("key").digest
+        run = self.server.run
+
+        def concurrent_set(name, args):
+            if name == "GET":
+                # Write the same response, as another client could.
+                self.server.run = run
+                run("SET", [b"ebird:key", run("GET", [b"ebird:key"])])
+            return run(name, args)
+
+        self.server.run = concurrent_set
+        self.assertFalse(self.cache.compare_and_set("key", digest, b"2"))
+        self.assertIn("EXEC", self.server.commands)
+
+    def test_password(self):
+        self.server.password = "secret"
+        self.assertRaises(RedisError, self.get_cache(password="wrong").get, "key")
+        self.assertIsNone(self.get_cache(password="secret").get("key"))
+
+    def test_reconnects(self):
+        self.cache.set("key", b"[]")
+        self.cache._socket.shutdown(socket.SHUT_RDWR)
+        self.assertRaises(OSError, self.cache.get, "key")
+        self.assertEqual(b"[]", self.cache.get("key"))
+
+
+class CallCacheTests(TestCase):
+    """Tests for caching the responses from calls to the API."""
+
+    def setUp(self):
+        self.cache = MemoryCache()
+
+    @mock.patch("ebird.api.utils.get_response", return_value=b'[{"code": "US"}]')
+    def test_response_is_cached(self, get_response):
+        with utils.settings(cache=self.cache):
+            get_regions("12345", "country", "world")
+            get_regions("12345", "country", "world")
+        self.assertEqual(1, get_response.call_count)
+
+    @mock.patch("ebird.api.utils.get_response", return_value=b'[{"code": "US"}]')
+    def test_records_are_copies(self, get_response):
+        with utils.settings(cache=self.cache):
+            get_regions("12345", "country", "world")[0]["code"] = "CA"
+            self.assertEqual("US", get_regions("12345", "country", "world")[0]["code"])
+
+    @mock.patch("ebird.api.utils.get_response", return_value=b"[]")
+    def test_client_cache(self, get_response):
+        client = Client("12345", "en")
+        client.cache = self.cache
+        client.get_regions("country", "world")
+        client.get_regions("country", "world")
+        self.assertEqual(1, get_response.call_count)
+
+    def test_async_client_cache(self):
+        client = AsyncClient("12345", "en")
+        client.cache = self.cache
+        client.pool = mock.Mock()
+        client.pool.request = mock.AsyncMock(return_value=Response(b"[]"))
+
+        async def main():
+            await client.get_regions("country", "world")
+            await client.get_regions("country", "world")
+
+        asyncio.run(main())
+        self.assertEqual(1, client.pool.request.call_count)
+
+
+class RevalidationTests(TestCase):
+    """Tests for checking whether expired, cached responses have changed."""
+
+    url = "https://api.ebird.org/v2/ref/region/list/country/world"
+
+    def setUp(self):
+        self.cache = MemoryCache()
+        self.metrics = mock.Mock()
+        self.content = Response(b'[{"code": "US"}]')
+        self.content.headers = {"ETag": '"v1"'}
+
+    def call(self):
+        with utils.settings(cache=self.cache, metrics=self.metrics):
+            return utils.call(self.url, {}, {"X-eBirdApiToken": "12345"})
+
+    def expire(self):
+        self.cache.refresh(utils.get_key(self.url, {}), ttl=0)
+
+    @mock.patch("ebird.api.utils.get_response")
+    def test_validators_are_sent(self, get_response):
+        get_response.return_value = self.content
+        self.call()
+        self.expire()
+        self.call()
+        headers = get_response.call_args[0][2]
+        self.assertEqual('"v1"', headers["If-None-Match"])
+        self.assertEqual("12345", headers["X-eBirdApiToken"])
+
+    @mock.patch("ebird.api.utils.get_response")
+    def test_not_modified_returns_cached_response(self, get_response):
+        get_response.return_value = self.content
+        self.call()
+        self.expire()
+        get_response.side_effect = HTTPError(self.url, 304, "Not Modified", {}, None)
+        self.assertEqual([{"code": "US"}], self.call())
+        self.metrics.increment.assert_called_with("not_modified")
+        self.call()
+        self.assertEqual(2, get_response.call_count)
+
+    @mock.patch("ebird.api.utils.get_response")
+    def test_not_modified_without_cached_response(self, get_response):
+        get_response.side_effect = HTTPError(self.url, 304, "Not Modified", {}, None)
+        self.assertRaises(HTTPError, self.call)
+
+    @mock.patch("ebird.api.utils.get_response")
+    def test_unchanged_content_is_detected(self, get_response):
+        get_response.return_value = b"[]"
+        self.call()
+        self.expire()
+        self.call()
+        self.assertNotIn("If-None-Match", get_response.call_args[0][2])
+        self.metrics.increment.assert_called_with("unchanged")
+
+    @mock.patch("ebird.api.utils.get_response")
+    def test_concurrent_update_is_kept(self, get_response):
+        get_response.return_value = self.content
+        self.call()
+        self.expire()
+        key = utils.get_key(self.url, {})
+
+        def response(*args):
+            self.cache.set(key, b'[{"code": "CA"}]')
+            return b'[{"code": "MX"}]'
+
+        get_response.side_effect = response
+        self.assertEqual([{"code": "MX"}], self.call())
+        self.assertEqual(b'[{"code": "CA"}]', self.cache.get(key))
+        self.assertEqual(1, self.cache.get_stats()["ref/region/list/*"]["conflicts"])
+
+    def test_async_client_revalidates(self):
+        client = AsyncClient("12345", "en")
+        client.cache = self.cache
+        client.pool = mock.Mock()
+        client.pool.request = mock.AsyncMock(return_value=self.content)
+
+        prepared = utils.prepare(Client.get_regions, client, "country", "world")
+        key = utils.get_key(prepared.url, prepared.params)
+
+        async def main():
+            await client.get_regions("country", "world")
+            self.cache.refresh(key, ttl=0)
+            client.pool.request.side_effect = HTTPError(
+                self.url, 304, "Not Modified", {}, None
+            )
+            return await client.get_regions("country", "world")
+
+        self.assertEqual([{"code": "US"}], asyncio.run(main()))
+        headers = client.pool.request.call_args[0][1]
+        self.assertEqual('"v1"', headers["If-None-Match"])
+
+
+class StaleWhileRevalidateTests(TestCase):
+    """Tests for returning stale responses while they are refreshed."""
+
+    url = "https://api.ebird.org/v2/data/obs/US-NY/recent/notable"
+
+    def setUp(self):
+        self.cache = MemoryCache(max_stale=60)
+        self.metrics = mock.Mock()
+        self.key = utils.get_key(self.url, {})
+        self.cache.set(self.key, b'["old"]', ttl=0.01)
+        time.sleep(0.02)
+
+    def call(self):
+        with utils.settings(cache=self.cache, metrics=self.metrics):
+            return utils.call(self.url, {}, {})
+
+    @mock.patch("ebird.api.utils.get_response")
+    def test_stale_response_is_refreshed(self, get_response):
+        refreshed = threading.Event()
+
+        def response(*args):
+            refreshed.wait(5)
+            return b'["new"]'
+
+        get_response.side_effect = response
+        self.assertEqual(["old"], self.call())
+        self.metrics.increment.assert_called_with("stale")
+        refreshed.set()
+        for _ in range(100):
+            if self.cache.get(self.key):
+                break
+            time.sleep(0.01)
+        self.assertEqual(["new"], self.call())
+        self.assertEqual(1, get_response.call_count)
+
+    @mock.patch("ebird.api.utils.get_response")
+    def test_refresh_errors_are_counted(self, get_response):
+        get_response.side_effect = HTTPError(self.url, 500, "Error", {}, None)
+        self.assertEqual(["old"], self.call())
+        for _ in range(100):
+            if self.cache.start_refresh(self.key):
+                break
+            time.sleep(0.01)
+        self.metrics.increment.assert_called_with("refresh_errors")
+
+    @mock.patch("ebird.api.utils.get_response", return_value=b'["new"]')
+    def test_too_stale_response_is_not_returned(self, get_response):
+        self.cache.max_stale = 0.01
+        self.assertEqual(["new"], self.call())
+
+    def test_async_client_refreshes_in_background(self):
+        client = AsyncClient("12345", "en")
+        client.cache = MemoryCache(max_stale=60)
+        client.pool = mock.Mock()
+        client.pool.request = mock.AsyncMock(return_value=Response(b'["new"]'))
+        prepared = utils.prepare(Client.get_regions, client, "country", "world")
+        key = utils.get_key(prepared.url, prepared.params)
+        client.cache.set(key, b'["old"]', ttl=0.01)
+        time.sleep(0.02)
+
+        async def main():
+            stale = await client.get_regions("country", "world")
+            await asyncio.sleep(0.01)
+            return stale, await client.get_regions("country", "world")
+
+        self.assertEqual((["old"], ["new"]), asyncio.run(main()))
+        self.assertEqual(1, client.pool.request.call_count)
+
+
+class ClientCacheTests(TestCase):
+    """Tests for inspecting the cache used by a Client."""
+
+    def setUp(self):
+        self.client = Client("12345", "en")
+        self.client.cache = MemoryCache()
+
+    @mock.patch("ebird.api.utils.get_response", return_value=b"[]")
+    def test_stats(self, get_response):
+        self.client.get_observations("US-NY")
+        self.client.get_observations("US-NY")
+        stats = self.client.cache_stats()["data/obs/*/recent"]
+        self.assertEqual((1, 1), (stats["hits"], stats["misses"]))
+        self.client.reset_cache_stats()
+        self.assertEqual(0, self.client.cache_stats()["data/obs/*/recent"]["hits"])
+
+    @mock.patch("ebird.api.utils.get_response", return_value=b"[]")
+    def test_purge(self, get_response):
+        self.client.get_observations("US-NY")
+        self.client.get_observations("US-NV")
+        self.assertEqual(1, len(self.client.cached_keys(region="US-NY*")))
+        self.assertEqual(1, self.client.purge_cache(region="US-NY*"))
+        self.assertEqual(1, len(self.client.cached_keys()))
+
+    def test_no_cache(self):
+        self.client.cache = None
+        self.assertEqual({}, self.client.cache_stats())
+        self.assertEqual([], self.client.cached_keys())
+        self.assertEqual(0, self.client.purge_cache())
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+from unittest import TestCase, mock
+
+from ebird.api.cache import MemoryCache
+from ebird.api.checklists import CHECKLIST_URL
+from ebird.api.client import AsyncClient
+from ebird.api.transport import Response
+
+
+class AsyncClientTests(TestCase):
+    """Tests for the AsyncClient."""
+
+    def setUp(self):
+        self.client = AsyncClient("12345", "en", max_concurrency=2)
+        self.client.metrics = mock.Mock()
+        self.client.pool = mock.Mock()
+        self.client.pool.request = mock.AsyncMock(return_value=Response(b"{}"))
+
+    def test_request_is_sent(self):
+        result = asyncio.run(self.client.get_checklist("S12345678"))
+        self.assertEqual({}, result)
+        url, headers = self.client.pool.request.call_args[0]
+        self.assertEqual(CHECKLIST_URL % "S12345678", url)
+        self.assertEqual("12345", headers["X-eBirdApiToken"])
+
+    def test_client_attributes_are_used(self):
+        self.client.back = 7
+        asyncio.run(self.client.get_observations("US-NV"))
+        url = self.client.pool.request.call_args[0][0]
+        self.assertTrue("back=7" in url)
+
+    def test_invalid_argument_raises_error(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(self.client.get_checklist(""))
+        self.assertFalse(self.client.pool.request.called)
+
+    def test_response_is_recorded(self):
+        asyncio.run(self.client.get_checklist("S12345678"))
+        self.assertTrue(self.client.metrics.record_response.called)
+
+    def test_concurrency_is_limited(self):
+        active, peak = 0, 0
+
+        async def request(url, headers):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return Response(b"{}")
+
+        self.client.pool.request = request
+
+        async def run():
+            calls = [self.client.get_checklist("S%d" % n) for n in range(10)]
+            return await asyncio.gather(*calls)
+
+        self.assertEqual([{}] * 10, asyncio.run(run()))
+        self.assertEqual(2, peak)
+
+    def test_client_is_used_in_new_event_loop(self):
+        async def request(url, headers):
+            await asyncio.sleep(0.01)
+            return Response(b"{}")
+
+        self.client.pool.request = request
+
+        async def run():
+            calls = [self.client.get_checklist("S%d" % n) for n in range(5)]
+            return await asyncio.gather(*calls)
+
+        self.assertEqual([{}] * 5, asyncio.run(run()))
+        self.assertEqual([{}] * 5, asyncio.run(run()))
+
+    def test_cache_is_used_in_thread(self):
+        threads = []
+
+        class Cache(MemoryCache):
+            def get(self, key):
+                threads.append(threading.get_ident())
+                return super().get(key)
+
+            def set(self, key, content, ttl=None):
+                threads.append(threading.get_ident())
+                super().set(key, content, ttl)
+
+        self.client.cache = Cache()
+
+        async def run():
+            await self.client.get_checklist("S12345678")
+            return await self.client.get_checklist("S12345678")
+
+        self.assertEqual({}, asyncio.run(run()))
+        self.assertEqual(1, self.client.pool.request.call_count)
+        self.assertEqual(3, len(threads))
+        self.assertNotIn(threading.get_ident(), threads)
@@ -0,0 +1,56 @@
+import threading
+from unittest import TestCase, mock
+
+from ebird.api import Client, utils
+from ebird.api.client import Batch
+
+
+class BatchTests(TestCase):
+    """Tests for making calls concurrently with a Batch."""
+
+    def test_results_are_in_order(self):
+        with Batch(max_workers=4) as batch:
+            self.assertEqual([1, 4, 9, 16], batch.map(lambda n: n * n, [1, 2, 3, 4]))
+
+    def test_tuples_are_positional_arguments(self):
+        with Batch() as batch:
+            self.assertEqual([3, 7], batch.map(lambda a, b: a + b, [(1, 2), (3, 4)]))
+
+    def test_errors_are_returned(self):
+        with Batch() as batch:
+            results = batch.map(lambda n: 1 / n, [1, 0, 2])
+        self.assertEqual(1, results[0])
+        self.assertIsInstance(results[1], ZeroDivisionError)
+        self.assertEqual(0.5, results[2])
+
+    def test_errors_are_raised(self):
+        with Batch() as batch:
+            with self.assertRaises(ZeroDivisionError):
+                batch.map(lambda n: 1 / n, [1, 0, 2], return_exceptions=False)
+
+    def test_calls_run_concurrently(self):
+        barrier = threading.Barrier(4, timeout=1)
+        with Batch(max_workers=4) as batch:
+            results = batch.map(lambda n: barrier.wait() is not None, range(4))
+        self.assertEqual([True] * 4, results)
+
+    def test_submit_returns_future(self):
+        with Batch() as batch:
+            future = batch.submit(pow, 2, 3)
+        self.assertEqual(8, future.result())
+
+    def test_settings_are_passed_to_threads(self):
+        pool = mock.Mock()
+        with utils.settings(pool=pool):
+            with Batch() as batch:
+                result = batch.submit(utils.get_setting, "pool").result()
+        self.assertIs(pool, result)
+
+    def test_client_methods(self):
+        client = Client("12345", "en")
+        client.pool = mock.Mock()
+        client.pool.request.return_value = b"{}"
+        with client.batch() as batch:
+            results = batch.map(client.get_checklist, ["S1", "S2", "S3"])
+        self.assertEqual([{}, {}, {}], results)
+        self.assertEqual(3, client.pool.request.call_count)
@@ -1,6 +1,16 @@
-from unittest import TestCase
+import json
+import time
+from unittest import TestCase, mock
+from urllib.error import HTTPError
 
-from ebird.api.hotspots import HOTSPOT_INFO_URL, get_location
+from ebird.api import hotspots
+from ebird.api.hotspots import (
+    HOTSPOT_INFO_URL,
+    LOCATION_INFO_URL,
+    PRIVATE_LOCATION_TTL,
+    clear_locations,
+    get_location,
+)
 from tests.unit.mixins import HeaderTestsMixin
 
 
@@ -24,3 +34,75 @@ class GetLocationTests(TestCase, HeaderTestsMixin):
 
     def test_invalid_location_code_raises_error(self):
         self.api_raises(ValueError, loc_id="123456")
+
+
+REGION_INFO = {
+    "code": "L123456",
+    "result": "My garden",
+    "latitude": 42.1,
+    "longitude": -76.2,
+    "parent": {
+        "code": "US-NY-109",
+        "type": "subnational2",
+        "result": "Tompkins, New York, United States",
+        "parent": {
+            "code": "US-NY",
+            "type": "subnational1",
+            "result": "New York, United States",
+            "parent": {"code": "US", "type": "country", "result": "United States"},
+        },
+    },
+}
+
+
+class PrivateLocationTests(TestCase):
+    """Tests for getting the details of private locations."""
+
+    def setUp(self):
+        clear_locations()
+        self.addCleanup(clear_locations)
+
+    def get_response(self, url, params, headers):
+        if url == HOTSPOT_INFO_URL % "L123456":
+            raise HTTPError(url, 410, "Gone", {}, None)
+        return json.dumps(REGION_INFO).encode("utf-8")
+
+    def get_location(self):
+        with mock.patch(
+            "ebird.api.utils.get_response", side_effect=self.get_response
+        ) as fn:
+            return get_location("12345", "L123456"), [
+                args[0][0] for args in fn.call_args_list
+            ]
+
+    def test_region_is_flattened(self):
+        location, urls = self.get_location()
+        self.assertEqual(
+            [HOTSPOT_INFO_URL % "L123456", LOCATION_INFO_URL % "L123456"], urls
+        )
+        self.assertFalse(location["isHotspot"])
+        self.assertEqual("Tompkins", location["subnational2Name"])
+        self.assertEqual(
+            "My garden, Tompkins, New York, United States",
+            location["hierarchicalName"],
+        )
+
+    def test_result_is_memoized(self):
+        location = self.get_location()[0]
+        location["name"] = "Changed"
+        memoized, urls = self.get_location()
+        self.assertEqual([], urls)
+        self.assertEqual("My garden", memoized["name"])
+
+    def test_private_location_is_remembered(self):
+        self.get_location()
+        hotspots._locations.clear()
+        self.assertEqual([LOCATION_INFO_URL % "L123456"], self.get_location()[1])
+
+    def test_private_location_expires(self):
+        self.get_location()
+        hotspots._locations.clear()
+        with mock.patch(
+            "time.monotonic", return_value=time.monotonic() + PRIVATE_LOCATION_TTL
+        ):
+            self.assertEqual(2, len(self.get_location()[1]))
@@ -0,0 +1,17 @@
+from unittest import TestCase, mock
+
+from ebird.api.hotspots import REGION_HOTSPOTS_URL, iter_hotspots
+
+
+class IterHotspotsTests(TestCase):
+    """Tests for the iter_hotspots() API call."""
+
+    def test_request_is_streamed(self):
+        with mock.patch("ebird.api.hotspots.get_stream") as get_stream:
+            iter_hotspots("12345", "US-NV")
+        url, params, headers = get_stream.call_args[0]
+        self.assertEqual(REGION_HOTSPOTS_URL % "US-NV", url)
+        self.assertEqual("12345", headers["X-eBirdApiToken"])
+
+    def test_arguments_are_validated_when_called(self):
+        self.assertRaises(ValueError, iter_hotspots, "12345", "US-")
@@ -0,0 +1,66 @@
+from unittest import TestCase, mock
+
+from ebird.api.index import NameSearch, get_word_starts
+from tests.unit.index.test_taxonomy_index import RECORDS, SPANISH
+
+
+class NameSearchTests(TestCase):
+    """Tests for searching the names in the taxonomy."""
+
+    def setUp(self):
+        self.search = NameSearch(RECORDS)
+        self.search.add_locale("es", SPANISH)
+
+    def codes(self, matches):
+        return [match["speciesCode"] for match in matches]
+
+    def test_get_word_starts(self):
+        self.assertEqual([0, 6, 13], get_word_starts("black-capped chickadee"))
+
+    def test_prefix(self):
+        matches = self.search.prefix("Horned")
+        self.assertEqual(["horlar", "horlar1"], self.codes(matches))
+        self.assertEqual("Horned Lark", matches[0]["name"])
+        self.assertEqual("en", matches[0]["locale"])
+
+    def test_exact_match_is_first(self):
+        matches = self.search.prefix("horned lark")
+        self.assertEqual(1.0, matches[0]["score"])
+        self.assertEqual(0.9, matches[1]["score"])
+
+    def test_prefix_of_later_word(self):
+        matches = self.search.prefix("lark")
+        self.assertEqual(["lark1", "horlar", "horlar1"], self.codes(matches))
+        self.assertEqual(0.8, matches[1]["score"])
+
+    def test_prefix_of_scientific_name(self):
+        matches = self.search.prefix("corvus")
+        self.assertEqual(["amecro"], self.codes(matches))
+        self.assertIsNone(matches[0]["locale"])
+
+    def test_other_locale(self):
+        self.assertEqual(["horlar"], self.codes(self.search.prefix("alondra")))
+        self.assertEqual([], self.search.prefix("alondra", locales=["en"]))
+
+    def test_limit(self):
+        self.assertEqual(1, len(self.search.prefix("h", limit=1)))
+
+    def test_fuzzy(self):
+        matches = self.search.fuzzy("hornd lakr")
+        self.assertEqual("horlar", matches[0]["speciesCode"])
+        self.assertTrue(0 < matches[0]["score"] < 1)
+
+    def test_fuzzy_scores_only_rarest_matches(self):
+        expected = self.search.fuzzy("horned lark", min_score=0)
+        with mock.patch("ebird.api.index.MAX_POSTINGS", 1):
+            matches = self.search.fuzzy("horned lark", min_score=0)
+        self.assertEqual(expected[0], matches[0])
+        self.assertLess(len(matches), len(expected))
+
+    def test_search_adds_fuzzy_matches(self):
+        self.assertEqual("amecro", self.search.search("americn crow")[0]["speciesCode"])
+        self.assertEqual(["lark1"], self.codes(self.search.search("lark", limit=1)))
+
+    def test_no_match(self):
+        self.assertEqual([], self.search.search("qqqq"))
+        self.assertEqual([], self.search.search(" "))
@@ -0,0 +1,100 @@
+from unittest import TestCase
+
+from ebird.api.index import TaxonomyIndex, normalize_name
+
+RECORDS = [
+    {
+        "speciesCode": "amecro",
+        "sciName": "Corvus brachyrhynchos",
+        "comName": "American Crow",
+        "category": "species",
+        "taxonOrder": 20000.0,
+        "bandingCodes": ["AMCR"],
+    },
+    {
+        "speciesCode": "horlar",
+        "sciName": "Eremophila alpestris",
+        "comName": "Horned Lark",
+        "category": "species",
+        "taxonOrder": 21000.0,
+        "bandingCodes": ["HOLA"],
+    },
+    {
+        "speciesCode": "horlar1",
+        "sciName": "Eremophila alpestris [alpestris Group]",
+        "comName": "Horned Lark (Eurasian)",
+        "category": "issf",
+        "taxonOrder": 21001.0,
+        "bandingCodes": [],
+    },
+    {
+        "speciesCode": "lark1",
+        "sciName": "Alaudidae sp.",
+        "comName": "lark sp.",
+        "category": "spuh",
+        "taxonOrder": 21500.0,
+    },
+]
+
+SPANISH = [
+    {"speciesCode": "horlar", "comName": "Alondra Cornuda"},
+    {"speciesCode": "unknown", "comName": "Desconocido"},
+]
+
+
+class TaxonomyIndexTests(TestCase):
+    """Tests for looking up species in the TaxonomyIndex."""
+
+    def setUp(self):
+        self.index = TaxonomyIndex(RECORDS)
+
+    def test_normalize_name(self):
+        self.assertEqual("horned lark", normalize_name("  Horned   LARK "))
+
+    def test_get_by_code(self):
+        self.assertIs(RECORDS[1], self.index["horlar"])
+        self.assertIn("horlar", self.index)
+        self.assertIsNone(self.index.get("xxx"))
+        self.assertEqual(4, len(self.index))
+
+    def test_get_by_scientific_name(self):
+        record = self.index.get_by_scientific_name("eremophila  alpestris")
+        self.assertEqual("horlar", record["speciesCode"])
+
+    def test_get_by_common_name(self):
+        record = self.index.get_by_common_name("horned lark (eurasian)")
+        self.assertEqual("horlar1", record["speciesCode"])
+        self.assertIsNone(self.index.get_by_common_name("Alondra Cornuda"))
+
+    def test_get_by_banding_code(self):
+        self.assertEqual(
+            "amecro", self.index.get_by_banding_code("amcr")["speciesCode"]
+        )
+        self.assertIsNone(self.index.get_by_banding_code("XXXX"))
+
+    def test_add_locale(self):
+        self.index.add_locale("es", SPANISH)
+        record = self.index.get_by_common_name("alondra cornuda", locale="es")
+        self.assertEqual("horlar", record["speciesCode"])
+        self.assertEqual(["en", "es"], self.index.get_locales())
+
+    def test_unknown_locale(self):
+        self.assertRaises(KeyError, self.index.get_by_common_name, "x", locale="fr")
+
+    def test_lookup(self):
+        self.index.add_locale("es", SPANISH)
+        for value in ("horlar", "Eremophila alpestris", "HOLA", "Alondra Cornuda"):
+            self.assertEqual("horlar", self.index.lookup(value)["speciesCode"])
+        self.assertIsNone(self.index.lookup("Dodo"))
+
+    def test_get_codes(self):
+        self.assertEqual({"amecro", "horlar"}, self.index.get_codes("species"))
+        self.assertEqual({"horlar1", "lark1"}, self.index.get_codes(["issf", "spuh"]))
+        self.assertEqual(frozenset(), self.index.get_codes("hybrid"))
+
+    def test_get_records(self):
+        records = self.index.get_records("spuh,species,issf")
+        self.assertEqual(RECORDS, records)
+
+    def test_invalid_category(self):
+        self.assertRaises(ValueError, self.index.get_codes, "bird")
@@ -0,0 +1,123 @@
+import json
+from unittest import TestCase, mock
+from urllib.error import HTTPError
+
+from ebird.api.index import TaxonomyTree
+
+
+def get_record(code, order, category="species", family="anatid1", report_as=None):
+    record = {
+        "speciesCode": code,
+        "category": category,
+        "taxonOrder": order,
+        "order": "Anseriformes" if family == "anatid1" else "Passeriformes",
+        "familyCode": family,
+        "familySciName": "Anatidae" if family == "anatid1" else "Alaudidae",
+        "familyComName": "Ducks, Geese, and Waterfowl",
+    }
+    if report_as:
+        record["reportAs"] = report_as
+    return record
+
+
+RECORDS = [
+    get_record("horlar", 30),
+    get_record("mallar3", 10),
+    get_record("mallar1", 11, "issf", report_as="mallar3"),
+    get_record("mallar2", 12, "issf", report_as="mallar3"),
+    get_record("mexduc1", 13, "form", report_as="mallar2"),
+    get_record("ambduc", 14),
+    get_record("x00001", 15, "hybrid"),
+    get_record("duck1", 16, "spuh"),
+]
+RECORDS[0].update(familyCode="alaudi1", familySciName="Alaudidae", order="Passer")
+
+
+class TaxonomyTreeTests(TestCase):
+    """Tests for arranging the taxonomy as a tree."""
+
+    def setUp(self):
+        self.tree = TaxonomyTree(RECORDS)
+
+    def test_orders_and_families(self):
+        self.assertEqual(["Anseriformes", "Passer"], self.tree.get_orders())
+        self.assertEqual(["anatid1", "alaudi1"], self.tree.get_families())
+        self.assertEqual(["alaudi1"], self.tree.get_families("Passer"))
+
+    def test_get_family(self):
+        self.assertEqual("anatid1", self.tree.get_family("anatidae"))
+        self.assertEqual("anatid1", self.tree.get_family("anatid1"))
+        self.assertIsNone(self.tree.get_family("Corvidae"))
+
+    def test_get_children(self):
+        self.assertEqual(
+            ["mallar3", "ambduc", "x00001", "duck1"], self.tree.get_children("Anatidae")
+        )
+        self.assertEqual(["mallar1", "mallar2"], self.tree.get_children("mallar3"))
+        self.assertEqual(["anatid1"], self.tree.get_children("Anseriformes"))
+        self.assertRaises(KeyError, self.tree.get_children, "xxx")
+
+    def test_get_subtree_of_family(self):
+        self.assertEqual(
+            ["mallar3", "mallar1", "mallar2", "mexduc1", "ambduc", "x00001", "duck1"],
+            self.tree.get_subtree("Anatidae"),
+        )
+
+    def test_get_subtree_of_order(self):
+        self.assertEqual(["horlar"], self.tree.get_subtree("Passer"))
+
+    def test_get_subtree_of_species(self):
+        self.assertEqual(["mallar2", "mexduc1"], self.tree.get_subtree("mallar2"))
+
+    def test_get_forms(self):
+        self.assertEqual(
+            ["mallar1", "mallar2", "mexduc1"], self.tree.get_forms("mallar3")
+        )
+        self.assertEqual([], self.tree.get_forms("ambduc"))
+
+    def test_get_species(self):
+        self.assertEqual("mallar3", self.tree.get_species("mexduc1"))
+        self.assertEqual("ambduc", self.tree.get_species("ambduc"))
+        self.assertRaises(KeyError, self.tree.get_species, "xxx")
+
+    def test_get_parent(self):
+        self.assertEqual("mallar2", self.tree.get_parent("mexduc1"))
+        self.assertEqual("anatid1", self.tree.get_parent("mallar3"))
+
+
+@mock.patch("ebird.api.utils.get_response")
+class LoadFormsTests(TestCase):
+    """Tests for downloading the forms for the species in the tree."""
+
+    def setUp(self):
+        self.tree = TaxonomyTree(
+            [record for record in RECORDS if record["category"] == "species"]
+        )
+
+    def test_forms_are_added(self, get_response):
+        def response(url, params, headers):
+            if url.endswith("/ambduc"):
+                return json.dumps(["ambduc", "ambduc1", "ambduc2"]).encode()
+            return b"[]"
+
+        get_response.side_effect = response
+        codes = ["horlar", "mallar3", "ambduc"]
+        self.assertEqual(2, self.tree.load_forms("12345", codes, max_workers=2))
+        self.assertEqual(["ambduc1", "ambduc2"], self.tree.get_forms("ambduc"))
+        self.assertEqual("ambduc", self.tree.get_species("ambduc2"))
+        self.assertIsNone(self.tree.get("ambduc2"))
+        self.assertEqual(3, get_response.call_count)
+
+    def test_invalid_code_raises_error(self, get_response):
+        codes = ["horlar", "mall", "ambduc"]
+        self.assertRaises(ValueError, self.tree.load_forms, "12345", codes)
+        self.assertFalse(get_response.called)
+
+    def test_species_with_forms_are_skipped(self, get_response):
+        get_response.return_value = b"[]"
+        TaxonomyTree(RECORDS).load_forms("12345", ["horlar", "mallar2", "ambduc"])
+        self.assertEqual(2, get_response.call_count)
+
+    def test_errors_are_raised(self, get_response):
+        get_response.side_effect = HTTPError("url", 500, "Error", {}, None)
+        self.assertRaises(HTTPError, self.tree.load_forms, "12345", ["horlar"])
@@ -0,0 +1,54 @@
+from unittest import TestCase, mock
+
+from ebird.api import utils
+from ebird.api.metrics import Metrics
+from ebird.api.transport import Response
+
+
+class MetricsTests(TestCase):
+    """Tests for recording the details of calls to the API."""
+
+    def setUp(self):
+        self.metrics = Metrics()
+
+    def get_response(self, wire_bytes, content):
+        response = Response(content)
+        response.wire_bytes = wire_bytes
+        return response
+
+    def test_response_is_counted(self):
+        self.metrics.record_response("url", self.get_response(10, b"[]" * 20))
+        self.metrics.record_response("url", self.get_response(5, b"[]" * 10))
+        expected = {"calls": 2, "wire_bytes": 15, "decoded_bytes": 60}
+        self.assertEqual(expected, self.metrics.snapshot())
+
+    def test_bytes_content_is_counted(self):
+        self.metrics.record_response("url", b"[]")
+        self.assertEqual(2, self.metrics.snapshot()["wire_bytes"])
+
+    def test_listener_is_called(self):
+        listener = mock.Mock()
+        self.metrics.add_listener(listener)
+        self.metrics.record_response("url", self.get_response(10, b"[]" * 20))
+        listener.assert_called_with(
+            {"url": "url", "status": 200, "wire_bytes": 10, "decoded_bytes": 40}
+        )
+
+    def test_removed_listener_is_not_called(self):
+        listener = mock.Mock()
+        self.metrics.add_listener(listener)
+        self.metrics.remove_listener(listener)
+        self.metrics.record_response("url", b"[]")
+        self.assertFalse(listener.called)
+
+    def test_reset(self):
+        self.metrics.increment("calls")
+        self.metrics.reset()
+        self.assertEqual({}, self.metrics.snapshot())
+
+    def test_get_response_records_call(self):
+        pool = mock.Mock()
+        pool.request.return_value = self.get_response(1, b"[]")
+        with utils.settings(pool=pool, metrics=self.metrics):
+            utils.get_response("https://api.ebird.org/v2/ref/hotspot/US")
+        self.assertEqual(1, self.metrics.snapshot()["calls"])
@@ -0,0 +1,158 @@
+import asyncio
+import json
+from unittest import TestCase, mock
+
+from ebird.api import get_observations, utils
+from ebird.api.cache import MemoryCache
+from ebird.api.client import AsyncClient
+from ebird.api.names import CommonNames
+from ebird.api.stores import TaxonomyStore
+from ebird.api.taxonomy import TAXONOMY_URL, TAXONOMY_VERSIONS_URL
+from ebird.api.transport import Response
+
+NAMES = {
+    "en": {"horlar": "Horned Lark", "amecro": "American Crow"},
+    "es": {"horlar": "Alondra Cornuda", "amecro": "Cuervo Norteamericano"},
+}
+
+
+def get_response(url, params, headers):
+    if url == TAXONOMY_URL:
+        names = NAMES[params.get("locale", "en")]
+        records = [{"speciesCode": code, "comName": names[code]} for code in names]
+    else:
+        names = NAMES[params.get("sppLocale", "en")]
+        records = [
+            {"speciesCode": "horlar", "comName": names["horlar"], "howMany": 2},
+            {"speciesCode": "x00001", "comName": "hybrid"},
+        ]
+    return json.dumps(records).encode("utf-8")
+
+
+class TranslateTests(TestCase):
+    """Tests for replacing the common names in records."""
+
+    def test_names_are_replaced(self):
+        records = [{"speciesCode": "horlar", "comName": "Horned Lark"}]
+        CommonNames.translate(records, NAMES["es"])
+        self.assertEqual("Alondra Cornuda", records[0]["comName"])
+
+    def test_unknown_species_are_unchanged(self):
+        records = [{"speciesCode": "x00001", "comName": "hybrid"}]
+        CommonNames.translate(records, NAMES["es"])
+        self.assertEqual("hybrid", records[0]["comName"])
+
+
+@mock.patch("ebird.api.utils.get_response", side_effect=get_response)
+class CallTests(TestCase):
+    """Tests for fetching observations in one locale."""
+
+    def setUp(self):
+        self.names = CommonNames()
+        self.cache = MemoryCache()
+
+    def call(self, locale):
+        with utils.settings(names=self.names, cache=self.cache):
+            return get_observations("12345", "US-NY", locale=locale)
+
+    def test_observations_are_fetched_in_canonical_locale(self, mocked):
+        records = self.call("es")
+        self.assertEqual("Alondra Cornuda", records[0]["comName"])
+        self.assertEqual("hybrid", records[1]["comName"])
+        url, params = mocked.call_args_list[0][0][:2]
+        self.assertNotIn("sppLocale", params)
+
+    def test_response_is_shared_by_locales(self, mocked):
+        self.assertEqual("Horned Lark", self.call("en")[0]["comName"])
+        self.assertEqual("Alondra Cornuda", self.call("es")[0]["comName"])
+        self.assertEqual("Alondra Cornuda", self.call("es")[0]["comName"])
+        # One call for the observations and one for the taxonomy.
+        self.assertEqual(2, mocked.call_count)
+        self.assertEqual(["es"], self.names.get_locales())
+
+    def test_other_canonical_locale(self, mocked):
+        self.names = CommonNames(locale="es")
+        self.assertEqual("Horned Lark", self.call("en")[0]["comName"])
+        self.assertEqual("es", mocked.call_args_list[0][0][1]["sppLocale"])
+
+    def test_store_is_used(self, mocked):
+        self.names.store = mock.Mock()
+        self.names.store.get_taxonomy.return_value = [
+            {"speciesCode": "horlar", "comName": "Alouette hausse-col"}
+        ]
+        self.assertEqual("Alouette hausse-col", self.call("fr")[0]["comName"])
+        self.names.store.get_taxonomy.assert_called_once_with("12345", locale="fr")
+
+    def test_names_are_not_translated_without_setting(self, mocked):
+        with utils.settings(cache=self.cache):
+            get_observations("12345", "US-NY", locale="es")
+        self.assertEqual("es", mocked.call_args[0][1]["sppLocale"])
+
+
+class AsyncClientTests(TestCase):
+    """Tests for translating the common names with an AsyncClient."""
+
+    def test_names_are_translated(self):
+        client = AsyncClient("12345", "es")
+        client.names = CommonNames()
+
+        async def request(url, headers):
+            url, _, query = url.partition("?")
+            params = dict(item.split("=") for item in query.split("&") if item)
+            return Response(get_response(url, params, headers))
+
+        client.pool = mock.Mock()
+        client.pool.request = mock.AsyncMock(side_effect=request)
+        records = asyncio.run(client.get_observations("US-NY"))
+        self.assertEqual("Alondra Cornuda", records[0]["comName"])
+        self.assertNotIn("sppLocale=", client.pool.request.call_args_list[0][0][0])
+
+    def test_taxonomy_is_downloaded_once(self):
+        client = AsyncClient("12345", "es")
+        client.names = CommonNames()
+
+        async def request(url, headers):
+            await asyncio.sleep(0.01)
+            url, _, query = url.partition("?")
+            params = dict(item.split("=") for item in query.split("&") if item)
+            return Response(get_response(url, params, headers))
+
+        client.pool = mock.Mock()
+        client.pool.request = mock.AsyncMock(side_effect=request)
+
+        async def run():
+            calls = [client.get_observations("US-NY") for _ in range(20)]
+            return await asyncio.gather(*calls)
+
+        results = asyncio.run(run())
+        self.assertEqual(["Alondra Cornuda"] * 20, [r[0]["comName"] for r in results])
+        urls = [call[0][0] for call in client.pool.request.call_args_list]
+        self.assertEqual(1, sum(url.startswith(TAXONOMY_URL) for url in urls))
+
+    def test_store_is_used(self):
+        client = AsyncClient("12345", "es")
+        client.names = CommonNames(store=TaxonomyStore(":memory:"))
+
+        def request(url, headers):
+            url, _, query = url.partition("?")
+            params = dict(item.split("=") for item in query.split("&") if item)
+            if url == TAXONOMY_VERSIONS_URL:
+                content = json.dumps([{"authorityVer": 2023, "latest": True}])
+                return Response(content.encode("utf-8"))
+            return Response(get_response(url, params, headers))
+
+        async def observations(url, headers):
+            return request(url, headers)
+
+        client.pool = mock.Mock()
+        client.pool.request = mock.AsyncMock(side_effect=observations)
+        pool = mock.Mock()
+        pool.request.side_effect = request
+
+        with mock.patch.dict(utils._settings, {"pool": pool}):
+            records = asyncio.run(client.get_observations("US-NY"))
+
+        self.assertEqual("Alondra Cornuda", records[0]["comName"])
+        self.assertEqual(1, client.pool.request.call_count)
+        self.assertEqual(2, pool.request.call_count)
+        self.assertIsNotNone(client.names.store.get("2023", "es"))
@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+from urllib.error import HTTPError
+
+from ebird.api.names import NameMatrix, load_names
+from ebird.api.stores import TaxonomyStore
+from ebird.api.taxonomy import (
+    TAXONOMY_LOCALES_URL,
+    TAXONOMY_URL,
+    TAXONOMY_VERSIONS_URL,
+)
+
+NAMES = {
+    "en": {"horlar": "Horned Lark", "amecro": "American Crow"},
+    "es": {"horlar": "Alondra Cornuda", "amecro": "Cuervo Norteamericano"},
+    "fr": {"horlar": "Alouette hausse-col"},
+}
+
+
+def get_response(url, params, headers):
+    if url == TAXONOMY_LOCALES_URL:
+        records = [{"code": code} for code in NAMES]
+    elif url == TAXONOMY_VERSIONS_URL:
+        records = [{"authorityVer": 2024.0, "latest": True}]
+    else:
+        names = NAMES[params.get("locale", "en")]
+        records = [{"speciesCode": code, "comName": names[code]} for code in names]
+    return json.dumps(records).encode("utf-8")
+
+
+def get_records(locale):
+    return json.loads(get_response(TAXONOMY_URL, {"locale": locale}, {}))
+
+
+class NameMatrixTests(TestCase):
+    """Tests for keeping the common names for many locales."""
+
+    def setUp(self):
+        self.matrix = NameMatrix()
+        self.matrix.add("en", get_records("en"))
+        self.matrix.add("fr", get_records("fr"))
+
+    def test_get_name(self):
+        self.assertEqual("Alouette hausse-col", self.matrix.get_name("horlar", "fr"))
+        self.assertIsNone(self.matrix.get_name("amecro", "fr"))
+        self.assertIsNone(self.matrix.get_name("horlar", "de"))
+
+    def test_array_access(self):
+        row, column = self.matrix.get_row("amecro"), self.matrix.get_column("en")
+        self.assertEqual("American Crow", self.matrix.names[column][row])
+
+    def test_new_species_are_added_to_all_locales(self):
+        self.matrix.add("es", [{"speciesCode": "xyz", "comName": "Nuevo"}])
+        self.assertEqual(3, len(self.matrix))
+        self.assertEqual([3, 3, 3], [len(names) for names in self.matrix.names])
+
+    def test_get_names(self):
+        self.assertEqual({"horlar": "Alouette hausse-col"}, self.matrix.get_names("fr"))
+
+
+@mock.patch("ebird.api.utils.get_response", side_effect=get_response)
+class LoadNamesTests(TestCase):
+    """Tests for downloading the common names for many locales."""
+
+    def test_all_locales(self, mocked):
+        matrix = load_names("12345", max_workers=2)
+        self.assertEqual(["en", "es", "fr"], sorted(matrix.locales))
+        self.assertEqual("Cuervo Norteamericano", matrix.get_name("amecro", "es"))
+
+    def test_loaded_locales_are_skipped(self, mocked):
+        matrix = load_names("12345", locales=["en", "es"])
+        load_names("12345", locales=["en", "es", "fr"], matrix=matrix)
+        self.assertEqual(3, mocked.call_count)
+
+    def test_failed_locales_can_be_resumed(self, mocked):
+        def fail_french(url, params, headers):
+            if params.get("locale") == "fr":
+                raise HTTPError(url, 500, "Error", {}, None)
+            return get_response(url, params, headers)
+
+        mocked.side_effect = fail_french
+        matrix = NameMatrix()
+        self.assertRaises(
+            HTTPError, load_names, "12345", ["en", "es", "fr"], None, matrix
+        )
+        self.assertEqual(["en", "es"], sorted(matrix.locales))
+        mocked.side_effect = get_response
+        load_names("12345", ["en", "es", "fr"], matrix=matrix)
+        self.assertEqual("Alouette hausse-col", matrix.get_name("horlar", "fr"))
+        self.assertEqual(4, mocked.call_count)
+
+    def test_store(self, mocked):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "taxonomy.db")
+            for _ in range(2):
+                store = TaxonomyStore(path)
+                matrix = load_names("12345", ["en", "es"], store=store)
+                store.close()
+        self.assertEqual("Alondra Cornuda", matrix.get_name("horlar", "es"))
+        # The versions are checked each time but each locale is only
+        # downloaded once.
+        self.assertEqual(4, mocked.call_count)
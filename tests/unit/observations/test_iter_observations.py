@@ -0,0 +1,18 @@
+from unittest import TestCase, mock
+
+from ebird.api.observations import OBSERVATIONS_URL, iter_observations
+
+
+class IterObservationsTests(TestCase):
+    """Tests for the iter_observations() API call."""
+
+    def test_request_is_streamed(self):
+        with mock.patch("ebird.api.observations.get_stream") as get_stream:
+            iter_observations("12345", "US-NV", back=7)
+        url, params, headers = get_stream.call_args[0]
+        self.assertEqual(OBSERVATIONS_URL % "US-NV", url)
+        self.assertEqual(7, params["back"])
+        self.assertEqual("12345", headers["X-eBirdApiToken"])
+
+    def test_arguments_are_validated_when_called(self):
+        self.assertRaises(ValueError, iter_observations, "12345", "US-NV", back=31)
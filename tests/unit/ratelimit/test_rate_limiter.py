@@ -0,0 +1,101 @@
+import asyncio
+import os
+import tempfile
+import time
+from unittest import TestCase, mock
+
+from ebird.api import utils
+from ebird.api.ratelimit import RateLimiter, SQLiteRateLimiter
+
+
+class RateLimiterTests(TestCase):
+    """Tests for limiting the rate of calls with a token bucket."""
+
+    def get_limiter(self, rate, burst=None):
+        return RateLimiter(rate, burst)
+
+    def test_burst_is_not_delayed(self):
+        limiter = self.get_limiter(10, burst=3)
+        self.assertEqual([0, 0, 0], [limiter.reserve("abc") for _ in range(3)])
+
+    def test_calls_after_burst_are_delayed(self):
+        limiter = self.get_limiter(10, burst=2)
+        delays = [limiter.reserve("abc") for _ in range(4)]
+        self.assertAlmostEqual(0.1, delays[2], places=2)
+        self.assertAlmostEqual(0.2, delays[3], places=2)
+
+    def test_bucket_is_refilled(self):
+        limiter = self.get_limiter(100, burst=1)
+        limiter.reserve("abc")
+        time.sleep(0.02)
+        self.assertEqual(0, limiter.reserve("abc"))
+
+    def test_keys_have_separate_buckets(self):
+        limiter = self.get_limiter(1, burst=1)
+        self.assertEqual(0, limiter.reserve("abc"))
+        self.assertEqual(0, limiter.reserve("def"))
+
+    def test_acquire_waits(self):
+        limiter = self.get_limiter(20, burst=1)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.acquire("abc")
+        self.assertTrue(time.monotonic() - start >= 0.09)
+
+    def test_acquire_async_waits(self):
+        limiter = self.get_limiter(20, burst=1)
+
+        async def run():
+            for _ in range(3):
+                await limiter.acquire_async("abc")
+
+        start = time.monotonic()
+        asyncio.run(run())
+        self.assertTrue(time.monotonic() - start >= 0.09)
+
+    def test_invalid_values_raise_error(self):
+        self.assertRaises(ValueError, RateLimiter, 0)
+        self.assertRaises(ValueError, RateLimiter, 1, burst=0.5)
+
+    def test_get_response_uses_limiter(self):
+        limiter = mock.Mock()
+        pool = mock.Mock()
+        pool.request.return_value = b"[]"
+        with utils.settings(pool=pool, limiter=limiter):
+            utils.get_response("https://api.ebird.org", {}, {"X-eBirdApiToken": "abc"})
+        limiter.acquire.assert_called_with("abc")
+
+
+class SQLiteRateLimiterTests(RateLimiterTests):
+    """Tests for sharing the token buckets using an SQLite database."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "limits.db")
+        self.limiters = []
+
+    def tearDown(self):
+        for limiter in self.limiters:
+            limiter.close()
+        self.directory.cleanup()
+
+    def get_limiter(self, rate, burst=None):
+        limiter = SQLiteRateLimiter(self.path, rate, burst)
+        self.limiters.append(limiter)
+        return limiter
+
+    def test_buckets_are_shared(self):
+        first, second = self.get_limiter(10, burst=1), self.get_limiter(10, burst=1)
+        self.assertEqual(0, first.reserve("abc"))
+        self.assertTrue(second.reserve("abc") > 0)
+
+    def test_connection_is_reopened_after_fork(self):
+        limiter = self.get_limiter(10, burst=1)
+        self.assertEqual(0, limiter.reserve("abc"))
+        inherited = limiter._connection
+        with mock.patch("os.getpid", return_value=-1):
+            self.assertTrue(limiter.reserve("abc") > 0)
+            self.assertIsNot(inherited, limiter._connection)
+        # The parent's connection is not closed.
+        self.assertEqual((1,), inherited.execute("SELECT 1").fetchone())
+        inherited.close()
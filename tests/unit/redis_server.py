@@ -0,0 +1,140 @@
+import fnmatch
+import threading
+import time
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+
+from ebird.api.cache import read_reply
+
+
+def encode(reply):
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return b"-ERR %s\r\n" % str(reply).encode()
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(encode(item) for item in reply)
+
+
+class Handler(StreamRequestHandler):
+    """Run the commands, sent using RESP, against the LocalRedisServer."""
+
+    def setup(self):
+        super().setup()
+        self.watched = None
+        self.queued = None
+
+    def handle(self):
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except ConnectionError:
+                return
+            name, args = command[0].decode().upper(), command[1:]
+            self.server.commands.append(name)
+            if self.queued is not None and name not in ("EXEC", "DISCARD"):
+                self.queued.append((name, args))
+                reply = "QUEUED"
+            else:
+                reply = self.run(name, args)
+            self.wfile.write(encode(reply))
+
+    def run(self, name, args):
+        server = self.server
+        with server.lock:
+            if name == "WATCH":
+                self.watched = {key: server.versions.get(key, 0) for key in args}
+                return "OK"
+            if name == "UNWATCH":
+                self.watched = None
+                return "OK"
+            if name == "MULTI":
+                self.queued = []
+                return "OK"
+            if name == "DISCARD":
+                self.queued = self.watched = None
+                return "OK"
+            if name == "EXEC":
+                queued, watched = self.queued, self.watched
+                self.queued = self.watched = None
+                for key, version in (watched or {}).items():
+                    if server.versions.get(key, 0) != version:
+                        return None
+                return [server.run(*command) for command in queued]
+            return server.run(name, args)
+
+
+class LocalRedisServer(ThreadingTCPServer):
+    """A local server, running in a thread, which supports the subset of
+    the Redis commands used by the RedisCache."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, password=None):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.password = password
+        self.lock = threading.Lock()
+        self.values = {}
+        self.expires = {}
+        self.versions = {}
+        self.commands = []
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def expire(self):
+        now = time.time()
+        for key, expires in list(self.expires.items()):
+            if expires <= now:
+                self.delete(key)
+
+    def delete(self, key):
+        self.expires.pop(key, None)
+        if self.values.pop(key, None) is None:
+            return 0
+        self.versions[key] = self.versions.get(key, 0) + 1
+        return 1
+
+    def run(self, name, args):
+        self.expire()
+        if name == "PING":
+            return "PONG"
+        if name == "AUTH":
+            if args[0].decode() != self.password:
+                return Exception("invalid password")
+            return "OK"
+        if name == "SELECT":
+            return "OK"
+        if name == "GET":
+            return self.values.get(args[0])
+        if name == "SET":
+            key = args[0]
+            self.values[key] = args[1]
+            self.versions[key] = self.versions.get(key, 0) + 1
+            self.expires.pop(key, None)
+            if len(args) > 3 and args[2].upper() == b"PX":
+                self.expires[key] = time.time() + int(args[3]) / 1000
+            return "OK"
+        if name == "DEL":
+            return sum(self.delete(key) for key in args)
+        if name == "SCAN":
+            pattern = args[args.index(b"MATCH") + 1].decode()
+            names = [
+                key for key in self.values if fnmatch.fnmatchcase(key.decode(), pattern)
+            ]
+            return [b"0", names]
+        return Exception("unknown command '%s'" % name)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
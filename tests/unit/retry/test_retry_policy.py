@@ -0,0 +1,91 @@
+import asyncio
+import io
+import socket
+from email.message import Message
+from unittest import TestCase, mock
+from urllib.error import HTTPError, URLError
+
+from ebird.api import utils
+from ebird.api.metrics import Metrics
+from ebird.api.retry import RetryPolicy
+
+
+def http_error(code, retry_after=None):
+    headers = Message()
+    if retry_after is not None:
+        headers["Retry-After"] = retry_after
+    return HTTPError("url", code, "error", headers, io.BytesIO(b""))
+
+
+class RetryPolicyTests(TestCase):
+    """Tests for retrying calls which fail with transient errors."""
+
+    def setUp(self):
+        self.policy = RetryPolicy(max_attempts=3, backoff=0.01, jitter=False)
+        self.metrics = Metrics()
+
+    def test_transient_errors_are_retryable(self):
+        self.assertTrue(self.policy.is_retryable(URLError("refused")))
+        self.assertTrue(self.policy.is_retryable(socket.timeout()))
+        self.assertTrue(self.policy.is_retryable(http_error(429)))
+        self.assertTrue(self.policy.is_retryable(http_error(503)))
+
+    def test_other_errors_are_not_retryable(self):
+        self.assertFalse(self.policy.is_retryable(http_error(400)))
+        self.assertFalse(self.policy.is_retryable(http_error(410)))
+        self.assertFalse(self.policy.is_retryable(ValueError()))
+
+    def test_backoff_doubles(self):
+        delays = [self.policy.get_delay(n, URLError("")) for n in (1, 2)]
+        self.assertEqual([0.01, 0.02], delays)
+
+    def test_backoff_is_limited(self):
+        self.policy.max_backoff = 0.015
+        self.assertEqual(0.015, self.policy.get_delay(2, URLError("")))
+
+    def test_jitter_reduces_delay(self):
+        self.policy.jitter = True
+        self.assertTrue(0 <= self.policy.get_delay(2, URLError("")) <= 0.02)
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(2, self.policy.get_delay(1, http_error(429, "2")))
+
+    def test_retry_after_date(self):
+        error = http_error(503, "Wed, 21 Oct 2015 07:28:00 GMT")
+        self.assertEqual(0, self.policy.get_delay(1, error))
+
+    def test_deadline_stops_retries(self):
+        self.policy.deadline = 1
+        self.assertIsNone(self.policy.get_delay(1, http_error(429, "2")))
+
+    def test_call_is_retried(self):
+        func = mock.Mock(side_effect=[URLError("refused"), http_error(502), "ok"])
+        self.assertEqual("ok", self.policy.call(func, self.metrics))
+        self.assertEqual(3, func.call_count)
+        self.assertEqual(2, self.metrics.snapshot()["retries"])
+
+    def test_last_error_is_raised(self):
+        func = mock.Mock(side_effect=URLError("refused"))
+        self.assertRaises(URLError, self.policy.call, func, self.metrics)
+        self.assertEqual(3, func.call_count)
+        self.assertEqual(1, self.metrics.snapshot()["retries_exhausted"])
+
+    def test_other_errors_are_raised(self):
+        func = mock.Mock(side_effect=http_error(404))
+        self.assertRaises(HTTPError, self.policy.call, func)
+        self.assertEqual(1, func.call_count)
+
+    def test_call_async_is_retried(self):
+        func = mock.AsyncMock(side_effect=[http_error(429, "0"), "ok"])
+        result = asyncio.run(self.policy.call_async(func, self.metrics))
+        self.assertEqual("ok", result)
+        self.assertEqual(1, self.metrics.snapshot()["retries"])
+
+    def test_get_response_uses_policy(self):
+        pool = mock.Mock()
+        pool.request.side_effect = [http_error(500), b"[]"]
+        with utils.settings(pool=pool, retry=self.policy):
+            self.assertEqual(b"[]", utils.get_response("https://api.ebird.org"))
+
+    def test_invalid_attempts_raises_error(self):
+        self.assertRaises(ValueError, RetryPolicy, max_attempts=0)
@@ -0,0 +1,55 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serve the responses registered with the LocalServer."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # noqa
+        self.server.requests.append((self.path, dict(self.headers)))
+        status, headers, content, delay = self.server.responses.get(
+            self.path.split("?")[0], (404, {}, b"", 0)
+        )
+        time.sleep(delay)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):  # noqa
+        pass
+
+
+class LocalServer(ThreadingHTTPServer):
+    """A local HTTP server, running in a thread, for testing the transport."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.requests = []
+        self.responses = {}
+        self.connections = 0
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+    def add(self, path, content, status=200, headers=None, delay=0):
+        self.responses[path] = (status, headers or {}, content, delay)
+
+    def url(self, path):
+        return "http://127.0.0.1:%d%s" % (self.server_address[1], path)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
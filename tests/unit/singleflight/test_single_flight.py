@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+
+from ebird.api import Client, utils
+from ebird.api.client import AsyncClient
+from ebird.api.metrics import Metrics
+from ebird.api.singleflight import SingleFlight
+from ebird.api.transport import Response
+
+
+class SingleFlightTests(TestCase):
+    """Tests for combining identical calls made at the same time."""
+
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.metrics = Metrics()
+        self.count = 0
+
+    def slow(self):
+        self.count += 1
+        time.sleep(0.05)
+        return self.count
+
+    def test_identical_calls_are_combined(self):
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [
+                executor.submit(self.flight.call, "key", self.slow, self.metrics)
+                for _ in range(5)
+            ]
+        self.assertEqual([1] * 5, [future.result() for future in futures])
+        self.assertEqual(1, self.count)
+        self.assertEqual(4, self.metrics.snapshot()["coalesced"])
+
+    def test_different_calls_are_not_combined(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            for key in ("a", "b"):
+                executor.submit(self.flight.call, key, self.slow)
+        self.assertEqual(2, self.count)
+
+    def test_later_calls_are_not_combined(self):
+        self.flight.call("key", self.slow)
+        self.assertEqual(2, self.flight.call("key", self.slow))
+
+    def test_error_is_shared(self):
+        started = threading.Event()
+
+        def fail():
+            started.set()
+            time.sleep(0.05)
+            raise ValueError()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(self.flight.call, "key", fail)
+            started.wait()
+            second = executor.submit(self.flight.call, "key", self.slow)
+        self.assertIsInstance(first.exception(), ValueError)
+        self.assertIsInstance(second.exception(), ValueError)
+        self.assertEqual(0, self.count)
+
+    def test_identical_async_calls_are_combined(self):
+        async def slow():
+            self.count += 1
+            await asyncio.sleep(0.01)
+            return self.count
+
+        async def run():
+            calls = [self.flight.call_async("key", slow) for _ in range(5)]
+            return await asyncio.gather(*calls)
+
+        self.assertEqual([1] * 5, asyncio.run(run()))
+
+    def test_cancelled_caller_does_not_cancel_call(self):
+        async def slow():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def run():
+            first = asyncio.ensure_future(self.flight.call_async("key", slow))
+            second = asyncio.ensure_future(self.flight.call_async("key", slow))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        self.assertEqual("done", asyncio.run(run()))
+
+    def test_client_calls_are_combined(self):
+        client = Client("12345", "en")
+        client.coalesce = self.flight
+        client.pool = mock.Mock()
+        client.pool.request.side_effect = lambda url, headers: time.sleep(0.05) or b"[]"
+        with client.batch(max_workers=4) as batch:
+            results = batch.map(client.get_hotspots, ["US-MA"] * 4)
+        self.assertEqual([[], [], [], []], results)
+        self.assertEqual(1, client.pool.request.call_count)
+
+    def test_async_client_calls_are_combined(self):
+        async def request(url, headers):
+            await asyncio.sleep(0.01)
+            return Response(b"[]")
+
+        client = AsyncClient("12345", "en")
+        client.coalesce = self.flight
+        client.pool = mock.Mock()
+        client.pool.request = mock.AsyncMock(side_effect=request)
+
+        async def run():
+            calls = [client.get_hotspots("US-MA") for _ in range(4)]
+            return await asyncio.gather(*calls)
+
+        self.assertEqual([[], [], [], []], asyncio.run(run()))
+        self.assertEqual(1, client.pool.request.call_count)
+
+    def test_key_includes_parameters(self):
+        self.assertEqual(
+            utils.get_key("url", {"b": 1, "a": 2}),
+            utils.get_key("url", {"a": 2, "b": 1}),
+        )
+        self.assertNotEqual(utils.get_key("url", {"a": 1}), utils.get_key("url", {}))
@@ -0,0 +1,104 @@
+import json
+from datetime import datetime, timedelta
+from unittest import TestCase, mock
+
+from ebird.api import utils
+from ebird.api.cache import MemoryCache
+from ebird.api.stores import ChecklistStore, get_revision
+
+
+def get_checklist(sub_id="S12345678", days=30, **kwargs):
+    edited = datetime.now() - timedelta(days=days)
+    checklist = {
+        "subId": sub_id,
+        "creationDt": edited.strftime("%Y-%m-%d %H:%M"),
+        "lastEditedDt": edited.strftime("%Y-%m-%d %H:%M"),
+        "obs": [{"speciesCode": "horlar", "howManyStr": "2"}],
+    }
+    checklist.update(kwargs)
+    return checklist
+
+
+def get_content(checklist):
+    return json.dumps(checklist).encode("utf-8")
+
+
+class GetRevisionTests(TestCase):
+    """Tests for getting the time a checklist was last edited."""
+
+    def test_last_edited(self):
+        checklist = {
+            "creationDt": "2024-05-01 07:00",
+            "lastEditedDt": "2024-05-02 08:30",
+        }
+        self.assertEqual(datetime(2024, 5, 2, 8, 30), get_revision(checklist))
+
+    def test_created(self):
+        checklist = {"creationDt": "2024-05-01 07:00:15"}
+        self.assertEqual(datetime(2024, 5, 1, 7, 0, 15), get_revision(checklist))
+
+    def test_missing(self):
+        self.assertIsNone(get_revision({}))
+
+
+@mock.patch("ebird.api.utils.get_response")
+class ChecklistStoreTests(TestCase):
+    """Tests for keeping local copies of checklists."""
+
+    def setUp(self):
+        self.store = ChecklistStore(":memory:", immutable_after=timedelta(days=7))
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_new_checklist_is_downloaded_and_stored(self, get_response):
+        get_response.return_value = get_content(get_checklist())
+        checklist = self.store.get_checklist("12345", "S12345678")
+        self.assertEqual("S12345678", checklist["subId"])
+        self.assertIn("S12345678", self.store)
+        self.assertEqual(checklist, self.store.get("S12345678"))
+
+    def test_old_checklist_is_served_locally(self, get_response):
+        get_response.return_value = get_content(get_checklist())
+        self.store.get_checklist("12345", "S12345678")
+        self.store.get_checklist("12345", "S12345678")
+        self.assertEqual(1, get_response.call_count)
+
+    def test_recent_checklist_is_downloaded_again(self, get_response):
+        get_response.return_value = get_content(get_checklist(days=1))
+        self.store.get_checklist("12345", "S12345678")
+        self.store.get_checklist("12345", "S12345678")
+        self.assertEqual(2, get_response.call_count)
+
+    def test_refresh_downloads_old_checklist(self, get_response):
+        get_response.return_value = get_content(get_checklist())
+        self.store.get_checklist("12345", "S12345678")
+        self.store.get_checklist("12345", "S12345678", refresh=True)
+        self.assertEqual(2, get_response.call_count)
+
+    def test_refresh_reports_changes(self, get_response):
+        get_response.return_value = get_content(get_checklist(days=1))
+        self.assertTrue(self.store.refresh("12345", "S12345678")[1])
+        self.assertFalse(self.store.refresh("12345", "S12345678")[1])
+        digest = self.store.get_digest("S12345678")
+        get_response.return_value = get_content(get_checklist(days=1, obs=[]))
+        self.assertTrue(self.store.refresh("12345", "S12345678")[1])
+        self.assertNotEqual(digest, self.store.get_digest("S12345678"))
+
+    def test_refresh_bypasses_cache(self, get_response):
+        get_response.return_value = get_content(get_checklist(days=1))
+        with utils.settings(cache=MemoryCache()):
+            self.store.refresh("12345", "S12345678")
+            self.store.refresh("12345", "S12345678")
+        self.assertEqual(2, get_response.call_count)
+
+    def test_stored_checklist_is_a_copy(self, get_response):
+        self.store.add(get_checklist())
+        self.store.get("S12345678")["obs"].clear()
+        self.assertEqual(1, len(self.store.get("S12345678")["obs"]))
+
+    def test_delete(self, get_response):
+        self.store.add(get_checklist())
+        self.store.delete("S12345678")
+        self.assertEqual(0, len(self.store))
+        self.assertIsNone(self.store.get("S12345678"))
@@ -0,0 +1,87 @@
+import json
+from unittest import TestCase, mock
+
+from ebird.api.stores import TaxonomyStore, get_version
+from ebird.api.taxonomy import TAXONOMY_URL, TAXONOMY_VERSIONS_URL
+
+VERSIONS = [
+    {"authorityVer": 2022.0, "latest": False},
+    {"authorityVer": 2023.0, "latest": True},
+]
+
+
+def get_response(url, params, headers):
+    if url == TAXONOMY_VERSIONS_URL:
+        return json.dumps(VERSIONS).encode("utf-8")
+    english = params.get("locale", "en") == "en"
+    records = [
+        {
+            "speciesCode": "horlar",
+            "comName": "Horned Lark" if english else "Alondra",
+            "version": params["version"],
+        }
+    ]
+    return json.dumps(records).encode("utf-8")
+
+
+class GetVersionTests(TestCase):
+    """Tests for formatting the version of the taxonomy."""
+
+    def test_whole_number(self):
+        self.assertEqual("2023", get_version(2023.0))
+
+    def test_string(self):
+        self.assertEqual("2023", get_version("2023"))
+
+
+@mock.patch("ebird.api.utils.get_response", side_effect=get_response)
+class TaxonomyStoreTests(TestCase):
+    """Tests for keeping local copies of the taxonomy."""
+
+    def setUp(self):
+        self.store = TaxonomyStore(":memory:")
+
+    def tearDown(self):
+        self.store.close()
+
+    def urls(self, mocked):
+        return [args[0][0] for args in mocked.call_args_list]
+
+    def test_latest_version_is_downloaded(self, mocked):
+        records = self.store.get_taxonomy("12345")
+        self.assertEqual("2023", records[0]["version"])
+        self.assertEqual([TAXONOMY_VERSIONS_URL, TAXONOMY_URL], self.urls(mocked))
+        self.assertEqual([("2023", "en")], self.store.get_versions())
+
+    def test_stored_version_is_not_downloaded(self, mocked):
+        self.store.get_taxonomy("12345")
+        self.store.get_taxonomy("12345")
+        self.assertEqual([TAXONOMY_VERSIONS_URL, TAXONOMY_URL], self.urls(mocked))
+
+    def test_versions_are_checked_after_interval(self, mocked):
+        self.store.check_interval = 0
+        self.store.get_taxonomy("12345")
+        self.store.get_taxonomy("12345")
+        self.assertEqual(
+            [TAXONOMY_VERSIONS_URL, TAXONOMY_URL, TAXONOMY_VERSIONS_URL],
+            self.urls(mocked),
+        )
+
+    def test_each_locale_is_stored(self, mocked):
+        self.store.get_taxonomy("12345", locale="es")
+        self.store.get_taxonomy("12345", locale="en")
+        self.assertEqual("Alondra", self.store.get("2023", "es")[0]["comName"])
+        self.assertEqual(2, len(self.store.get_versions()))
+
+    def test_older_version(self, mocked):
+        records = self.store.get_taxonomy("12345", version=2022.0)
+        self.assertEqual("2022", records[0]["version"])
+        self.assertEqual([TAXONOMY_URL], self.urls(mocked))
+
+    def test_delete(self, mocked):
+        self.store.get_taxonomy("12345", locale="es")
+        self.store.get_taxonomy("12345", locale="en")
+        self.store.delete("2023", "es")
+        self.assertEqual([("2023", "en")], self.store.get_versions())
+        self.store.delete("2023")
+        self.assertEqual([], self.store.get_versions())
@@ -0,0 +1,96 @@
+from unittest import TestCase
+
+from ebird.api.table import TaxonomyRow, TaxonomyTable
+
+RECORDS = [
+    {
+        "sciName": "Eremophila alpestris",
+        "comName": "Horned Lark",
+        "speciesCode": "horlar",
+        "category": "species",
+        "taxonOrder": 21000.0,
+        "bandingCodes": ["HOLA"],
+        "order": "Passeriformes",
+        "familyCode": "alaudi1",
+        "familyComName": "Larks",
+        "familySciName": "Alaudidae",
+    },
+    {
+        "sciName": "Eremophila alpestris [alpestris Group]",
+        "comName": "Horned Lark (Eurasian)",
+        "speciesCode": "horlar1",
+        "category": "issf",
+        "taxonOrder": 21001.0,
+        "bandingCodes": [],
+        "order": "Passeriformes",
+        "familyCode": "alaudi1",
+        "familyComName": "Larks",
+        "familySciName": "Alaudidae",
+        "reportAs": "horlar",
+    },
+]
+
+SPANISH = [
+    {
+        "speciesCode": "horlar",
+        "comName": "Alondra Cornuda",
+        "familyComName": "Alaudidos",
+    },
+]
+
+
+class TaxonomyTableTests(TestCase):
+    """Tests for storing the taxonomy by column."""
+
+    def setUp(self):
+        self.table = TaxonomyTable(RECORDS)
+
+    def test_rows_match_records(self):
+        self.assertEqual(RECORDS, [dict(row) for row in self.table])
+        self.assertEqual(2, len(self.table))
+
+    def test_get(self):
+        row = self.table.get("horlar1")
+        self.assertIsInstance(row, TaxonomyRow)
+        self.assertEqual("horlar", row["reportAs"])
+        self.assertEqual(1, self.table.get_row("horlar1"))
+        self.assertIsNone(self.table.get("xxx"))
+
+    def test_missing_field(self):
+        row = self.table[0]
+        self.assertNotIn("reportAs", row)
+        self.assertIsNone(row.get("reportAs"))
+        self.assertRaises(KeyError, lambda: row["reportAs"])
+
+    def test_row_numbers(self):
+        self.assertEqual("horlar1", self.table[-1]["speciesCode"])
+        self.assertRaises(IndexError, lambda: self.table[2])
+
+    def test_add_locale(self):
+        self.table.add_locale("es", SPANISH)
+        row = self.table.get("horlar", locale="es")
+        self.assertEqual("Alondra Cornuda", row["comName"])
+        self.assertEqual("Alaudidos", row["familyComName"])
+        self.assertEqual("Eremophila alpestris", row["sciName"])
+        self.assertEqual(["en", "es"], self.table.get_locales())
+
+    def test_missing_translation_uses_default_locale(self):
+        self.table.add_locale("es", SPANISH)
+        row = self.table.get("horlar1", locale="es")
+        self.assertEqual("Horned Lark (Eurasian)", row["comName"])
+
+    def test_unknown_locale(self):
+        self.assertRaises(KeyError, self.table.get, "horlar", locale="fr")
+
+    def test_column(self):
+        self.table.add_locale("es", SPANISH)
+        self.assertEqual(["horlar", "horlar1"], self.table.column("speciesCode"))
+        self.assertEqual([None, "horlar"], self.table.column("reportAs"))
+        self.assertEqual(
+            ["Alondra Cornuda", "Horned Lark (Eurasian)"],
+            self.table.column("comName", locale="es"),
+        )
+
+    def test_values_are_shared(self):
+        self.assertIs(self.table[0]["familyComName"], self.table[1]["familyComName"])
+        self.assertEqual(["HOLA"], self.table[0]["bandingCodes"])
@@ -0,0 +1,17 @@
+from unittest import TestCase, mock
+
+from ebird.api.taxonomy import TAXONOMY_URL, iter_taxonomy
+
+
+class IterTaxonomyTests(TestCase):
+    """Tests for the iter_taxonomy() API call."""
+
+    def test_request_is_streamed(self):
+        with mock.patch("ebird.api.taxonomy.get_stream") as get_stream:
+            iter_taxonomy("12345", locale="es")
+        url, params, headers = get_stream.call_args[0]
+        self.assertEqual(TAXONOMY_URL, url)
+        self.assertEqual("es", params["locale"])
+
+    def test_arguments_are_validated_when_called(self):
+        self.assertRaises(ValueError, iter_taxonomy, "12345", locale="xx")
@@ -0,0 +1,74 @@
+import asyncio
+import gzip
+from unittest import TestCase
+from urllib.error import HTTPError, URLError
+
+from ebird.api.transport import AsyncConnectionPool
+from tests.unit.server import LocalServer
+
+
+class AsyncConnectionPoolTests(TestCase):
+    """Tests for the AsyncConnectionPool used to send requests."""
+
+    def setUp(self):
+        self.server = LocalServer().start()
+        self.server.add("/data", b"[]")
+        self.pool = AsyncConnectionPool(max_size=2)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.stop()
+
+    def request(self, path, count=1):
+        async def send():
+            requests = [self.pool.request(self.server.url(path)) for _ in range(count)]
+            return await asyncio.gather(*requests)
+
+        return asyncio.run(send())
+
+    def test_content_is_returned(self):
+        self.assertEqual([b"[]"], self.request("/data"))
+
+    def test_connection_is_reused(self):
+        async def send():
+            for _ in range(3):
+                await self.pool.request(self.server.url("/data"))
+
+        asyncio.run(send())
+        self.assertEqual(1, self.server.connections)
+
+    def test_concurrent_requests(self):
+        self.assertEqual([b"[]"] * 10, self.request("/data", 10))
+        self.assertTrue(self.pool.size() <= 2)
+
+    def test_compressed_content_is_decoded(self):
+        content = b"[" + b"{}," * 1000 + b"{}]"
+        compressed = gzip.compress(content)
+        self.server.add("/gzip", compressed, headers={"Content-Encoding": "gzip"})
+        response = self.request("/gzip")[0]
+        self.assertEqual(content, response)
+        self.assertEqual(len(compressed), response.wire_bytes)
+
+    def test_error_raises_http_error(self):
+        with self.assertRaises(HTTPError) as context:
+            self.request("/missing")
+        self.assertEqual(404, context.exception.code)
+
+    def test_timeout_raises_url_error(self):
+        self.server.add("/slow", b"[]", delay=0.5)
+        self.pool.timeout = 0.05
+        self.assertRaises(URLError, self.request, "/slow")
+        self.assertEqual(0, self.pool.size())
+
+    def test_cancelled_request_closes_connection(self):
+        self.server.add("/slow", b"[]", delay=0.5)
+
+        async def send():
+            task = asyncio.ensure_future(self.pool.request(self.server.url("/slow")))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(send())
+        self.assertEqual(0, self.pool.size())
@@ -0,0 +1,110 @@
+import gzip
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+from urllib.error import HTTPError
+
+from ebird.api.transport import ConnectionPool
+from tests.unit.server import LocalServer
+
+
+class ConnectionPoolTests(TestCase):
+    """Tests for the ConnectionPool used to send requests."""
+
+    def setUp(self):
+        self.server = LocalServer().start()
+        self.server.add("/data", b"[]")
+        self.pool = ConnectionPool(max_size=2)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.stop()
+
+    def test_content_is_returned(self):
+        self.assertEqual(b"[]", self.pool.request(self.server.url("/data")))
+
+    def test_headers_are_sent(self):
+        self.pool.request(self.server.url("/data"), {"X-eBirdApiToken": "abc123"})
+        headers = self.server.requests[0][1]
+        self.assertEqual("abc123", headers["X-eBirdApiToken"])
+
+    def test_connection_is_reused(self):
+        for _ in range(3):
+            self.pool.request(self.server.url("/data"))
+        self.assertEqual(1, self.server.connections)
+        self.assertEqual(1, self.pool.size())
+
+    def test_pool_size_is_limited(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(self.pool.request, [self.server.url("/data")] * 20))
+        self.assertTrue(self.pool.size() <= 2)
+
+    def test_idle_connections_are_evicted(self):
+        self.pool.idle_timeout = 0.01
+        self.pool.request(self.server.url("/data"))
+        time.sleep(0.02)
+        self.pool.evict()
+        self.assertEqual(0, self.pool.size())
+
+    def test_idle_connection_is_not_reused(self):
+        self.pool.idle_timeout = 0.01
+        self.pool.request(self.server.url("/data"))
+        time.sleep(0.02)
+        self.pool.request(self.server.url("/data"))
+        self.assertEqual(2, self.server.connections)
+
+    def test_closed_connection_is_replaced(self):
+        self.pool.request(self.server.url("/data"))
+        for connections in self.pool._idle.values():
+            for conn, _ in connections:
+                conn.sock.shutdown(socket.SHUT_RDWR)
+        self.assertEqual(b"[]", self.pool.request(self.server.url("/data")))
+
+    def test_connections_are_not_shared_after_fork(self):
+        self.pool.request(self.server.url("/data"))
+        inherited = [conn for idle in self.pool._idle.values() for conn, _ in idle]
+        with mock.patch("os.getpid", return_value=-1):
+            self.assertEqual(0, self.pool.size())
+            self.pool.request(self.server.url("/data"))
+            self.assertEqual(1, self.pool.size())
+        self.assertEqual(2, self.server.connections)
+        # The parent's connection is dropped but not closed.
+        self.assertIsNotNone(inherited[0].sock)
+
+    def test_error_raises_http_error(self):
+        with self.assertRaises(HTTPError) as context:
+            self.pool.request(self.server.url("/missing"))
+        self.assertEqual(404, context.exception.code)
+
+    def test_redirect_is_followed(self):
+        self.server.add("/moved", b"", status=301, headers={"Location": "/data"})
+        self.assertEqual(b"[]", self.pool.request(self.server.url("/moved")))
+
+    def test_negative_size_raises_error(self):
+        self.assertRaises(ValueError, ConnectionPool, max_size=-1)
+
+    def test_compression_is_accepted(self):
+        self.pool.request(self.server.url("/data"))
+        headers = self.server.requests[0][1]
+        self.assertEqual("gzip, deflate", headers["Accept-Encoding"])
+
+    def test_compressed_content_is_decoded(self):
+        content = b"[" + b"{}," * 1000 + b"{}]"
+        compressed = gzip.compress(content)
+        self.server.add("/gzip", compressed, headers={"Content-Encoding": "gzip"})
+        response = self.pool.request(self.server.url("/gzip"))
+        self.assertEqual(content, response)
+        self.assertEqual(len(compressed), response.wire_bytes)
+        self.assertEqual(len(content), response.decoded_bytes)
+
+    def test_stream_is_read_in_chunks(self):
+        with self.pool.open(self.server.url("/data")) as stream:
+            self.assertEqual(b"[]", b"".join(stream))
+        self.assertEqual(1, self.pool.size())
+
+    def test_closed_stream_closes_connection(self):
+        self.server.add("/large", b"[" + b"0," * 100000 + b"0]")
+        with self.pool.open(self.server.url("/large")) as stream:
+            next(iter(stream))
+        self.assertEqual(0, self.pool.size())
@@ -0,0 +1,50 @@
+import gzip
+import io
+import zlib
+from unittest import TestCase
+from urllib.error import URLError
+
+from ebird.api.transport import CHUNK_SIZE, ContentReader
+
+CONTENT = b'[{"speciesCode": "mallar3"}]' * 10000
+
+
+class ContentReaderTests(TestCase):
+    """Tests for reading and decompressing the content of a response."""
+
+    def read(self, data, encoding):
+        reader = ContentReader(io.BytesIO(data), encoding)
+        return reader, b"".join(reader)
+
+    def test_identity(self):
+        reader, content = self.read(CONTENT, None)
+        self.assertEqual(CONTENT, content)
+        self.assertEqual(len(CONTENT), reader.wire_bytes)
+
+    def test_gzip(self):
+        data = gzip.compress(CONTENT)
+        reader, content = self.read(data, "gzip")
+        self.assertEqual(CONTENT, content)
+        self.assertEqual(len(data), reader.wire_bytes)
+        self.assertEqual(len(CONTENT), reader.decoded_bytes)
+
+    def test_deflate(self):
+        reader, content = self.read(zlib.compress(CONTENT), "deflate")
+        self.assertEqual(CONTENT, content)
+
+    def test_raw_deflate(self):
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        data = compressor.compress(CONTENT) + compressor.flush()
+        reader, content = self.read(data, "deflate")
+        self.assertEqual(CONTENT, content)
+
+    def test_content_is_read_in_chunks(self):
+        chunks = list(ContentReader(io.BytesIO(CONTENT)))
+        self.assertTrue(len(chunks) > 1)
+        self.assertTrue(all(len(chunk) <= CHUNK_SIZE for chunk in chunks))
+
+    def test_corrupt_content_raises_error(self):
+        self.assertRaises(URLError, self.read, b"not compressed", "gzip")
+
+    def test_unsupported_encoding_raises_error(self):
+        self.assertRaises(URLError, ContentReader, io.BytesIO(b""), "br")
@@ -0,0 +1,17 @@
+from unittest import TestCase
+
+from ebird.api.transport import Response
+
+
+class ResponseTests(TestCase):
+    """Tests for the content returned by the server."""
+
+    def test_content_is_bytes(self):
+        response = Response(b"[]")
+        self.assertEqual(b"[]", response)
+        self.assertEqual(2, response.decoded_bytes)
+
+    def test_headers_are_not_shared(self):
+        response = Response(b"[]")
+        response.headers["ETag"] = '"abc"'
+        self.assertEqual({}, Response(b"[]").headers)
@@ -0,0 +1,44 @@
+from unittest import TestCase, mock
+
+from ebird.api import Client, utils
+
+
+class GetDecoderTests(TestCase):
+    """Tests for selecting the function used to decode JSON."""
+
+    def test_json_decoder(self):
+        decoder = utils.get_decoder("json")
+        self.assertEqual([{"a": 1}], decoder(b'[{"a": 1}]'))
+
+    def test_default_decoder(self):
+        decoder = utils.get_decoder()
+        self.assertEqual([{"a": "é"}], decoder('[{"a": "é"}]'.encode("utf-8")))
+
+    def test_unknown_decoder_raises_error(self):
+        self.assertRaises(ValueError, utils.get_decoder, "unknown")
+
+    def test_missing_package_raises_error(self):
+        with mock.patch("importlib.import_module", side_effect=ImportError):
+            self.assertRaises(ImportError, utils.get_decoder, "orjson")
+
+    def test_default_falls_back_to_json(self):
+        with mock.patch("importlib.import_module", side_effect=ImportError):
+            decoder = utils.get_decoder()
+        self.assertEqual([], decoder(b"[]"))
+
+
+class GetJsonTests(TestCase):
+    """Tests for decoding the records in a response."""
+
+    def test_uses_decoder_setting(self):
+        decoder = mock.Mock(return_value=[])
+        with utils.settings(decoder=decoder):
+            utils.get_json(b"[]")
+        decoder.assert_called_with(b"[]")
+
+    def test_client_decoder(self):
+        client = Client("key", "en")
+        client.decoder = mock.Mock(return_value=[])
+        with mock.patch("ebird.api.utils.get_response", return_value=b"[]"):
+            client.get_taxonomy_versions()
+        client.decoder.assert_called_with(b"[]")
@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+from ebird.api import get_observations, get_taxonomy, utils
+from ebird.api.observations import OBSERVATIONS_URL
+
+
+def get_key(func, *args, **kwargs):
+    return utils.get_key(*utils.prepare(func, *args, **kwargs)[:2])
+
+
+class GetKeyTests(TestCase):
+    """Tests for building the canonical key for a call to the API."""
+
+    def test_parameters_are_sorted(self):
+        self.assertEqual(
+            utils.get_key("url", {"b": 1, "a": 2}),
+            utils.get_key("url", {"a": 2, "b": 1}),
+        )
+
+    def test_lists_are_sorted(self):
+        self.assertEqual(
+            "url?cat=issf%2Cspecies",
+            utils.get_key("url", {"cat": "species, issf,species"}),
+        )
+
+    def test_area_in_path_is_replaced(self):
+        url = OBSERVATIONS_URL % "US-NV"
+        self.assertEqual(
+            OBSERVATIONS_URL % "US-ID" + "?r=US-ID%2CUS-NV",
+            utils.get_key(url, {"r": "US-NV,US-ID"}),
+        )
+
+    def test_single_area_is_removed(self):
+        url = OBSERVATIONS_URL % "US-NV"
+        self.assertEqual(url, utils.get_key(url, {"r": "US-NV,US-NV"}))
+
+    def test_equivalent_areas(self):
+        keys = {
+            get_key(get_observations, "12345", "US-NV,US-ID"),
+            get_key(get_observations, "12345", [" us-id ", "US-NV"]),
+            get_key(get_observations, "12345", ["US-ID", "US-NV"], back=14),
+        }
+        self.assertEqual(1, len(keys))
+
+    def test_duplicate_area(self):
+        self.assertEqual(
+            get_key(get_observations, "12345", "US-NV"),
+            get_key(get_observations, "12345", ["US-NV", "us-nv"]),
+        )
+
+    def test_equivalent_species(self):
+        self.assertEqual(
+            get_key(get_taxonomy, "12345", species="horlar,barswa"),
+            get_key(get_taxonomy, "12345", species=["barswa", "horlar"]),
+        )
+
+    def test_different_calls(self):
+        self.assertNotEqual(
+            get_key(get_observations, "12345", "US-NV"),
+            get_key(get_observations, "12345", "US-NV", back=7),
+        )
@@ -0,0 +1,29 @@
+import json
+from unittest import TestCase
+
+from ebird.api import utils
+from ebird.api.metrics import Metrics
+from ebird.api.transport import ConnectionPool
+from tests.unit.server import LocalServer
+
+
+class GetStreamTests(TestCase):
+    """Tests for getting the records from the API as they are received."""
+
+    def setUp(self):
+        self.server = LocalServer().start()
+        self.pool = ConnectionPool()
+        self.metrics = Metrics()
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.stop()
+
+    def test_records_are_returned(self):
+        records = [{"locId": "L%d" % n} for n in range(1000)]
+        self.server.add("/hotspots", json.dumps(records).encode("utf-8"))
+        with utils.settings(pool=self.pool, metrics=self.metrics):
+            result = list(utils.get_stream(self.server.url("/hotspots"), {}, {}))
+        self.assertEqual(records, result)
+        self.assertEqual(1, self.metrics.snapshot()["calls"])
+        self.assertEqual(1, self.pool.size())
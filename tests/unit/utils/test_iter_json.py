@@ -0,0 +1,50 @@
+import json
+from unittest import TestCase
+
+from ebird.api.utils import iter_json
+
+RECORDS = [{"speciesCode": "mallar3", "comName": "Canard colvert", "howMany": 12}] * 50
+
+
+def split(content, size):
+    return [content[i : i + size] for i in range(0, len(content), size)]
+
+
+class IterJsonTests(TestCase):
+    """Tests for decoding a JSON array as the content is received."""
+
+    def test_records_are_decoded(self):
+        content = json.dumps(RECORDS).encode("utf-8")
+        for size in (1, 3, 100, len(content)):
+            self.assertEqual(RECORDS, list(iter_json(split(content, size))))
+
+    def test_multibyte_characters_split_across_chunks(self):
+        content = json.dumps(["Æ…é"], ensure_ascii=False).encode("utf-8")
+        self.assertEqual(["Æ…é"], list(iter_json(split(content, 1))))
+
+    def test_numbers_split_across_chunks(self):
+        self.assertEqual([12, 345], list(iter_json([b"[1", b"2,3", b"45]"])))
+
+    def test_numbers_split_at_every_position(self):
+        values = [1, 2.5, -3, 1.5e3, 4e-2, 0, True, None, "x", -0.25e10]
+        content = json.dumps(values).encode("utf-8")
+        for i in range(1, len(content)):
+            chunks = [content[:i], content[i:]]
+            self.assertEqual(values, list(iter_json(chunks)))
+
+    def test_empty_array(self):
+        self.assertEqual([], list(iter_json([b" [ ", b"] "])))
+
+    def test_object_is_returned_as_one_record(self):
+        self.assertEqual([{"a": 1}], list(iter_json([b'{"a"', b": 1}"])))
+
+    def test_first_record_is_returned_before_end(self):
+        records = iter_json(iter([b'[{"a": 1}, ', b'{"b"']))
+        self.assertEqual({"a": 1}, next(records))
+
+    def test_incomplete_content_raises_error(self):
+        self.assertRaises(ValueError, list, iter_json([b'[{"a": 1},']))
+
+    def test_invalid_content_raises_error(self):
+        self.assertRaises(ValueError, list, iter_json([b"[1 2]"]))
+        self.assertRaises(ValueError, list, iter_json([b"[1]x"]))
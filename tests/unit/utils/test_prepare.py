@@ -0,0 +1,23 @@
+from unittest import TestCase, mock
+
+from ebird.api import utils
+from ebird.api.hotspots import REGION_HOTSPOTS_URL, get_hotspots
+
+
+class PrepareTests(TestCase):
+    """Tests for getting the request an API function would send."""
+
+    def test_request_is_returned(self):
+        with mock.patch("ebird.api.utils.get_response") as get_response:
+            prepared = utils.prepare(get_hotspots, "12345", "us-ma", back=7)
+        self.assertFalse(get_response.called)
+        self.assertEqual(REGION_HOTSPOTS_URL % "US-MA", prepared.url)
+        self.assertEqual({"fmt": "json", "back": 7}, prepared.params)
+        self.assertEqual({"X-eBirdApiToken": "12345"}, prepared.headers)
+
+    def test_arguments_are_validated(self):
+        self.assertRaises(ValueError, utils.prepare, get_hotspots, "12345", "US-")
+
+    def test_default_parameters_are_filtered(self):
+        prepared = utils.prepare(get_hotspots, "12345", "US-MA")
+        self.assertEqual({"fmt": "json"}, prepared.params)
@@ -0,0 +1,47 @@
+from unittest import TestCase, mock
+
+from ebird.api import Client, utils
+from ebird.api.transport import ConnectionPool
+
+
+class SettingsTests(TestCase):
+    """Tests for changing the settings used to call the API."""
+
+    def test_default_pool(self):
+        self.assertIsInstance(utils.get_setting("pool"), ConnectionPool)
+
+    def test_settings_are_changed_in_block(self):
+        pool = ConnectionPool()
+        with utils.settings(pool=pool):
+            self.assertIs(pool, utils.get_setting("pool"))
+        self.assertIsNot(pool, utils.get_setting("pool"))
+
+    def test_configure_changes_default(self):
+        default, pool = utils.get_setting("pool"), ConnectionPool()
+        try:
+            utils.configure(pool=pool)
+            self.assertIs(pool, utils.get_setting("pool"))
+        finally:
+            utils.configure(pool=default)
+
+    def test_unknown_setting_raises_error(self):
+        self.assertRaises(ValueError, utils.configure, unknown=True)
+        with self.assertRaises(ValueError):
+            with utils.settings(unknown=True):
+                pass
+
+    def test_get_response_uses_pool(self):
+        pool = mock.Mock()
+        pool.request.return_value = b"[]"
+        with utils.settings(pool=pool):
+            utils.get_response("https://api.ebird.org/v2/ref/hotspot/US", {"a": 1})
+        pool.request.assert_called_with(
+            "https://api.ebird.org/v2/ref/hotspot/US?a=1", None
+        )
+
+    def test_client_settings_are_used(self):
+        client = Client("12345", "en")
+        client.pool = mock.Mock()
+        client.pool.request.return_value = b"{}"
+        client.get_hotspot("L123456")
+        self.assertTrue(client.pool.request.called)
@@ -9,5 +9,8 @@ class CleanLocationTests(unittest.TestCase):
     def test_code_is_lower_case(self):
         self.assertEqual("cangoo", clean_species_code("CANGOO"))
 
+    def test_code_can_end_with_digits(self):
+        self.assertEqual("mallar3", clean_species_code("mallar3"))
+
     def test_invalid_code_raises_error(self):
         self.assertRaises(ValueError, clean_species_code, "none")